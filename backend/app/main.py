@@ -1,20 +1,58 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from app.routes.patients import router as patients_router
 from app.routes.dashboard import router as dashboard_router
 from app.routes.charts.router import router as charts_router
 from app.routes.chat import router as chat_router
 from app.routes.summary import router as summary_router
+from app.routes.admin import router as admin_router
+from app.routes.export import router as export_router
 from app.utils.mcp import mcp
+from app.utils.mongo import init_clients, close_clients
+from app.utils.monitoring import ServerTimingMiddleware
+from app.utils.metrics import MetricsMiddleware
+from app.utils import slow_ops
+from app.utils import warmup
+
+logger = logging.getLogger(__name__)
 
 mcp_app = mcp.http_app(path="/")
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Crea el pool de conexiones a MongoDB al arrancar y lo cierra al apagar.
+    El calentamiento (warmup.WARMUP_STEPS) corre en segundo plano; /health
+    responde 503 hasta que termina.
+    """
+    init_clients()
+    warmup_stop = threading.Event()
+    warmup_task = asyncio.create_task(asyncio.to_thread(warmup.run_warmup, warmup_stop))
+    try:
+        async with mcp_app.lifespan(app):
+            yield
+    finally:
+        # cancel() no detiene el hilo de to_thread: se le pide que pare y se
+        # espera al paso en curso para no cerrar los clientes bajo sus consultas
+        warmup_stop.set()
+        await asyncio.wait({warmup_task}, timeout=warmup.WARMUP_STOP_TIMEOUT_S)
+        if not warmup_task.done():
+            logger.warning(f"El calentamiento sigue en curso tras {warmup.WARMUP_STOP_TIMEOUT_S}s; se cierran los clientes")
+        slow_ops.shutdown()
+        await close_clients()
+
+
 app = FastAPI(
     title="MIMIC-IV Analytics API",
     description="API para visualización de datos clínicos MIMIC-IV",
     version="1.0.0",
-    lifespan=mcp_app.lifespan
+    lifespan=lifespan
 )
 
 app.mount("/mcp", mcp_app)
@@ -25,6 +63,8 @@ app.include_router(dashboard_router)
 app.include_router(charts_router)
 app.include_router(chat_router)
 app.include_router(summary_router)
+app.include_router(admin_router)
+app.include_router(export_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,12 +72,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag", "Last-Modified"],
 )
 
+# Desglose de tiempos (Mongo por colección/operación) en cada respuesta
+app.add_middleware(ServerTimingMiddleware)
+# Latencias por ruta y peticiones en curso para /metrics
+app.add_middleware(MetricsMiddleware)
+
 @app.get("/")
 def root():
     return {"message": "MIMIC-IV Analytics API"}
 
 @app.get("/health")
-def health():
-    return {"status": "healthy"}
+def health(response: Response):
+    """Lista para recibir tráfico cuando termina el calentamiento de arranque."""
+    if not warmup.state.ready:
+        response.status_code = 503
+        return {"status": "warming_up", "warmup": warmup.state.as_dict()}
+    return {"status": "healthy", "warmup": warmup.state.as_dict()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas en formato Prometheus"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
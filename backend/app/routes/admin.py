@@ -0,0 +1,70 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from app.utils.mongo import get_async_db
+from app.utils.slow_ops import SLOW_OPS_COLLECTION
+from app.utils.response_cache import response_cache
+
+# Token de los endpoints de administración (cabecera X-Admin-Token o
+# Authorization: Bearer). Sin token configurado responden 404, como si no existieran
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def require_admin_token(
+    x_admin_token: str | None = Header(None),
+    authorization: str | None = Header(None),
+):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = x_admin_token
+    if token is None and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Token de administración no válido")
+
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+SLOW_OPS_SORT_FIELDS = ("max_duration_ms", "total_duration_ms", "occurrences", "last_seen")
+
+
+@router.get("/slow-ops")
+async def list_slow_ops(
+    limit: int = Query(20, ge=1, le=200),
+    sort: str = Query("max_duration_ms", description="max_duration_ms | total_duration_ms | occurrences | last_seen"),
+    collection: str | None = None,
+    collscan_only: bool = False,
+):
+    """
+    Lista las operaciones Mongo lentas registradas en _perf_slow_ops
+    (peores primero), con el resumen de su plan de ejecución.
+    """
+    if sort not in SLOW_OPS_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort debe ser uno de {', '.join(SLOW_OPS_SORT_FIELDS)}")
+
+    query = {}
+    if collection:
+        query["collection"] = collection
+    if collscan_only:
+        query["plan.collscan"] = True
+
+    db = get_async_db()
+    docs = await db[SLOW_OPS_COLLECTION].find(query).sort(sort, -1).limit(limit).to_list()
+    for doc in docs:
+        doc["fingerprint"] = doc.pop("_id")
+
+    return {"slow_ops": docs, "count": len(docs)}
+
+
+@router.get("/cache")
+def get_response_cache_stats():
+    """Estado de la caché de respuestas: entradas, bytes ocupados y contadores de hit/miss."""
+    return response_cache.stats()
+
+
+@router.delete("/cache")
+def clear_response_cache():
+    """Vacía la caché de respuestas (se rellena en las siguientes peticiones)."""
+    response_cache.clear()
+    return {"cleared": True}
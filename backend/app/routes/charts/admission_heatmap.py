@@ -1,92 +1,142 @@
 from fastapi import APIRouter, HTTPException, Query
-from app.utils.mongo import get_db
+from app.utils.mongo import get_db, get_async_db, sync_fallback
+from app.utils.monitoring import timed
+from app.utils.time_cube import get_time_cube, get_time_cube_async
 
 router = APIRouter()
 
-@router.get("/admission-heatmap")
-def get_admission_heatmap(
-    filter_midnight: bool = Query(True, description="Filter out midnight records (00:00:00)"),
-    view_type: str = Query("hourly", description="View type: 'hourly' or 'monthly'")
-):
-    try:
-        db = get_db()
-        
-        pipeline = []
-        
-        # Añadir filtro de medianoche solo si se solicita
-        if filter_midnight:
-            pipeline.append({
-                "$match": {
-                    "admittime": {"$not": {"$regex": "00:00:00$"}}
-                }
-            })
-        
+
+def _build_pipeline(filter_midnight: bool, view_type: str, admission_type: str | None = None) -> list:
+    """
+    Construye el pipeline de agregación del heatmap según filtro y vista. Solo se
+    usa si no hay cubo precalculado (scripts/*/build_admission_time_cube.py).
+    """
+    pipeline = []
+
+    if admission_type is not None:
+        pipeline.append({"$match": {"admission_type": admission_type}})
+    
+    # Añadir filtro de medianoche solo si se solicita
+    if filter_midnight:
         pipeline.append({
-            "$addFields": {
-                "admitdate": {"$dateFromString": {"dateString": "$admittime"}}
+            "$match": {
+                "admittime": {"$not": {"$regex": "00:00:00$"}}
             }
         })
-        
-        # Para vista mensual, filtrar el 29 de febrero (año bisiesto distorsiona la escala)
-        if view_type == "monthly":
-            pipeline.append({
-                "$match": {
-                    "$expr": {
-                        "$not": {
-                            "$and": [
-                                {"$eq": [{"$month": "$admitdate"}, 2]},
-                                {"$eq": [{"$dayOfMonth": "$admitdate"}, 29]}
-                            ]
-                        }
+    
+    pipeline.append({
+        "$addFields": {
+            "admitdate": {"$dateFromString": {"dateString": "$admittime"}}
+        }
+    })
+    
+    # Para vista mensual, filtrar el 29 de febrero (año bisiesto distorsiona la escala)
+    if view_type == "monthly":
+        pipeline.append({
+            "$match": {
+                "$expr": {
+                    "$not": {
+                        "$and": [
+                            {"$eq": [{"$month": "$admitdate"}, 2]},
+                            {"$eq": [{"$dayOfMonth": "$admitdate"}, 29]}
+                        ]
                     }
                 }
-            })
-        
-        # Configurar agrupación según el tipo de vista
-        if view_type == "monthly":
-            pipeline.extend([
-                {
-                    "$group": {
-                        "_id": {
-                            "month": {"$month": "$admitdate"},
-                            "dayOfMonth": {"$dayOfMonth": "$admitdate"}
-                        },
-                        "count": {"$sum": 1}
-                    }
-                },
-                {
-                    "$project": {
-                        "_id": 0,
-                        "month": "$_id.month",
-                        "dayOfMonth": "$_id.dayOfMonth",
-                        "count": 1
-                    }
+            }
+        })
+    
+    # Configurar agrupación según el tipo de vista
+    if view_type == "monthly":
+        pipeline.extend([
+            {
+                "$group": {
+                    "_id": {
+                        "month": {"$month": "$admitdate"},
+                        "dayOfMonth": {"$dayOfMonth": "$admitdate"}
+                    },
+                    "count": {"$sum": 1}
                 }
-            ])
-        else:  # hourly (default)
-            pipeline.extend([
-                {
-                    "$group": {
-                        "_id": {
-                            "hour": {"$hour": "$admitdate"},
-                            "dayOfWeek": {"$dayOfWeek": "$admitdate"}
-                        },
-                        "count": {"$sum": 1}
-                    }
-                },
-                {
-                    "$project": {
-                        "_id": 0,
-                        "hour": "$_id.hour",
-                        "dayOfWeek": "$_id.dayOfWeek",
-                        "count": 1
-                    }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "month": "$_id.month",
+                    "dayOfMonth": "$_id.dayOfMonth",
+                    "count": 1
+                }
+            }
+        ])
+    else:  # hourly (default)
+        pipeline.extend([
+            {
+                "$group": {
+                    "_id": {
+                        "hour": {"$hour": "$admitdate"},
+                        "dayOfWeek": {"$dayOfWeek": "$admitdate"}
+                    },
+                    "count": {"$sum": 1}
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "hour": "$_id.hour",
+                    "dayOfWeek": "$_id.dayOfWeek",
+                    "count": 1
                 }
-            ])
+            }
+        ])
+
+    return pipeline
+
+
+def _cube_slice(cube, filter_midnight: bool, view_type: str, admission_type: str | None) -> list | None:
+    if cube is None:
+        return None
+    with timed("cube"):
+        return cube.slice(filter_midnight, view_type, admission_type)
+
+
+def get_admission_heatmap_sync(
+    filter_midnight: bool = Query(True, description="Filter out midnight records (00:00:00)"),
+    view_type: str = Query("hourly", description="View type: 'hourly' or 'monthly'"),
+    admission_type: str | None = Query(None, description="Only admissions of this admission_type"),
+):
+    try:
+        data = _cube_slice(get_time_cube(), filter_midnight, view_type, admission_type)
+        if data is not None:
+            return {"data": data}
+
+        db = get_db()
         
+        pipeline = _build_pipeline(filter_midnight, view_type, admission_type)
         result = list(db["hosp_admissions"].aggregate(pipeline))
         
         return {"data": result}
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/admission-heatmap")
+@sync_fallback(get_admission_heatmap_sync)
+async def get_admission_heatmap(
+    filter_midnight: bool = Query(True, description="Filter out midnight records (00:00:00)"),
+    view_type: str = Query("hourly", description="View type: 'hourly' or 'monthly'"),
+    admission_type: str | None = Query(None, description="Only admissions of this admission_type"),
+):
+    try:
+        db = get_async_db()
+
+        data = _cube_slice(await get_time_cube_async(db), filter_midnight, view_type, admission_type)
+        if data is not None:
+            return {"data": data}
+
+        pipeline = _build_pipeline(filter_midnight, view_type, admission_type)
+        cursor = await db["hosp_admissions"].aggregate(pipeline)
+        result = await cursor.to_list()
+
+        return {"data": result}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,28 +1,56 @@
 from fastapi import APIRouter, HTTPException
-from app.utils.mongo import get_db
+from app.utils.mongo import get_db, get_async_db, sync_fallback
+from app.utils.response_cache import cached_response
 
 router = APIRouter()
 
+# Se invalida cuando los scripts de preagregación marcan una nueva versión;
+# el navegador revalida con ETag/Last-Modified (304 sin leer Mongo)
+_CACHE = cached_response(
+    "hospital_transfers_chord",
+    ["transfer_edges_chord"],
+    cache_control="public, max-age=300, stale-while-revalidate=86400",
+)
 
-@router.get("/hospital-transfers-chord")
-def get_hospital_transfers_chord():
+_PROJECTION = {"_id": 0, "from": 1, "to": 1, "count": 1}
+
+
+def _build_chord(edges: list) -> dict:
+    if not edges:
+        return {"nodes": [], "links": []}
+
+    names = set()
+    for e in edges:
+        names.add(e["from"])
+        names.add(e["to"])
+
+    nodes = sorted(names)
+    links = [{"source": e["from"], "target": e["to"], "value": e["count"]} for e in edges]
+
+    return {"nodes": nodes, "links": links}
+
+
+@_CACHE
+def get_hospital_transfers_chord_sync():
     try:
         db = get_db()
-        cursor = db["transfer_edges_chord"].find({}, {"_id": 0, "from": 1, "to": 1, "count": 1})
+        cursor = db["transfer_edges_chord"].find({}, _PROJECTION)
         edges = list(cursor)
 
-        if not edges:
-            return {"nodes": [], "links": []}
+        return _build_chord(edges)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
 
-        names = set()
-        for e in edges:
-            names.add(e["from"])  
-            names.add(e["to"])    
 
-        nodes = sorted(names)
-        links = [{"source": e["from"], "target": e["to"], "value": e["count"]} for e in edges]
+@router.get("/hospital-transfers-chord")
+@sync_fallback(get_hospital_transfers_chord_sync)
+@_CACHE
+async def get_hospital_transfers_chord():
+    try:
+        db = get_async_db()
+        edges = await db["transfer_edges_chord"].find({}, _PROJECTION).to_list()
 
-        return {"nodes": nodes, "links": links}
+        return _build_chord(edges)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
@@ -1,12 +1,63 @@
 from fastapi import APIRouter, HTTPException
-from app.utils.mongo import get_db
+from app.utils.mongo import get_db, get_async_db, sync_fallback
+from app.utils.response_cache import cached_response
 import math
 
 router = APIRouter()
 
+# Se invalida cuando los scripts de preagregación marcan una nueva versión;
+# el navegador revalida con ETag/Last-Modified (304 sin leer Mongo)
+_CACHE = cached_response(
+    "medications_sunburst",
+    ["prescription_counts_by_route"],
+    cache_control="public, max-age=300, stale-while-revalidate=86400",
+)
 
-@router.get("/medications-sunburst")
-def get_medications_sunburst():
+_PROJECTION = {"_id": 1, "total": 1, "drugs": 1}
+
+
+def _to_safe_int(value):
+    try:
+        if isinstance(value, (int,)):
+            return int(value)
+        if isinstance(value, float):
+            return int(value) if math.isfinite(value) else 0
+        return int(value)
+    except Exception:
+        return 0
+
+
+def _to_safe_str(value):
+    try:
+        if value is None:
+            return "Unknown"
+        return str(value)
+    except Exception:
+        return "Unknown"
+
+
+def _build_sunburst(docs: list) -> dict:
+    data = []
+    for doc in docs:
+        route = _to_safe_str(doc.get("_id"))
+        total = _to_safe_int(doc.get("total"))
+        raw_drugs = doc.get("drugs", []) or []
+        drugs = []
+        for d in raw_drugs:
+            name = _to_safe_str(d.get("drug"))
+            count = _to_safe_int(d.get("count"))
+            drugs.append({"drug": name, "count": count})
+        data.append({"route": route, "total": total, "drugs": drugs})
+
+    return {
+        "data": data,
+        "total_routes": len(data),
+        "description": "Prescripciones agrupadas por via",
+    }
+
+
+@_CACHE
+def get_medications_sunburst_sync():
     """
     Devuelve datos preagregados para sunburst de medicamentos por vía (route).
     Lee de la colección `prescription_counts_by_route`.
@@ -14,46 +65,29 @@ def get_medications_sunburst():
     try:
         db = get_db()
 
-        cursor = db["prescription_counts_by_route"].find(
-            {}, {"_id": 1, "total": 1, "drugs": 1}
-        )
+        cursor = db["prescription_counts_by_route"].find({}, _PROJECTION)
         docs = list(cursor)
 
-        def to_safe_int(value):
-            try:
-                if isinstance(value, (int,)):
-                    return int(value)
-                if isinstance(value, float):
-                    return int(value) if math.isfinite(value) else 0
-                return int(value)
-            except Exception:
-                return 0
-
-        def to_safe_str(value):
-            try:
-                if value is None:
-                    return "Unknown"
-                return str(value)
-            except Exception:
-                return "Unknown"
-
-        data = []
-        for doc in docs:
-            route = to_safe_str(doc.get("_id"))
-            total = to_safe_int(doc.get("total"))
-            raw_drugs = doc.get("drugs", []) or []
-            drugs = []
-            for d in raw_drugs:
-                name = to_safe_str(d.get("drug"))
-                count = to_safe_int(d.get("count"))
-                drugs.append({"drug": name, "count": count})
-            data.append({"route": route, "total": total, "drugs": drugs})
-
-        return {
-            "data": data,
-            "total_routes": len(data),
-            "description": "Prescripciones agrupadas por via",
-        }
+        return _build_sunburst(docs)
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/medications-sunburst")
+@sync_fallback(get_medications_sunburst_sync)
+@_CACHE
+async def get_medications_sunburst():
+    """
+    Devuelve datos preagregados para sunburst de medicamentos por vía (route).
+    Lee de la colección `prescription_counts_by_route`.
+    """
+    try:
+        db = get_async_db()
+
+        docs = await db["prescription_counts_by_route"].find({}, _PROJECTION).to_list()
+
+        return _build_sunburst(docs)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
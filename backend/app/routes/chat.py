@@ -5,6 +5,7 @@ import os
 import asyncio
 from dotenv import load_dotenv
 from pathlib import Path
+from app.utils.metrics import observe_openai
 
 # Ruta absoluta al archivo .env basada en la ubicacion de este archivo
 env_path = Path(__file__).parent.parent / ".env"
@@ -58,6 +59,7 @@ async def chat(request: dict):
     - icu_d_items: ICU chart event item definitions
     - hosp_d_hcpcs: HCPCS code definitions
     - icd_equivalencias: ICD code equivalencies
+    (To translate codes or itemids into descriptions use the lookup_codes tool instead of querying these collections)
 
     ## ORDERS & WORKFLOW:
     - hosp_poe: Provider order entry (orders placed by physicians)
@@ -109,13 +111,16 @@ async def chat(request: dict):
 
     async def stream():
         print("⏳ Iniciando procesamiento con keep-alive")
-        task = asyncio.create_task(asyncio.to_thread(
-            client.responses.create,
-            # model="gpt-4.1",
-            model="gpt-5",
-            input=input_messages,
-            tools=mcp_tools
-        ))
+        def create_response():
+            with observe_openai("chat"):
+                return client.responses.create(
+                    # model="gpt-4.1",
+                    model="gpt-5",
+                    input=input_messages,
+                    tools=mcp_tools
+                )
+
+        task = asyncio.create_task(asyncio.to_thread(create_response))
         try:
             while not task.done():
                 # Enviar un pequeño keep-alive para que la conexión no esté idle
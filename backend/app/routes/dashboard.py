@@ -1,20 +1,20 @@
 from fastapi import APIRouter, HTTPException
-from app.utils.mongo import get_db
+from app.utils.mongo import get_db, get_async_db, sync_fallback
+from app.utils.response_cache import cached_response
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
-@router.get("/stats")
-def get_dashboard_stats():
-    """
-    Obtiene las estadísticas del dashboard categorizadas desde la colección pre-calculada.
-    Súper rápido porque lee datos ya calculados.
-    """
-    # Conectar a la base de datos completa
-    db = get_db()
-    
-    # Leer estadísticas categorizadas pre-calculadas
-    cached_stats = db["dashboard_stats_categorized"].find_one({"_id": "main"})
-    
+# Se invalida cuando los scripts de preagregación marcan una nueva versión;
+# el navegador revalida con ETag/Last-Modified (304 sin leer Mongo)
+_CACHE = cached_response(
+    "dashboard_stats",
+    ["dashboard_stats_categorized"],
+    cache_control="public, max-age=60, stale-while-revalidate=600",
+)
+
+
+def _stats_response(cached_stats):
+    """Formatea el documento pre-calculado o lanza 503 si no existe."""
     if cached_stats and "categories" in cached_stats:
         # Devolver estadísticas categorizadas
         return {
@@ -26,4 +26,32 @@ def get_dashboard_stats():
         raise HTTPException(
             status_code=503, 
             detail="Estadísticas categorizadas no disponibles. Ejecuta calculate_categorized_dashboard_stats.py primero."
-        )
\ No newline at end of file
+        )
+
+
+@_CACHE
+def get_dashboard_stats_sync():
+    """
+    Obtiene las estadísticas del dashboard categorizadas desde la colección pre-calculada.
+    Súper rápido porque lee datos ya calculados.
+    """
+    # Conectar a la base de datos completa
+    db = get_db()
+    
+    # Leer estadísticas categorizadas pre-calculadas
+    cached_stats = db["dashboard_stats_categorized"].find_one({"_id": "main"})
+    
+    return _stats_response(cached_stats)
+
+
+@router.get("/stats")
+@sync_fallback(get_dashboard_stats_sync)
+@_CACHE
+async def get_dashboard_stats():
+    """
+    Obtiene las estadísticas del dashboard categorizadas desde la colección pre-calculada.
+    Versión asíncrona (no ocupa un hilo del threadpool mientras espera a Mongo).
+    """
+    db = get_async_db()
+    cached_stats = await db["dashboard_stats_categorized"].find_one({"_id": "main"})
+    return _stats_response(cached_stats)
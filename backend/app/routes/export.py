@@ -0,0 +1,134 @@
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from app.utils import export
+from app.utils.cohort import SEARCH_COLLECTION, search_filter
+from app.utils.export import (
+    EXPORT_BATCH_SIZE,
+    EXPORT_BATCH_SIZE_MAX,
+    EXPORT_COMPRESSIONS,
+    EXPORT_FORMATS,
+    check_filter,
+    cohort_batches,
+    combine_filters,
+    cursor_batches,
+    export_columns,
+    limit_batches,
+    stream_export,
+)
+from app.utils.mongo import get_db
+from app.utils.response_cache import build_versions
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+class CohortFilters(BaseModel):
+    """Filtros de "cohort": los de /api/patients/search con sus mismas restricciones."""
+
+    # strict: los tipos JSON deben coincidir (sin convertir "5" en 5 ni "true" en True)
+    model_config = ConfigDict(extra="forbid", strict=True)
+
+    gender: Annotated[str, Field(pattern="^[MFmf]$")] | None = None
+    age_min: Annotated[int, Field(ge=0)] | None = None
+    age_max: Annotated[int, Field(ge=0)] | None = None
+    admission_type: list[str] | None = None
+    icu: bool | None = None
+    icd: str | None = None
+    icd_prefix: bool = False
+    careunit: list[str] | None = None
+
+
+# Claves admitidas en "cohort" (las mismas que /api/patients/search)
+COHORT_FILTERS = tuple(CohortFilters.model_fields)
+
+
+def _int_option(request: dict, key: str, default, maximum: int | None = None):
+    value = request.get(key, default)
+    if value is None:
+        return None
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1 or (maximum and value > maximum):
+        limit = f" entre 1 y {maximum}" if maximum else " positivo"
+        raise HTTPException(status_code=400, detail=f"{key} debe ser un entero{limit}")
+    return value
+
+
+def _cohort_ids(db, cohort: dict):
+    """subject_id de la cohorte en orden, leídos de patient_search por lotes."""
+    unknown = [key for key in cohort if key not in COHORT_FILTERS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Filtros de cohorte desconocidos: {', '.join(unknown)}")
+    if SEARCH_COLLECTION not in build_versions(db):
+        raise HTTPException(
+            status_code=503,
+            detail="Cohortes no disponibles: ejecuta scripts/{demo,full}/build_patient_search.py",
+        )
+    try:
+        filters = CohortFilters.model_validate(cohort)
+    except ValidationError as e:
+        detail = "; ".join(f"cohort.{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        raise HTTPException(status_code=400, detail=detail)
+    query = search_filter(**filters.model_dump())
+    cursor = db[SEARCH_COLLECTION].find(query, {"_id": 1}, batch_size=export.EXPORT_COHORT_CHUNK).sort("_id", 1)
+    return query, (doc["_id"] for doc in cursor)
+
+
+@router.post("")
+def export_collection(request: dict):
+    """
+    Exporta una colección en Arrow IPC (stream) o Parquet, leyendo de un cursor por
+    lotes y escribiendo un record batch (o row group) por lote: la memoria queda
+    acotada por batch_size. Cuerpo:
+      collection: colección de EXPORT_SCHEMAS (el esquema de columnas sale de ahí)
+      filter: filtro Mongo (opcional)
+      projection: lista de campos (opcional, por defecto todos los del esquema)
+      cohort: filtros de /api/patients/search (opcional), restringe a esos pacientes
+      format: "arrow" | "parquet"; compression: "zstd" | "lz4" | "none"
+      limit, batch_size: opcionales
+    """
+    if export.pa is None:
+        raise HTTPException(status_code=501, detail="Exportación no disponible: instala pyarrow")
+
+    collection = request.get("collection")
+    fmt = request.get("format", "arrow")
+    compression = request.get("compression", "zstd")
+    query = request.get("filter") or {}
+    projection = request.get("projection")
+    cohort = request.get("cohort")
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de {', '.join(EXPORT_FORMATS)}")
+    if compression not in EXPORT_COMPRESSIONS:
+        raise HTTPException(status_code=400, detail=f"compression debe ser uno de {', '.join(EXPORT_COMPRESSIONS)}")
+    if not isinstance(query, dict):
+        raise HTTPException(status_code=400, detail="filter debe ser un objeto")
+    if projection is not None and (not isinstance(projection, list) or not all(isinstance(f, str) for f in projection)):
+        raise HTTPException(status_code=400, detail="projection debe ser una lista de campos")
+    if cohort is not None and not isinstance(cohort, dict):
+        raise HTTPException(status_code=400, detail="cohort debe ser un objeto")
+    limit = _int_option(request, "limit", None)
+    batch_size = _int_option(request, "batch_size", EXPORT_BATCH_SIZE, EXPORT_BATCH_SIZE_MAX)
+    try:
+        columns = export_columns(collection, projection)
+        check_filter(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    db = get_db()
+    mongo_projection = {"_id": 0, **{field: 1 for field in columns}}
+    if cohort is None:
+        batches = cursor_batches(db[collection].find(query, mongo_projection, batch_size=batch_size), batch_size)
+    else:
+        cohort_query, subject_ids = _cohort_ids(db, cohort)
+        if collection == SEARCH_COLLECTION:
+            batches = cursor_batches(
+                db[collection].find(combine_filters(query, cohort_query), mongo_projection, batch_size=batch_size), batch_size
+            )
+        else:
+            batches = cohort_batches(db, collection, query, mongo_projection, subject_ids, batch_size)
+
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        stream_export(limit_batches(batches, limit), columns, fmt, compression),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{collection}.{extension}"'},
+    )
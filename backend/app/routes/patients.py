@@ -1,158 +1,1022 @@
-from fastapi import APIRouter, HTTPException, Response
-from app.utils.mongo import get_db
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from bson import json_util
+from pymongo.errors import ExecutionTimeout
+from app.utils.mongo import get_db, get_async_db, sync_fallback
+from app.utils.monitoring import add_timing, timed
+from app.utils.dictionaries import get_dictionaries, get_dictionaries_async
+from app.utils.cohort import SEARCH_COLLECTION, SEARCH_PROJECTION, search_filter
+from app.utils.downsample import DOWNSAMPLERS
+from app.utils.profiles import (
+    group_lab_summaries,
+    lab_summary_pipeline,
+    load_profile,
+    load_profile_async,
+    resolve_lab_summary,
+)
+from app.utils.response_cache import (
+    build_versions,
+    build_versions_async,
+    normalized_collections,
+    normalized_collections_async,
+)
+from app.utils.sanitize import sanitize_document, sanitize_documents
+from app.utils.subjects import get_subject_index, get_subject_index_async
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timezone
+from time import perf_counter
+import asyncio
+import base64
+import contextvars
+import logging
 import math
+import orjson
+import os
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/patients", tags=["patients"])
 
-def clean_data(obj):
-    """Limpia valores NaN, null y ObjectId de los datos"""
-    if isinstance(obj, dict):
-        cleaned = {}
-        for key, value in obj.items():
-            if key == "_id":  # Excluir _id de MongoDB
-                continue
-            cleaned_value = clean_data(value)
-            if cleaned_value is not None:  # Solo incluir valores válidos
-                cleaned[key] = cleaned_value
-        return cleaned
-    elif isinstance(obj, list):
-        return [clean_data(item) for item in obj if clean_data(item) is not None]
-    elif isinstance(obj, float):
-        if math.isnan(obj) or math.isinf(obj):
-            return None  # Convertir NaN/Inf a None
-        return obj
-    elif obj == "NaN" or obj == "nan":
-        return None  # Convertir strings NaN a None
-    else:
-        return obj
+# Existencia de pacientes desde el índice de subject_id en memoria (app.utils.subjects).
+# Si hosp_patients no tiene versión de build, los "no existe" se confirman en Mongo.
+EXISTS_MAX_IDS = int(os.getenv("EXISTS_MAX_IDS", "10000"))
+
+def _exists_in_index(index, subject_id: int) -> bool | None:
+    """True/False si el índice lo resuelve; None si hay que confirmarlo en Mongo."""
+    if subject_id in index:
+        return True
+    return False if index.authoritative else None
+
+def _exists_ids(request: dict) -> list[int]:
+    subject_ids = request.get("subject_ids")
+    if not isinstance(subject_ids, list) or not all(isinstance(s, int) and not isinstance(s, bool) for s in subject_ids):
+        raise HTTPException(status_code=400, detail="subject_ids debe ser una lista de enteros")
+    if len(subject_ids) > EXISTS_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Como máximo {EXISTS_MAX_IDS} subject_ids por petición")
+    return list(dict.fromkeys(subject_ids))
+
+def _exists_split(index, subject_ids: list[int]) -> tuple[list[int], list[int]]:
+    """(encontrados, pendientes de confirmar en Mongo)"""
+    found, unconfirmed = [], []
+    for subject_id in subject_ids:
+        exists = _exists_in_index(index, subject_id)
+        if exists:
+            found.append(subject_id)
+        elif exists is None:
+            unconfirmed.append(subject_id)
+    return found, unconfirmed
+
+def _exists_response(subject_ids: list[int], found: set) -> dict:
+    return {
+        "found": [s for s in subject_ids if s in found],
+        "missing": [s for s in subject_ids if s not in found],
+    }
+
+def patient_exists_head_sync(subject_id: int):
+    """Comprueba si existe un paciente por subject_id (HEAD 200/404)."""
+    with timed("exists"):
+        exists = _exists_in_index(get_subject_index(), subject_id)
+    if exists is None:
+        exists = get_db()["hosp_patients"].find_one({"subject_id": subject_id}, {"_id": 1}) is not None
+    if not exists:
+        raise HTTPException(status_code=404, detail="Paciente no encontrado")
+    return Response(status_code=200)
 
 @router.head("/{subject_id}/exists")
-def patient_exists_head(subject_id: int):
+@sync_fallback(patient_exists_head_sync)
+async def patient_exists_head(subject_id: int):
     """Comprueba si existe un paciente por subject_id (HEAD 200/404)."""
-    db = get_db()
-    exists = db["hosp_patients"].find_one({"subject_id": subject_id}, {"_id": 1}) is not None
+    db = get_async_db()
+    with timed("exists"):
+        exists = _exists_in_index(await get_subject_index_async(db), subject_id)
+    if exists is None:
+        exists = await db["hosp_patients"].find_one({"subject_id": subject_id}, {"_id": 1}) is not None
     if not exists:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
     return Response(status_code=200)
 
-@router.get("/{subject_id}")
-def get_patient(subject_id: int):
-    """Obtiene información completa de un paciente"""
+def patients_exist_sync(request: dict):
+    """Comprueba en bloque qué subject_id existen: {"subject_ids": [...]} -> {found, missing}"""
+    subject_ids = _exists_ids(request)
+    with timed("exists"):
+        found, unconfirmed = _exists_split(get_subject_index(), subject_ids)
+    if unconfirmed:
+        cursor = get_db()["hosp_patients"].find({"subject_id": {"$in": unconfirmed}}, {"_id": 0, "subject_id": 1})
+        found += [doc["subject_id"] for doc in cursor]
+    return _exists_response(subject_ids, set(found))
+
+@router.post("/exists")
+@sync_fallback(patients_exist_sync)
+async def patients_exist(request: dict):
+    """Comprueba en bloque qué subject_id existen: {"subject_ids": [...]} -> {found, missing}"""
+    subject_ids = _exists_ids(request)
+    db = get_async_db()
+    with timed("exists"):
+        found, unconfirmed = _exists_split(await get_subject_index_async(db), subject_ids)
+    if unconfirmed:
+        cursor = db["hosp_patients"].find({"subject_id": {"$in": unconfirmed}}, {"_id": 0, "subject_id": 1})
+        found += [doc["subject_id"] async for doc in cursor]
+    return _exists_response(subject_ids, set(found))
+
+# Búsqueda de cohortes sobre patient_search (atributos precalculados por paciente,
+# scripts/*/build_patient_search.py). Orden y paginación por subject_id (_id).
+SEARCH_PAGE_DEFAULT = 50
+SEARCH_PAGE_MAX = 500
+# El total se cuenta hasta este límite (total_exact=false si se alcanza)
+SEARCH_COUNT_LIMIT = int(os.getenv("SEARCH_COUNT_LIMIT", "100000"))
+SEARCH_BUDGET_MS = int(os.getenv("SEARCH_BUDGET_MS", "5000"))
+
+def _search_query(versions: dict, after: int | None, **filters) -> tuple[dict, dict]:
+    if SEARCH_COLLECTION not in versions:
+        raise HTTPException(
+            status_code=503,
+            detail="Búsqueda no disponible: ejecuta scripts/{demo,full}/build_patient_search.py",
+        )
+    query = search_filter(**filters)
+    page_query = {**query, "_id": {"$gt": after}} if after is not None else query
+    return query, page_query
+
+def _search_total(total: int | None, estimated: bool) -> dict:
+    if total is None:
+        return {"total": None, "total_exact": None}
+    return {"total": total, "total_exact": not estimated and total < SEARCH_COUNT_LIMIT}
+
+def _search_page(docs: list, limit: int, totals: dict) -> dict:
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    return {
+        "patients": docs,
+        "count": len(docs),
+        **totals,
+        "next_cursor": docs[-1]["subject_id"] if has_more else None,
+    }
+
+def search_patients_sync(
+    gender: str | None = Query(None, pattern="^[MFmf]$"),
+    age_min: int | None = Query(None, ge=0),
+    age_max: int | None = Query(None, ge=0),
+    admission_type: list[str] | None = Query(None, description="Uno o varios admission_type (p.ej. 'EW EMER.')"),
+    icu: bool | None = Query(None, description="Con (true) o sin (false) estancias en UCI"),
+    icd: str | None = Query(None, description="Código ICD de diagnóstico (sin punto)"),
+    icd_prefix: bool = Query(False, description="Interpretar icd como prefijo"),
+    careunit: list[str] | None = Query(None, description="Una o varias careunit de hosp_transfers"),
+    limit: int = Query(SEARCH_PAGE_DEFAULT, ge=1, le=SEARCH_PAGE_MAX),
+    cursor: int | None = Query(None, description="next_cursor de la página anterior"),
+):
+    """Cohorte de pacientes por atributos precalculados; el total solo se calcula en la primera página"""
     db = get_db()
-    
-    # Buscar datos básicos del paciente
-    patient = db["hosp_patients"].find_one({"subject_id": subject_id})
+    query, page_query = _search_query(
+        build_versions(db), cursor, gender=gender, age_min=age_min, age_max=age_max, admission_type=admission_type,
+        icu=icu, icd=icd, icd_prefix=icd_prefix, careunit=careunit,
+    )
+    collection = db[SEARCH_COLLECTION]
+    with timed("search"):
+        docs = list(
+            collection.find(page_query, SEARCH_PROJECTION).sort("_id", 1).limit(limit + 1).max_time_ms(SEARCH_BUDGET_MS)
+        )
+    totals = _search_total(None, False)
+    if cursor is None:
+        with timed("count"):
+            if query:
+                totals = _search_total(
+                    collection.count_documents(query, limit=SEARCH_COUNT_LIMIT, maxTimeMS=SEARCH_BUDGET_MS), False
+                )
+            else:
+                totals = _search_total(collection.estimated_document_count(), True)
+    return _search_page(docs, limit, totals)
+
+@router.get("/search")
+@sync_fallback(search_patients_sync)
+async def search_patients(
+    gender: str | None = Query(None, pattern="^[MFmf]$"),
+    age_min: int | None = Query(None, ge=0),
+    age_max: int | None = Query(None, ge=0),
+    admission_type: list[str] | None = Query(None, description="Uno o varios admission_type (p.ej. 'EW EMER.')"),
+    icu: bool | None = Query(None, description="Con (true) o sin (false) estancias en UCI"),
+    icd: str | None = Query(None, description="Código ICD de diagnóstico (sin punto)"),
+    icd_prefix: bool = Query(False, description="Interpretar icd como prefijo"),
+    careunit: list[str] | None = Query(None, description="Una o varias careunit de hosp_transfers"),
+    limit: int = Query(SEARCH_PAGE_DEFAULT, ge=1, le=SEARCH_PAGE_MAX),
+    cursor: int | None = Query(None, description="next_cursor de la página anterior"),
+):
+    """Cohorte de pacientes por atributos precalculados; el total solo se calcula en la primera página"""
+    db = get_async_db()
+    query, page_query = _search_query(
+        await build_versions_async(db), cursor, gender=gender, age_min=age_min, age_max=age_max,
+        admission_type=admission_type, icu=icu, icd=icd, icd_prefix=icd_prefix, careunit=careunit,
+    )
+    collection = db[SEARCH_COLLECTION]
+    page = collection.find(page_query, SEARCH_PROJECTION).sort("_id", 1).limit(limit + 1).max_time_ms(SEARCH_BUDGET_MS)
+    if cursor is not None:
+        return _search_page(await page.to_list(), limit, _search_total(None, False))
+    # Página y total a la vez
+    if query:
+        count = collection.count_documents(query, limit=SEARCH_COUNT_LIMIT, maxTimeMS=SEARCH_BUDGET_MS)
+    else:
+        count = collection.estimated_document_count()
+    with timed("search"):
+        docs, total = await asyncio.gather(page.to_list(), count)
+    return _search_page(docs, limit, _search_total(total, not query))
+
+# Las descripciones (ICD, d_labitems) se resuelven en Python con app.utils.dictionaries
+_DIAGNOSES_SORT = [("hadm_id", 1), ("seq_num", 1)]
+_PROCEDURES_SORT = [("hadm_id", 1), ("chartdate", -1), ("seq_num", 1)]
+_LABEVENTS_SORT = [("charttime", -1)]
+
+def _resolve_descriptions(dicts, diagnoses, procedures, labevents):
+    """
+    Añade description a diagnósticos/procedimientos y label/fluid/category a los
+    labevents. Solo se añaden los valores encontrados, para no ensuciar documentos
+    que ya vienen limpios.
+    """
+    with timed("dictionaries"):
+        for diagnosis in diagnoses:
+            description = dicts.icd_diagnosis(diagnosis.get("icd_code"), diagnosis.get("icd_version"))
+            if description is not None:
+                diagnosis["description"] = description
+        for procedure in procedures:
+            description = dicts.icd_procedure(procedure.get("icd_code"), procedure.get("icd_version"))
+            if description is not None:
+                procedure["description"] = description
+        for ev in labevents:
+            item = dicts.labitems.get(ev.get("itemid"))
+            if item is not None:
+                for field, value in zip(("label", "fluid", "category"), item):
+                    if value is not None:
+                        ev[field] = value
+
+# Selección de secciones (include=) y campos (fields=sección.campo) de /{subject_id}.
+# labevents y lab_summary van anidados en cada ingreso, así que implican admissions.
+# Sin include: paciente, ingresos (con labevents), diagnósticos y procedimientos,
+# siempre en vivo. El perfil materializado solo sirve un include explícito sin
+# labevents, para que la forma de la respuesta no dependa de si se ha construido.
+PATIENT_SECTIONS = ("patient", "admissions", "diagnoses", "procedures", "labevents", "lab_summary")
+_DEFAULT_SECTIONS = frozenset(("patient", "admissions", "diagnoses", "procedures", "labevents"))
+_NESTED_SECTIONS = ("labevents", "lab_summary")
+# Campos que se leen aunque no se pidan (anidado por hadm_id y descripciones) y se quitan al final
+_HELPER_FIELDS = {
+    "patient": ("subject_id",),
+    "admissions": ("hadm_id",),
+    "diagnoses": ("icd_code", "icd_version"),
+    "procedures": ("icd_code", "icd_version"),
+    "labevents": ("hadm_id", "itemid"),
+    "lab_summary": (),
+}
+
+def _split_values(values: list[str] | None) -> list[str]:
+    return [part.strip() for value in values or [] for part in value.split(",") if part.strip()]
+
+def _patient_selection(include: list[str] | None, fields: list[str] | None) -> tuple[frozenset | None, dict]:
+    """(secciones pedidas o None si no hay include, {sección: campos})"""
+    sections = None
+    if include:
+        sections = set(_split_values(include))
+        unknown = sections - set(PATIENT_SECTIONS)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Secciones desconocidas: {', '.join(sorted(unknown))} (disponibles: {', '.join(PATIENT_SECTIONS)})",
+            )
+        if sections & set(_NESTED_SECTIONS):
+            sections.add("admissions")
+        sections = frozenset(sections)
+    field_map: dict[str, frozenset] = {}
+    for path in _split_values(fields):
+        section, _, field = path.partition(".")
+        if section not in PATIENT_SECTIONS or not field:
+            raise HTTPException(status_code=400, detail=f"fields debe ser sección.campo: {path}")
+        field_map[section] = field_map.get(section, frozenset()) | {field}
+    return sections, field_map
+
+def _projection(section: str, field_map: dict) -> dict:
+    """Proyección que se envía a Mongo: solo los campos pedidos (más los auxiliares)."""
+    fields = field_map.get(section)
+    if not fields:
+        return {"_id": 0}
+    return {"_id": 0, **{field: 1 for field in (*fields, *_HELPER_FIELDS[section])}}
+
+def _trim(docs: list[dict], fields: frozenset | None, keep: tuple = ()):
+    """Quita los campos auxiliares que no se pidieron."""
+    if not fields:
+        return
+    for doc in docs:
+        for key in [k for k in doc if k not in fields and k not in keep]:
+            del doc[key]
+
+def _build_patient_response(
+    sections: dict, requested: frozenset, field_map: dict, errors=None, normalized=frozenset()
+) -> dict:
+    """
+    Limpia cada documento una sola vez, anida labevents / lab_summary por ingreso
+    (hadm_id) y deja solo las secciones y campos pedidos.
+    """
+    patient = sections["patient"]
+    admissions = sections.get("admissions", [])
+    with timed("sanitize"):
+        if "hosp_patients" not in normalized:
+            sanitize_document(patient, "hosp_patients")
+        sanitize_documents(admissions, "hosp_admissions", normalized)
+        sanitize_documents(sections.get("diagnoses", []), "hosp_diagnoses_icd", normalized)
+        sanitize_documents(sections.get("procedures", []), "hosp_procedures_icd", normalized)
+        sanitize_documents(sections.get("labevents", []), "hosp_labevents", normalized)
+
+    # Mapear labevents por hadm_id
+    if "labevents" in requested:
+        hadm_to_labs = {}
+        for ev in sections.get("labevents", []):
+            key = ev.get("hadm_id")
+            if key is None:
+                continue
+            hadm_to_labs.setdefault(key, []).append(ev)
+        _trim(sections.get("labevents", []), field_map.get("labevents"))
+        for admission in admissions:
+            admission["labevents"] = hadm_to_labs.get(admission.get("hadm_id"), [])
+    if "lab_summary" in requested:
+        summaries = sections.get("lab_summary", {})
+        for admission in admissions:
+            admission["lab_summary"] = summaries.get(admission.get("hadm_id"), [])
+            _trim(admission["lab_summary"], field_map.get("lab_summary"))
+
+    response = {}
+    for name in ("patient", "admissions", "diagnoses", "procedures"):
+        if name not in requested:
+            continue
+        docs = [patient] if name == "patient" else sections.get(name, [])
+        _trim(docs, field_map.get(name), keep=_NESTED_SECTIONS if name == "admissions" else ())
+        response[name] = patient if name == "patient" else docs
+    # Secciones omitidas por timeout o error: {sección: "timeout" | "error"}
+    if errors:
+        response["errors"] = errors
+    return response
+
+def _profile_selection(profile: dict, requested: frozenset, field_map: dict) -> dict:
+    """Respuesta del perfil materializado recortada a las secciones y campos pedidos."""
+    admissions = profile.get("admissions", [])
+    if "lab_summary" not in requested:
+        for admission in admissions:
+            admission.pop("lab_summary", None)
+    else:
+        for admission in admissions:
+            _trim(admission.get("lab_summary", []), field_map.get("lab_summary"))
+    response = {}
+    for name in ("patient", "admissions", "diagnoses", "procedures"):
+        if name in requested:
+            docs = [profile[name]] if name == "patient" else profile.get(name, [])
+            _trim(docs, field_map.get(name), keep=_NESTED_SECTIONS if name == "admissions" else ())
+            response[name] = profile[name]
+    return response
+
+def _profile_sections(sections: frozenset | None) -> tuple | None:
+    """
+    Secciones del perfil a leer, o None si el perfil no puede servir la petición:
+    sin include (la respuesta por defecto lleva labevents) o con labevents.
+    """
+    if sections is None or "labevents" in sections:
+        return None
+    return tuple(name for name in ("patient", "admissions", "diagnoses", "procedures") if name in sections or name == "patient")
+
+def _skip_sections(requested: frozenset):
+    """Marca en Server-Timing las secciones cuya consulta no se lanza."""
+    for name in PATIENT_SECTIONS:
+        if name != "patient" and name not in requested:
+            add_timing(f"query.{name}", None, "skipped")
+
+# Las lecturas de la vista de paciente son independientes: se lanzan a la vez
+# (gather en async, pool acotado en síncrono), cada una con su presupuesto de tiempo
+# (maxTimeMS en el servidor y espera máxima en el cliente). Si falla cualquiera salvo
+# la del paciente, su sección se devuelve vacía y se indica en "errors".
+PATIENT_QUERY_BUDGET_MS = int(os.getenv("PATIENT_QUERY_BUDGET_MS", "10000"))
+PATIENT_QUERY_WORKERS = int(os.getenv("PATIENT_QUERY_WORKERS", "16"))
+_patient_executor = ThreadPoolExecutor(max_workers=PATIENT_QUERY_WORKERS, thread_name_prefix="patient-query")
+
+def _patient_cursors(db, subject_id: int, requested: frozenset = _DEFAULT_SECTIONS, field_map: dict | None = None) -> dict:
+    """Cursores de las secciones pedidas de la vista de paciente (sync o async según `db`)."""
+    field_map = field_map or {}
+    query = {"subject_id": subject_id}
+    specs = {
+        "admissions": ("hosp_admissions", [("admittime", -1)]),
+        "diagnoses": ("hosp_diagnoses_icd", _DIAGNOSES_SORT),
+        "procedures": ("hosp_procedures_icd", _PROCEDURES_SORT),
+        "labevents": ("hosp_labevents", _LABEVENTS_SORT),
+    }
+    return {
+        name: db[collection].find(query, _projection(name, field_map)).sort(sort).max_time_ms(PATIENT_QUERY_BUDGET_MS)
+        for name, (collection, sort) in specs.items()
+        if name in requested
+    }
+
+def _patient_projection(requested: frozenset, field_map: dict) -> dict:
+    # Sin la sección patient solo se comprueba que exista
+    return _projection("patient", field_map) if "patient" in requested else {"_id": 0, "subject_id": 1}
+
+def _lab_summary_by_admission(dicts, rows: list) -> dict:
+    """{hadm_id: [resumen por test]} a partir del $group de lab_summary_pipeline."""
+    return {
+        hadm_id: resolve_lab_summary(dicts, summaries)
+        for (_, hadm_id), summaries in group_lab_summaries(rows).items()
+    }
+
+def _query_status(error: BaseException | None) -> str:
+    if error is None:
+        return "ok"
+    if isinstance(error, (TimeoutError, FuturesTimeoutError, ExecutionTimeout)):
+        return "timeout"
+    return "error"
+
+def _record_query(name: str, start: float, error: BaseException | None = None):
+    add_timing(f"query.{name}", (perf_counter() - start) * 1000, _query_status(error))
+
+def _collect_sections(results: dict) -> tuple[dict, dict]:
+    """
+    Separa resultados y fallos: (secciones, errores). El paciente es obligatorio
+    (404 si no existe, 503 si su lectura falla); el resto se degrada a lista vacía.
+    """
+    patient = results.pop("patient")
+    if isinstance(patient, BaseException):
+        logger.warning(f"Lectura del paciente fallida: {patient!r}")
+        raise HTTPException(status_code=503, detail="No se pudo leer el paciente")
     if not patient:
         raise HTTPException(status_code=404, detail="Paciente no encontrado")
-    
-    # Buscar historial de ingresos (ordenado de más reciente a más antiguo)
-    admissions = list(
-        db["hosp_admissions"]
-        .find({"subject_id": subject_id})
-        .sort("admittime", -1)
+    sections = {"patient": patient}
+    errors = {}
+    for name, value in results.items():
+        if isinstance(value, BaseException):
+            errors[name] = _query_status(value)
+            logger.warning(f"Sección {name} del paciente {patient.get('subject_id')} omitida: {value!r}")
+            value = []
+        sections[name] = value
+    return sections, errors
+
+def _run_patient_query(name: str, fn):
+    start = perf_counter()
+    try:
+        result = fn()
+    except Exception as e:
+        _record_query(name, start, e)
+        raise
+    _record_query(name, start)
+    return result
+
+# Variante NDJSON de /{subject_id} (Accept: application/x-ndjson): una línea
+# {"section": ..., "data": ...} por lote, según llegan de su cursor, en el orden
+# patient, admissions, diagnoses, procedures, lab_summary ({hadm_id: [...]}) y
+# labevents; al final "errors" (si alguna sección falló) y "end". Una sección
+# puede ocupar varias líneas: el cliente concatena sus "data" y anida por hadm_id.
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+PATIENT_STREAM_BATCH = int(os.getenv("PATIENT_STREAM_BATCH", "1000"))
+_STREAM_SECTIONS = ("admissions", "diagnoses", "procedures", "lab_summary", "labevents")
+_SECTION_COLLECTIONS = {
+    "admissions": "hosp_admissions",
+    "diagnoses": "hosp_diagnoses_icd",
+    "procedures": "hosp_procedures_icd",
+    "labevents": "hosp_labevents",
+}
+
+def _wants_ndjson(accept: str | None) -> bool:
+    return accept is not None and NDJSON_MEDIA_TYPE in accept
+
+def _ndjson_line(section: str, data) -> bytes:
+    return orjson.dumps({"section": section, "data": data}, default=str, option=orjson.OPT_NON_STR_KEYS) + b"\n"
+
+def _stream_batch(dicts, name: str, docs: list, field_map: dict, normalized: frozenset) -> bytes:
+    """Lote de una sección listo para enviar: limpio, con descripciones y recortado (hadm_id se conserva)."""
+    sanitize_documents(docs, _SECTION_COLLECTIONS[name], normalized)
+    _resolve_descriptions(
+        dicts,
+        docs if name == "diagnoses" else [],
+        docs if name == "procedures" else [],
+        docs if name == "labevents" else [],
     )
-    
-    # Buscar diagnósticos con descripciones
-    diagnoses_pipeline = [
-        {"$match": {"subject_id": subject_id}},
-        {"$lookup": {
-            "from": "hosp_d_icd_diagnoses",
-            "let": {"code": "$icd_code", "version": "$icd_version"},
-            "pipeline": [
-                {"$match": {"$expr": {"$and": [
-                    {"$eq": [{"$toString": "$icd_code"}, "$$code"]},
-                    {"$eq": ["$icd_version", "$$version"]}
-                ]}}}
-            ],
-            "as": "description"
-        }},
-        {"$addFields": {
-            "description": {"$arrayElemAt": ["$description.long_title", 0]}
-        }},
-        {"$sort": {"hadm_id": 1, "seq_num": 1}}
-    ]
-    
-    diagnoses = list(db["hosp_diagnoses_icd"].aggregate(diagnoses_pipeline))
-    
-    # Buscar procedimientos con descripciones
-    procedures_pipeline = [
-        {"$match": {"subject_id": subject_id}},
-        {"$lookup": {
-            "from": "hosp_d_icd_procedures",
-            "let": {"code": "$icd_code", "version": "$icd_version"},
-            "pipeline": [
-                {"$match": {"$expr": {"$and": [
-                    {"$eq": [{"$toString": "$icd_code"}, "$$code"]},
-                    {"$eq": ["$icd_version", "$$version"]}
-                ]}}}
-            ],
-            "as": "description"
-        }},
-        {"$addFields": {
-            "description": {"$arrayElemAt": ["$description.long_title", 0]}
-        }},
-        {"$sort": {"hadm_id": 1, "chartdate": -1, "seq_num": 1}}
-    ]
-    procedures = list(db["hosp_procedures_icd"].aggregate(procedures_pipeline))
-    
-    # Obtener todos los eventos de laboratorio del paciente y anidarlos por ingreso (hadm_id)
-    labevents_pipeline = [
-        {"$match": {"subject_id": subject_id}},
-        {"$lookup": {
-            "from": "hosp_d_labitems",
-            "localField": "itemid",
-            "foreignField": "itemid",
-            "as": "item"
-        }},
-        {"$addFields": {
-            "label": {"$arrayElemAt": ["$item.label", 0]},
-            "fluid": {"$arrayElemAt": ["$item.fluid", 0]},
-            "category": {"$arrayElemAt": ["$item.category", 0]}
-        }},
-        {"$project": {"item": 0}},
-        {"$sort": {"charttime": -1}}
-    ]
-    labevents = list(db["hosp_labevents"].aggregate(labevents_pipeline))
+    _trim(docs, field_map.get(name), keep=("hadm_id",) if name in ("admissions", "labevents") else ())
+    return _ndjson_line(name, docs)
 
-    # Mapear labevents por hadm_id
-    hadm_to_labs = {}
-    for ev in labevents:
-        key = ev.get("hadm_id")
-        if key is None:
+def _stream_patient_line(patient: dict, field_map: dict, normalized: frozenset) -> bytes:
+    if "hosp_patients" not in normalized:
+        sanitize_document(patient, "hosp_patients")
+    _trim([patient], field_map.get("patient"))
+    return _ndjson_line("patient", patient)
+
+def _stream_tail(errors: dict):
+    if errors:
+        yield _ndjson_line("errors", errors)
+    yield _ndjson_line("end", None)
+
+def _stream_profile(profile: dict, requested: frozenset, field_map: dict):
+    """Líneas NDJSON desde el perfil materializado (lab_summary sale de los ingresos a su sección)."""
+    summaries = {}
+    for admission in profile.get("admissions", []):
+        summary = admission.pop("lab_summary", [])
+        _trim(summary, field_map.get("lab_summary"))
+        summaries[admission.get("hadm_id")] = summary
+    yield _stream_patient_line(profile["patient"], field_map, frozenset(("hosp_patients",)))
+    for name in ("admissions", "diagnoses", "procedures"):
+        if name in requested:
+            docs = profile.get(name, [])
+            _trim(docs, field_map.get(name), keep=("hadm_id",) if name == "admissions" else ())
+            yield _ndjson_line(name, docs)
+    if "lab_summary" in requested:
+        yield _ndjson_line("lab_summary", summaries)
+    yield from _stream_tail({})
+
+def _ndjson_response(lines) -> StreamingResponse:
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
+
+def _stream_failed(name: str, subject_id: int, error: Exception, errors: dict):
+    errors[name] = _query_status(error)
+    logger.warning(f"Sección {name} del paciente {subject_id} cortada en el stream: {error!r}")
+
+def _stream_patient_sync(db, subject_id: int, patient: dict, requested: frozenset, field_map: dict, dicts, normalized):
+    """Generador NDJSON del camino en vivo: cada cursor se lee por lotes de PATIENT_STREAM_BATCH."""
+    yield _stream_patient_line(patient, field_map, normalized)
+    cursors = _patient_cursors(db, subject_id, requested, field_map)
+    errors = {}
+    for name in _STREAM_SECTIONS:
+        if name not in requested:
             continue
-        hadm_to_labs.setdefault(key, []).append(ev)
-
-    # Enriquecer admisiones con labevents
-    enriched_admissions = []
-    for admission in admissions:
-        adm = dict(admission)
-        adm["labevents"] = hadm_to_labs.get(adm.get("hadm_id"), [])
-        enriched_admissions.append(adm)
-
-    # Limpiar todos los datos
-    clean_patient = clean_data(patient)
-    clean_admissions = [clean_data(admission) for admission in enriched_admissions]
-    clean_diagnoses = [clean_data(diagnosis) for diagnosis in diagnoses]
-    clean_procedures = [clean_data(procedure) for procedure in procedures]
-    
+        start = perf_counter()
+        error = None
+        try:
+            if name == "lab_summary":
+                rows = list(db["hosp_labevents"].aggregate(
+                    lab_summary_pipeline({"subject_id": subject_id}), maxTimeMS=PATIENT_QUERY_BUDGET_MS
+                ))
+                yield _ndjson_line(name, _lab_summary_by_admission(dicts, rows))
+                continue
+            batch = []
+            sent = False
+            for doc in cursors[name].batch_size(PATIENT_STREAM_BATCH):
+                batch.append(doc)
+                if len(batch) >= PATIENT_STREAM_BATCH:
+                    yield _stream_batch(dicts, name, batch, field_map, normalized)
+                    batch, sent = [], True
+            if batch or not sent:
+                yield _stream_batch(dicts, name, batch, field_map, normalized)
+        except Exception as e:
+            error = e
+            _stream_failed(name, subject_id, e, errors)
+        finally:
+            _record_query(name, start, error)
+    yield from _stream_tail(errors)
+
+async def _stream_patient_async(db, subject_id: int, patient: dict, requested: frozenset, field_map: dict, dicts, normalized):
+    yield _stream_patient_line(patient, field_map, normalized)
+    cursors = _patient_cursors(db, subject_id, requested, field_map)
+    errors = {}
+    for name in _STREAM_SECTIONS:
+        if name not in requested:
+            continue
+        start = perf_counter()
+        error = None
+        try:
+            if name == "lab_summary":
+                rows = await _aggregate_to_list(
+                    db["hosp_labevents"], lab_summary_pipeline({"subject_id": subject_id}), maxTimeMS=PATIENT_QUERY_BUDGET_MS
+                )
+                yield _ndjson_line(name, _lab_summary_by_admission(dicts, rows))
+                continue
+            batch = []
+            sent = False
+            async for doc in cursors[name].batch_size(PATIENT_STREAM_BATCH):
+                batch.append(doc)
+                if len(batch) >= PATIENT_STREAM_BATCH:
+                    yield _stream_batch(dicts, name, batch, field_map, normalized)
+                    batch, sent = [], True
+            if batch or not sent:
+                yield _stream_batch(dicts, name, batch, field_map, normalized)
+        except Exception as e:
+            error = e
+            _stream_failed(name, subject_id, e, errors)
+        finally:
+            _record_query(name, start, error)
+    for line in _stream_tail(errors):
+        yield line
+
+_INCLUDE_DESCRIPTION = "Secciones separadas por comas: " + ", ".join(PATIENT_SECTIONS)
+_FIELDS_DESCRIPTION = "Campos por sección (sección.campo), p.ej. admissions.hadm_id,admissions.admittime"
+
+def get_patient_sync(
+    subject_id: int,
+    include: list[str] | None = Query(None, description=_INCLUDE_DESCRIPTION),
+    fields: list[str] | None = Query(None, description=_FIELDS_DESCRIPTION),
+    accept: str | None = Header(None),
+):
+    """
+    Obtiene información completa de un paciente (o solo las secciones y campos pedidos).
+    Con Accept: application/x-ndjson las secciones se envían por lotes según se leen.
+    """
+    db = get_db()
+    sections, field_map = _patient_selection(include, fields)
+    stream = _wants_ndjson(accept)
+
+    # Perfil materializado (scripts/*/build_patient_profiles.py): una sola lectura
+    profile_sections = _profile_sections(sections)
+    if profile_sections is not None:
+        profile = load_profile(db, subject_id, profile_sections)
+        if profile is not None:
+            _skip_sections(sections)
+            if stream:
+                return _ndjson_response(_stream_profile(profile, sections, field_map))
+            return _profile_selection(profile, sections, field_map)
+
+    requested = sections if sections is not None else _DEFAULT_SECTIONS
+    _skip_sections(requested)
+    if stream:
+        try:
+            patient = _run_patient_query("patient", lambda: db["hosp_patients"].find_one(
+                {"subject_id": subject_id}, _patient_projection(requested, field_map), max_time_ms=PATIENT_QUERY_BUDGET_MS
+            ))
+        except Exception as e:
+            patient = e
+        _collect_sections({"patient": patient})
+        return _ndjson_response(_stream_patient_sync(
+            db, subject_id, patient, requested, field_map, get_dictionaries(), normalized_collections(db)
+        ))
+    cursors = _patient_cursors(db, subject_id, requested, field_map)
+    tasks = {
+        "patient": lambda: db["hosp_patients"].find_one(
+            {"subject_id": subject_id}, _patient_projection(requested, field_map), max_time_ms=PATIENT_QUERY_BUDGET_MS
+        ),
+        **{name: (lambda cursor=cursor: list(cursor)) for name, cursor in cursors.items()},
+    }
+    if "lab_summary" in requested:
+        tasks["lab_summary"] = lambda: list(db["hosp_labevents"].aggregate(
+            lab_summary_pipeline({"subject_id": subject_id}), maxTimeMS=PATIENT_QUERY_BUDGET_MS
+        ))
+    # copy_context: los hilos del pool atribuyen sus comandos a la traza de esta petición
+    futures = {
+        name: _patient_executor.submit(contextvars.copy_context().run, _run_patient_query, name, fn)
+        for name, fn in tasks.items()
+    }
+    started = perf_counter()
+    deadline = started + PATIENT_QUERY_BUDGET_MS / 1000
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result(timeout=max(0.0, deadline - perf_counter()))
+        except Exception as e:
+            if isinstance(e, FuturesTimeoutError):
+                future.cancel()
+                add_timing(f"query.{name}", (perf_counter() - started) * 1000, "timeout")
+            results[name] = e
+
+    results, errors = _collect_sections(results)
+    dicts = get_dictionaries()
+    _resolve_descriptions(dicts, results.get("diagnoses", []), results.get("procedures", []), results.get("labevents", []))
+    if "lab_summary" in results:
+        results["lab_summary"] = _lab_summary_by_admission(dicts, results["lab_summary"])
+    return _build_patient_response(results, requested, field_map, errors=errors, normalized=normalized_collections(db))
+
+async def _run_patient_query_async(name: str, awaitable):
+    start = perf_counter()
+    try:
+        result = await asyncio.wait_for(awaitable, PATIENT_QUERY_BUDGET_MS / 1000)
+    except Exception as e:
+        _record_query(name, start, e)
+        raise
+    _record_query(name, start)
+    return result
+
+async def _aggregate_to_list(collection, pipeline: list, **kwargs) -> list:
+    return await (await collection.aggregate(pipeline, **kwargs)).to_list()
+
+@router.get("/{subject_id}")
+@sync_fallback(get_patient_sync)
+async def get_patient(
+    subject_id: int,
+    include: list[str] | None = Query(None, description=_INCLUDE_DESCRIPTION),
+    fields: list[str] | None = Query(None, description=_FIELDS_DESCRIPTION),
+    accept: str | None = Header(None),
+):
+    """
+    Obtiene información completa de un paciente (o solo las secciones y campos pedidos).
+    Con Accept: application/x-ndjson las secciones se envían por lotes según se leen.
+    """
+    db = get_async_db()
+    sections, field_map = _patient_selection(include, fields)
+    stream = _wants_ndjson(accept)
+
+    profile_sections = _profile_sections(sections)
+    if profile_sections is not None:
+        profile = await load_profile_async(db, subject_id, profile_sections)
+        if profile is not None:
+            _skip_sections(sections)
+            if stream:
+                return _ndjson_response(_stream_profile(profile, sections, field_map))
+            return _profile_selection(profile, sections, field_map)
+
+    requested = sections if sections is not None else _DEFAULT_SECTIONS
+    _skip_sections(requested)
+    if stream:
+        patient_query = db["hosp_patients"].find_one(
+            {"subject_id": subject_id}, _patient_projection(requested, field_map), max_time_ms=PATIENT_QUERY_BUDGET_MS
+        )
+        patient, dicts, normalized = await asyncio.gather(
+            _run_patient_query_async("patient", patient_query),
+            get_dictionaries_async(db),
+            normalized_collections_async(db),
+            return_exceptions=True,
+        )
+        _collect_sections({"patient": patient})
+        for value in (dicts, normalized):
+            if isinstance(value, BaseException):
+                raise value
+        return _ndjson_response(_stream_patient_async(db, subject_id, patient, requested, field_map, dicts, normalized))
+    cursors = _patient_cursors(db, subject_id, requested, field_map)
+    awaitables = {
+        "patient": db["hosp_patients"].find_one(
+            {"subject_id": subject_id}, _patient_projection(requested, field_map), max_time_ms=PATIENT_QUERY_BUDGET_MS
+        ),
+        **{name: cursor.to_list() for name, cursor in cursors.items()},
+    }
+    if "lab_summary" in requested:
+        awaitables["lab_summary"] = _aggregate_to_list(
+            db["hosp_labevents"], lab_summary_pipeline({"subject_id": subject_id}), maxTimeMS=PATIENT_QUERY_BUDGET_MS
+        )
+    values = await asyncio.gather(
+        *(_run_patient_query_async(name, awaitable) for name, awaitable in awaitables.items()),
+        return_exceptions=True,
+    )
+
+    results, errors = _collect_sections(dict(zip(awaitables, values)))
+    dicts = await get_dictionaries_async(db)
+    _resolve_descriptions(dicts, results.get("diagnoses", []), results.get("procedures", []), results.get("labevents", []))
+    if "lab_summary" in results:
+        results["lab_summary"] = _lab_summary_by_admission(dicts, results["lab_summary"])
+    normalized = await normalized_collections_async(db)
+    return _build_patient_response(results, requested, field_map, errors=errors, normalized=normalized)
+
+# Paginación por keyset de /{subject_id}/labevents: orden (charttime, labevent_id)
+# descendente, servido por el índice {subject_id, charttime, labevent_id} del manifiesto
+_LABEVENTS_PAGE_SORT = [("charttime", -1), ("labevent_id", -1)]
+LABEVENTS_PAGE_DEFAULT = 100
+LABEVENTS_PAGE_MAX = 1000
+
+def _encode_cursor(doc: dict) -> str:
+    raw = json_util.dumps([doc.get("charttime"), doc.get("labevent_id")])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        charttime, labevent_id = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="cursor no válido")
+    return charttime, labevent_id
+
+def _charttime_bound(value: str | None) -> str | None:
+    """Normaliza un límite temporal al formato de charttime en MIMIC ("YYYY-MM-DD HH:MM:SS")."""
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"fecha no válida: {value}")
+
+def _labevents_filter(dicts, subject_id, hadm_id, itemid, label, category, start, end, cursor) -> dict | None:
+    """
+    Filtro de la página de labevents. label y category se traducen a itemids con
+    el diccionario d_labitems en memoria; devuelve None si no puede haber resultados.
+    """
+    query = {"subject_id": subject_id}
+    if hadm_id is not None:
+        query["hadm_id"] = hadm_id
+
+    itemids = set(itemid) if itemid else None
+    if label is not None or category is not None:
+        label_lower = label.lower() if label is not None else None
+        category_lower = category.lower() if category is not None else None
+        matching = {
+            item_id for item_id, (item_label, _, item_category) in dicts.labitems.items()
+            if (label_lower is None or (item_label or "").lower() == label_lower)
+            and (category_lower is None or (item_category or "").lower() == category_lower)
+        }
+        itemids = matching if itemids is None else itemids & matching
+    if itemids is not None:
+        if not itemids:
+            return None
+        query["itemid"] = {"$in": sorted(itemids)}
+
+    time_range = {}
+    if start is not None:
+        time_range["$gte"] = _charttime_bound(start)
+    if end is not None:
+        time_range["$lte"] = _charttime_bound(end)
+    if time_range:
+        query["charttime"] = time_range
+
+    if cursor is not None:
+        charttime, labevent_id = _decode_cursor(cursor)
+        query["$or"] = [
+            {"charttime": {"$lt": charttime}},
+            {"charttime": charttime, "labevent_id": {"$lt": labevent_id}},
+        ]
+    return query
+
+def _labevents_page(dicts, docs: list, limit: int, normalized: frozenset) -> dict:
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    with timed("sanitize"):
+        labevents = sanitize_documents(docs, "hosp_labevents", normalized)
+    _resolve_descriptions(dicts, [], [], labevents)
     return {
-        "patient": clean_patient,
-        "admissions": clean_admissions,
-        "diagnoses": clean_diagnoses,
-        "procedures": clean_procedures,
+        "labevents": labevents,
+        "count": len(labevents),
+        "next_cursor": _encode_cursor(docs[-1]) if has_more else None,
     }
 
-@router.get("/")
-def list_patients(limit: int = 10):
-    """Lista los primeros pacientes disponibles"""
-    db = get_db(demo=True)
-    
-    patients = list(db["hosp_patients"].find({}).limit(limit))
-    
-    # Limpiar datos
-    clean_patients = [clean_data(patient) for patient in patients]
-    
+def get_patient_labevents_sync(
+    subject_id: int,
+    hadm_id: int | None = None,
+    itemid: list[int] | None = Query(None, description="Uno o varios itemid de d_labitems"),
+    label: str | None = Query(None, description="Nombre del test en d_labitems (p.ej. 'Glucose')"),
+    category: str | None = Query(None, description="Categoría de d_labitems (p.ej. 'Chemistry')"),
+    start: str | None = Query(None, description="charttime mínimo (ISO 8601)"),
+    end: str | None = Query(None, description="charttime máximo (ISO 8601)"),
+    limit: int = Query(LABEVENTS_PAGE_DEFAULT, ge=1, le=LABEVENTS_PAGE_MAX),
+    cursor: str | None = Query(None, description="next_cursor de la página anterior"),
+):
+    """Labevents de un paciente, del más reciente al más antiguo, paginados por keyset"""
+    db = get_db()
+    dicts = get_dictionaries()
+    query = _labevents_filter(dicts, subject_id, hadm_id, itemid, label, category, start, end, cursor)
+    if query is None:
+        return {"labevents": [], "count": 0, "next_cursor": None}
+    docs = list(db["hosp_labevents"].find(query, {"_id": 0}).sort(_LABEVENTS_PAGE_SORT).limit(limit + 1))
+    return _labevents_page(dicts, docs, limit, normalized_collections(db))
+
+@router.get("/{subject_id}/labevents")
+@sync_fallback(get_patient_labevents_sync)
+async def get_patient_labevents(
+    subject_id: int,
+    hadm_id: int | None = None,
+    itemid: list[int] | None = Query(None, description="Uno o varios itemid de d_labitems"),
+    label: str | None = Query(None, description="Nombre del test en d_labitems (p.ej. 'Glucose')"),
+    category: str | None = Query(None, description="Categoría de d_labitems (p.ej. 'Chemistry')"),
+    start: str | None = Query(None, description="charttime mínimo (ISO 8601)"),
+    end: str | None = Query(None, description="charttime máximo (ISO 8601)"),
+    limit: int = Query(LABEVENTS_PAGE_DEFAULT, ge=1, le=LABEVENTS_PAGE_MAX),
+    cursor: str | None = Query(None, description="next_cursor de la página anterior"),
+):
+    """Labevents de un paciente, del más reciente al más antiguo, paginados por keyset"""
+    db = get_async_db()
+    dicts = await get_dictionaries_async(db)
+    query = _labevents_filter(dicts, subject_id, hadm_id, itemid, label, category, start, end, cursor)
+    if query is None:
+        return {"labevents": [], "count": 0, "next_cursor": None}
+    docs = await db["hosp_labevents"].find(query, {"_id": 0}).sort(_LABEVENTS_PAGE_SORT).limit(limit + 1).to_list()
+    return _labevents_page(dicts, docs, limit, await normalized_collections_async(db))
+
+# Serie numérica (valuenum) de un itemid reducida en el servidor a `points` puntos.
+# Se recorre un cursor ordenado por charttime (índice {subject_id, itemid, charttime})
+# y el downsampler solo retiene en memoria uno o dos buckets.
+_SERIES_SORT = [("charttime", 1), ("labevent_id", 1)]
+_SERIES_PROJECTION = {
+    "_id": 0, "charttime": 1, "valuenum": 1, "valueuom": 1, "ref_range_lower": 1, "ref_range_upper": 1, "flag": 1,
+}
+SERIES_POINTS_DEFAULT = 500
+SERIES_POINTS_MAX = 5000
+
+def _finite(value):
+    if isinstance(value, float) and (math.isnan(value) or math.isinf(value)):
+        return None
+    return value
+
+def _epoch(charttime) -> float | None:
+    if isinstance(charttime, str):
+        try:
+            charttime = datetime.fromisoformat(charttime)
+        except ValueError:
+            return None
+    if not isinstance(charttime, datetime):
+        return None
+    if charttime.tzinfo is None:
+        charttime = charttime.replace(tzinfo=timezone.utc)
+    return charttime.timestamp()
+
+def _series_filter(subject_id: int, itemid: int, hadm_id: int | None, method: str, points: int) -> dict:
+    if method not in DOWNSAMPLERS:
+        raise HTTPException(status_code=400, detail=f"method debe ser uno de {', '.join(DOWNSAMPLERS)}")
+    min_points = DOWNSAMPLERS[method].min_threshold
+    if points < min_points:
+        raise HTTPException(status_code=400, detail=f"points debe ser al menos {min_points} con method={method}")
+    # NaN: valores vacíos del CSV importado con pandas (en MongoDB NaN == NaN)
+    query = {"subject_id": subject_id, "itemid": itemid, "valuenum": {"$type": "number", "$ne": float("nan")}}
+    if hadm_id is not None:
+        query["hadm_id"] = hadm_id
+    return query
+
+def _add_series_doc(sampler, meta: dict, doc: dict):
+    """Añade un labevent al downsampler; unidad y rangos de referencia: los del evento más reciente."""
+    value = _finite(doc.get("valuenum"))
+    x = _epoch(doc.get("charttime"))
+    if value is None or x is None:
+        return
+    for key, field in (("unit", "valueuom"), ("ref_range_lower", "ref_range_lower"), ("ref_range_upper", "ref_range_upper")):
+        field_value = _finite(doc.get(field))
+        if field_value is not None:
+            meta[key] = field_value
+    point = {"charttime": doc.get("charttime"), "valuenum": value}
+    flag = _finite(doc.get("flag"))
+    if flag is not None:
+        point["flag"] = flag
+    sampler.add((x, value, point))
+
+def _series_response(dicts, subject_id, itemid, hadm_id, method, total, sampler, meta) -> dict:
+    points = sampler.finish()
+    item = dicts.labitem(itemid) or {}
     return {
-        "patients": clean_patients,
-        "count": len(clean_patients)
-    } 
\ No newline at end of file
+        "subject_id": subject_id,
+        "itemid": itemid,
+        "hadm_id": hadm_id,
+        **item,
+        **meta,
+        "method": method,
+        "total_points": total,
+        "count": len(points),
+        "points": [point[2] for point in points],
+    }
+
+def get_patient_lab_series_sync(
+    subject_id: int,
+    itemid: int,
+    hadm_id: int | None = None,
+    points: int = Query(SERIES_POINTS_DEFAULT, ge=3, le=SERIES_POINTS_MAX, description="Puntos como máximo"),
+    method: str = Query("lttb", description="lttb | minmax"),
+):
+    """Serie temporal de un test de laboratorio reducida en el servidor (LTTB o min/max por bucket)"""
+    db = get_db()
+    query = _series_filter(subject_id, itemid, hadm_id, method, points)
+    total = db["hosp_labevents"].count_documents(query)
+    sampler = DOWNSAMPLERS[method](total, points)
+    meta = {"unit": None, "ref_range_lower": None, "ref_range_upper": None}
+    with timed("series"):
+        for doc in db["hosp_labevents"].find(query, _SERIES_PROJECTION).sort(_SERIES_SORT).batch_size(2000):
+            _add_series_doc(sampler, meta, doc)
+    return _series_response(get_dictionaries(), subject_id, itemid, hadm_id, method, total, sampler, meta)
+
+@router.get("/{subject_id}/labevents/series")
+@sync_fallback(get_patient_lab_series_sync)
+async def get_patient_lab_series(
+    subject_id: int,
+    itemid: int,
+    hadm_id: int | None = None,
+    points: int = Query(SERIES_POINTS_DEFAULT, ge=3, le=SERIES_POINTS_MAX, description="Puntos como máximo"),
+    method: str = Query("lttb", description="lttb | minmax"),
+):
+    """Serie temporal de un test de laboratorio reducida en el servidor (LTTB o min/max por bucket)"""
+    db = get_async_db()
+    query = _series_filter(subject_id, itemid, hadm_id, method, points)
+    total = await db["hosp_labevents"].count_documents(query)
+    sampler = DOWNSAMPLERS[method](total, points)
+    meta = {"unit": None, "ref_range_lower": None, "ref_range_upper": None}
+    with timed("series"):
+        async for doc in db["hosp_labevents"].find(query, _SERIES_PROJECTION).sort(_SERIES_SORT).batch_size(2000):
+            _add_series_doc(sampler, meta, doc)
+    dicts = await get_dictionaries_async(db)
+    return _series_response(dicts, subject_id, itemid, hadm_id, method, total, sampler, meta)
+
+# Listado de pacientes por keyset sobre subject_id (índice {subject_id: 1}): cada
+# página es un recorrido acotado del índice sin skip, así que cuesta lo mismo a
+# cualquier profundidad. El total sale de los metadatos de la colección.
+LIST_PAGE_DEFAULT = 10
+LIST_PAGE_MAX = 1000
+_LIST_PROJECTION = {
+    "_id": 0, "subject_id": 1, "gender": 1, "anchor_age": 1, "anchor_year": 1, "anchor_year_group": 1, "dod": 1,
+}
+
+def _list_query(cursor: int | None) -> dict:
+    return {"subject_id": {"$gt": cursor}} if cursor is not None else {}
+
+def _list_page(patients: list, limit: int, total: int, normalized: frozenset) -> dict:
+    has_more = len(patients) > limit
+    patients = sanitize_documents(patients[:limit], "hosp_patients", normalized)
+    return {
+        "patients": patients,
+        "count": len(patients),
+        "total": total,
+        "total_approximate": True,
+        "next_cursor": patients[-1]["subject_id"] if has_more else None,
+    }
+
+def list_patients_sync(
+    limit: int = Query(LIST_PAGE_DEFAULT, ge=1, le=LIST_PAGE_MAX),
+    cursor: int | None = Query(None, description="next_cursor de la página anterior"),
+):
+    """Lista los pacientes por subject_id, paginados por keyset"""
+    db = get_db()
+    patients = list(
+        db["hosp_patients"].find(_list_query(cursor), _LIST_PROJECTION).sort("subject_id", 1).limit(limit + 1)
+    )
+    total = db["hosp_patients"].estimated_document_count()
+    return _list_page(patients, limit, total, normalized_collections(db))
+
+@router.get("/")
+@sync_fallback(list_patients_sync)
+async def list_patients(
+    limit: int = Query(LIST_PAGE_DEFAULT, ge=1, le=LIST_PAGE_MAX),
+    cursor: int | None = Query(None, description="next_cursor de la página anterior"),
+):
+    """Lista los pacientes por subject_id, paginados por keyset"""
+    db = get_async_db()
+    page = db["hosp_patients"].find(_list_query(cursor), _LIST_PROJECTION).sort("subject_id", 1).limit(limit + 1)
+    patients, total = await asyncio.gather(page.to_list(), db["hosp_patients"].estimated_document_count())
+    return _list_page(patients, limit, total, await normalized_collections_async(db))
@@ -2,6 +2,9 @@ from fastapi import APIRouter, HTTPException
 from openai import OpenAI
 from dotenv import load_dotenv
 from pathlib import Path
+from app.utils.metrics import observe_openai
+from app.utils.mongo import get_async_db
+from app.utils.dictionaries import get_dictionaries_async
 import os
 import asyncio
 import json
@@ -39,6 +42,14 @@ async def summarize_patient(request: dict):
                 # if labevents:
                     # prompt_parts.append("Labevents (JSON):\n" + json.dumps(labevents, ensure_ascii=False))
 
+        # Completar descripciones que no vengan en la petición con los diccionarios en memoria
+        if any(not d.get("description") for d in diagnoses + procedures):
+            dicts = await get_dictionaries_async(get_async_db())
+            for d in diagnoses:
+                d["description"] = d.get("description") or dicts.icd_diagnosis(d.get("icd_code"), d.get("icd_version"))
+            for p in procedures:
+                p["description"] = p.get("description") or dicts.icd_procedure(p.get("icd_code"), p.get("icd_version"))
+
         if diagnoses:
             dx_lines = [
                 f"ICD-{d.get('icd_version')} {d.get('icd_code')}: {d.get('description') or ''}" for d in diagnoses
@@ -60,15 +71,16 @@ async def summarize_patient(request: dict):
 
         # Llamada a OpenAI con timeout
         try:
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    client.responses.create,
-                    model="gpt-4.1",
-                    # model="gpt-5",
-                    input=messages,
-                ),
-                timeout=120.0,
-            )
+            with observe_openai("summary"):
+                response = await asyncio.wait_for(
+                    asyncio.to_thread(
+                        client.responses.create,
+                        model="gpt-4.1",
+                        # model="gpt-5",
+                        input=messages,
+                    ),
+                    timeout=120.0,
+                )
         except asyncio.TimeoutError:
             raise HTTPException(status_code=504, detail="Timeout al generar el resumen")
 
@@ -0,0 +1,156 @@
+import argparse
+import re
+import sys
+from datetime import datetime, timezone
+from time import perf_counter
+
+from pymongo import IndexModel
+
+from app.utils.indexes import INDEX_MANIFEST
+from app.utils.mongo import get_db
+from app.utils.response_cache import BUILD_VERSIONS_COLLECTION
+
+# Atributos por paciente para /api/patients/search: un documento por subject_id
+# (_id = subject_id) con lo necesario para filtrar sin $lookup en la petición.
+# Se reconstruye entero en el servidor ($out + $merge) en una colección
+# auxiliar que después sustituye a la servida (renameCollection).
+SEARCH_COLLECTION = "patient_search"
+_BUILD_COLLECTION = "patient_search_build"
+# Campos que devuelve la búsqueda (icd_codes y careunits solo sirven para filtrar)
+SEARCH_PROJECTION = {
+    "_id": 0,
+    "subject_id": 1,
+    "gender": 1,
+    "anchor_age": 1,
+    "anchor_year_group": 1,
+    "admissions": 1,
+    "admission_types": 1,
+    "icu": 1,
+    "icu_stays": 1,
+}
+
+_BASE_PIPELINE = [
+    {"$project": {
+        "_id": "$subject_id",
+        "subject_id": 1,
+        "gender": 1,
+        "anchor_age": 1,
+        "anchor_year_group": 1,
+        "admissions": {"$literal": 0},
+        "admission_types": {"$literal": []},
+        "icu": {"$literal": False},
+        "icu_stays": {"$literal": 0},
+        "careunits": {"$literal": []},
+        "icd_codes": {"$literal": []},
+    }},
+]
+# (colección, pipeline): cada resultado se fusiona por _id = subject_id
+_ATTRIBUTE_PIPELINES = [
+    ("hosp_admissions", [
+        {"$group": {"_id": "$subject_id", "admissions": {"$sum": 1}, "admission_types": {"$addToSet": "$admission_type"}}},
+    ]),
+    ("icu_icustays", [
+        {"$group": {"_id": "$subject_id", "icu_stays": {"$sum": 1}}},
+        {"$set": {"icu": True}},
+    ]),
+    ("hosp_transfers", [
+        {"$match": {"careunit": {"$type": "string"}}},
+        {"$group": {"_id": "$subject_id", "careunits": {"$addToSet": "$careunit"}}},
+    ]),
+    ("hosp_diagnoses_icd", [
+        # Algunos códigos se importaron como números (mismo criterio que app.utils.dictionaries)
+        {"$group": {"_id": "$subject_id", "icd_codes": {"$addToSet": {"$trim": {"input": {"$toString": "$icd_code"}}}}}},
+    ]),
+]
+
+
+def _merge_stage(into: str) -> dict:
+    return {"$merge": {"into": into, "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}}
+
+
+def build_search(db) -> list[dict]:
+    """
+    Reconstruye patient_search: pacientes base ($out) y atributos de cada
+    colección ($merge), índices del manifiesto y sustitución atómica.
+    Devuelve el tiempo de cada paso.
+    """
+    existing = set(db.list_collection_names())
+    steps = []
+
+    start = perf_counter()
+    db["hosp_patients"].aggregate([*_BASE_PIPELINE, {"$out": _BUILD_COLLECTION}], allowDiskUse=True)
+    steps.append({"collection": "hosp_patients", "duration_s": perf_counter() - start})
+
+    for collection, pipeline in _ATTRIBUTE_PIPELINES:
+        if collection not in existing:
+            steps.append({"collection": collection, "duration_s": None, "skipped": True})
+            continue
+        start = perf_counter()
+        db[collection].aggregate([*pipeline, _merge_stage(_BUILD_COLLECTION)], allowDiskUse=True)
+        steps.append({"collection": collection, "duration_s": perf_counter() - start})
+
+    start = perf_counter()
+    db[_BUILD_COLLECTION].create_indexes([IndexModel(spec["keys"]) for spec in INDEX_MANIFEST[SEARCH_COLLECTION]])
+    steps.append({"collection": "indexes", "duration_s": perf_counter() - start})
+
+    db[_BUILD_COLLECTION].rename(SEARCH_COLLECTION, dropTarget=True)
+    db[BUILD_VERSIONS_COLLECTION].update_one(
+        {"_id": SEARCH_COLLECTION},
+        {"$inc": {"version": 1}, "$set": {"built_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+    return steps
+
+
+def search_filter(
+    gender: str | None = None,
+    age_min: int | None = None,
+    age_max: int | None = None,
+    admission_type: list[str] | None = None,
+    icu: bool | None = None,
+    icd: str | None = None,
+    icd_prefix: bool = False,
+    careunit: list[str] | None = None,
+) -> dict:
+    """Filtro de patient_search; el prefijo ICD es una regex anclada (usa el índice de icd_codes)."""
+    query = {}
+    if gender is not None:
+        query["gender"] = gender.upper()
+    age = {}
+    if age_min is not None:
+        age["$gte"] = age_min
+    if age_max is not None:
+        age["$lte"] = age_max
+    if age:
+        query["anchor_age"] = age
+    if admission_type:
+        query["admission_types"] = {"$in": admission_type}
+    if icu is not None:
+        query["icu"] = icu
+    if icd:
+        code = icd.strip().upper().replace(".", "")
+        query["icd_codes"] = {"$regex": f"^{re.escape(code)}"} if icd_prefix else code
+    if careunit:
+        query["careunits"] = {"$in": careunit}
+    return query
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI de los scripts build_patient_search.py."""
+    argparse.ArgumentParser(description="Construye patient_search (atributos por paciente para la búsqueda)").parse_args(argv)
+    db = get_db()
+    print(f"=== Construyendo {SEARCH_COLLECTION} en {db.name} ===")
+    start = perf_counter()
+    for step in build_search(db):
+        if step.get("skipped"):
+            print(f"  - {step['collection']}: no existe, se omite")
+        else:
+            print(f"  ✅ {step['collection']} en {step['duration_s']:.1f}s")
+    total = db[SEARCH_COLLECTION].estimated_document_count()
+    print(f"{total} pacientes en {SEARCH_COLLECTION} en {perf_counter() - start:.1f}s")
+    print("=== Completado ===")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+
+from app.utils.mongo import get_db
+from app.utils.response_cache import build_versions, build_versions_async
+
+logger = logging.getLogger(__name__)
+
+# Recarga periódica de los diccionarios que aún no tienen versión en _build_versions (s)
+DICTIONARIES_UNVERSIONED_TTL_S = float(os.getenv("DICTIONARIES_UNVERSIONED_TTL_S", "3600"))
+
+DICTIONARY_COLLECTIONS = [
+    "hosp_d_icd_diagnoses",
+    "hosp_d_icd_procedures",
+    "hosp_d_labitems",
+    "icu_d_items",
+    "hosp_d_hcpcs",
+]
+LABITEM_FIELDS = ("label", "fluid", "category")
+ICU_ITEM_FIELDS = ("label", "abbreviation", "linksto", "category", "unitname", "param_type", "lownormalvalue", "highnormalvalue")
+HCPCS_FIELDS = ("short_description", "long_description", "category")
+
+
+def _value(value):
+    """NaN de pandas -> None (los CSV se importaron tal cual)."""
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _code(code) -> str | None:
+    """Clave de código: texto sin espacios (algunos se importaron como números, como hacía $toString)."""
+    if code is None or (isinstance(code, float) and math.isnan(code)):
+        return None
+    if isinstance(code, float) and code.is_integer():
+        code = int(code)
+    return str(code).strip()
+
+
+def _version(version) -> int | None:
+    try:
+        return int(version)
+    except (TypeError, ValueError):
+        return None
+
+
+class ReferenceDictionaries:
+    """
+    Diccionarios de referencia de MIMIC-IV en memoria: ICD (diagnósticos y
+    procedimientos) por (código, versión), d_labitems e icu_d_items por itemid
+    y d_hcpcs por código. Los valores se guardan como tuplas para ocupar poco.
+    """
+
+    def __init__(self, db_name: str, version: tuple):
+        self.db_name = db_name
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.icd_diagnoses: dict[tuple[str, int], str] = {}
+        self.icd_procedures: dict[tuple[str, int], str] = {}
+        self.labitems: dict[int, tuple] = {}
+        self.icu_items: dict[int, tuple] = {}
+        self.hcpcs: dict[str, tuple] = {}
+
+    @classmethod
+    def load(cls, db, version: tuple) -> "ReferenceDictionaries":
+        start = time.perf_counter()
+        dicts = cls(db.name, version)
+        for target, collection in ((dicts.icd_diagnoses, "hosp_d_icd_diagnoses"), (dicts.icd_procedures, "hosp_d_icd_procedures")):
+            for doc in db[collection].find({}, {"_id": 0, "icd_code": 1, "icd_version": 1, "long_title": 1}):
+                target[(_code(doc.get("icd_code")), _version(doc.get("icd_version")))] = _value(doc.get("long_title"))
+        for doc in db["hosp_d_labitems"].find({}, {"_id": 0, "itemid": 1, **{f: 1 for f in LABITEM_FIELDS}}):
+            dicts.labitems[doc.get("itemid")] = tuple(_value(doc.get(f)) for f in LABITEM_FIELDS)
+        for doc in db["icu_d_items"].find({}, {"_id": 0, "itemid": 1, **{f: 1 for f in ICU_ITEM_FIELDS}}):
+            dicts.icu_items[doc.get("itemid")] = tuple(_value(doc.get(f)) for f in ICU_ITEM_FIELDS)
+        for doc in db["hosp_d_hcpcs"].find({}, {"_id": 0, "code": 1, **{f: 1 for f in HCPCS_FIELDS}}):
+            dicts.hcpcs[_code(doc.get("code"))] = tuple(_value(doc.get(f)) for f in HCPCS_FIELDS)
+        logger.info(
+            f"Diccionarios de referencia cargados en {time.perf_counter() - start:.1f}s: "
+            f"{len(dicts.icd_diagnoses)} diagnósticos, {len(dicts.icd_procedures)} procedimientos, "
+            f"{len(dicts.labitems)} labitems, {len(dicts.icu_items)} items UCI, {len(dicts.hcpcs)} HCPCS"
+        )
+        return dicts
+
+    def stale(self, version: tuple) -> bool:
+        if version != self.version:
+            return True
+        return None in version and time.monotonic() - self.loaded_at >= DICTIONARIES_UNVERSIONED_TTL_S
+
+    def icd_diagnosis(self, code, version) -> str | None:
+        return self.icd_diagnoses.get((_code(code), _version(version)))
+
+    def icd_procedure(self, code, version) -> str | None:
+        return self.icd_procedures.get((_code(code), _version(version)))
+
+    def labitem(self, itemid) -> dict | None:
+        item = self.labitems.get(itemid)
+        return dict(zip(LABITEM_FIELDS, item)) if item else None
+
+    def icu_item(self, itemid) -> dict | None:
+        item = self.icu_items.get(itemid)
+        return dict(zip(ICU_ITEM_FIELDS, item)) if item else None
+
+    def hcpcs_code(self, code) -> dict | None:
+        item = self.hcpcs.get(_code(code))
+        return dict(zip(HCPCS_FIELDS, item)) if item else None
+
+    def stats(self) -> dict:
+        return {
+            "database": self.db_name,
+            "icd_diagnoses": len(self.icd_diagnoses),
+            "icd_procedures": len(self.icd_procedures),
+            "labitems": len(self.labitems),
+            "icu_items": len(self.icu_items),
+            "hcpcs": len(self.hcpcs),
+        }
+
+
+_loaded: dict[str, ReferenceDictionaries] = {}
+_load_lock = threading.Lock()
+
+
+def _current(db_name: str, version: tuple) -> ReferenceDictionaries | None:
+    dicts = _loaded.get(db_name)
+    return dicts if dicts is not None and not dicts.stale(version) else None
+
+
+def _reload(version: tuple) -> ReferenceDictionaries:
+    db = get_db()
+    with _load_lock:
+        # Otro hilo puede haberlos cargado mientras esperábamos el lock
+        dicts = _current(db.name, version)
+        if dicts is None:
+            dicts = ReferenceDictionaries.load(db, version)
+            _loaded[db.name] = dicts
+        return dicts
+
+
+def get_dictionaries() -> ReferenceDictionaries:
+    """Diccionarios del dataset configurado; se recargan si cambia su versión de build."""
+    db = get_db()
+    version = tuple(build_versions(db).get(c) for c in DICTIONARY_COLLECTIONS)
+    return _current(db.name, version) or _reload(version)
+
+
+async def get_dictionaries_async(db) -> ReferenceDictionaries:
+    """Versión para rutas async: la (re)carga, si hace falta, se hace en un hilo."""
+    versions = await build_versions_async(db)
+    version = tuple(versions.get(c) for c in DICTIONARY_COLLECTIONS)
+    return _current(db.name, version) or await asyncio.to_thread(_reload, version)
@@ -0,0 +1,171 @@
+import math
+
+# Reducción de series temporales en streaming: los puntos llegan ya ordenados
+# por tiempo desde un cursor y solo se guardan en memoria uno o dos buckets.
+# Cada punto es (x, y, payload): x numérico (epoch), y el valor y payload lo
+# que se devuelve al cliente.
+
+
+class _Buckets:
+    """Reparte los índices 1..total-2 en `buckets` tramos contiguos (el primero y el último van aparte)."""
+
+    def __init__(self, total: int, buckets: int):
+        self.total = total
+        self.buckets = buckets
+        self.every = (total - 2) / buckets
+        self.bucket = 0
+        self.end = self._end(0)
+        self.index = 0
+
+    def _end(self, bucket: int) -> int:
+        return int((bucket + 1) * self.every) + 1
+
+    def next_index(self) -> tuple[int, bool]:
+        """Índice del punto entrante y si cierra el bucket en curso."""
+        index = self.index
+        self.index += 1
+        closes = False
+        # El último bucket llega hasta total-2 aunque el redondeo de `every` lo acorte
+        if self.end <= index < self.total - 1 and self.bucket < self.buckets - 1:
+            self.bucket += 1
+            self.end = self._end(self.bucket)
+            closes = True
+        return index, closes
+
+
+class LTTBDownsampler:
+    """
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013) en una pasada.
+    `total` es el número de puntos que devolverá el cursor (count previo); si
+    llegan más, el sobrante se trata como parte del último bucket.
+    """
+
+    # Primer punto, último y al menos un bucket
+    min_threshold = 3
+
+    def __init__(self, total: int, threshold: int):
+        _check_threshold(self, threshold)
+        self.threshold = threshold
+        self.passthrough = total <= threshold
+        self.selected: list = []
+        self._buckets = None if self.passthrough else _Buckets(total, threshold - 2)
+        self._filling: list = []
+        self._pending: list | None = None
+        self._anchor = None
+        self._last = None
+
+    def add(self, point: tuple):
+        if self.passthrough:
+            self.selected.append(point)
+            return
+        index, closes = self._buckets.next_index()
+        if index == 0:
+            self._anchor = point
+            self.selected.append(point)
+            return
+        # El punto anterior es el último del bucket que se cierra (el actual se retiene por si es el final)
+        if self._last is not None:
+            self._filling.append(self._last)
+        if closes:
+            self._close_bucket()
+        self._last = point
+
+    def _close_bucket(self):
+        completed, self._filling = self._filling, []
+        if not completed:
+            return
+        if self._pending is not None:
+            self._choose(self._pending, _mean(completed))
+        self._pending = completed
+
+    def _choose(self, bucket: list, next_mean: tuple[float, float]):
+        ax, ay = self._anchor[0], self._anchor[1]
+        cx, cy = next_mean
+        best, best_area = bucket[0], -1.0
+        for point in bucket:
+            area = abs((ax - cx) * (point[1] - ay) - (ax - point[0]) * (cy - ay))
+            if area > best_area:
+                best, best_area = point, area
+        self._anchor = best
+        self.selected.append(best)
+
+    def finish(self) -> list:
+        if self.passthrough or self._last is None:
+            return self.selected
+        self._close_bucket()
+        if self._pending is not None:
+            self._choose(self._pending, (self._last[0], self._last[1]))
+        self.selected.append(self._last)
+        return self.selected
+
+
+class MinMaxDownsampler:
+    """
+    Min/max por bucket: conserva los picos (útil para valores críticos).
+    Cada bucket aporta su mínimo y su máximo en orden temporal.
+    """
+
+    # Primer punto, último y el mínimo y el máximo de al menos un bucket
+    min_threshold = 4
+
+    def __init__(self, total: int, threshold: int):
+        _check_threshold(self, threshold)
+        self.passthrough = total <= threshold
+        self.selected: list = []
+        self._buckets = None if self.passthrough else _Buckets(total, max(1, (threshold - 2) // 2))
+        self._min = None
+        self._max = None
+        self._last = None
+
+    def add(self, point: tuple):
+        if self.passthrough:
+            self.selected.append(point)
+            return
+        index, closes = self._buckets.next_index()
+        if index == 0:
+            self.selected.append(point)
+            return
+        if self._last is not None:
+            self._track(self._last)
+        if closes:
+            self._close_bucket()
+        self._last = point
+
+    def _track(self, point: tuple):
+        if self._min is None or point[1] < self._min[1]:
+            self._min = point
+        if self._max is None or point[1] > self._max[1]:
+            self._max = point
+
+    def _close_bucket(self):
+        if self._min is None:
+            return
+        pair = sorted({id(p): p for p in (self._min, self._max)}.values(), key=lambda p: p[0])
+        self.selected.extend(pair)
+        self._min = self._max = None
+
+    def finish(self) -> list:
+        if self.passthrough or self._last is None:
+            return self.selected
+        self._close_bucket()
+        self.selected.append(self._last)
+        return self.selected
+
+
+def _check_threshold(sampler, threshold: int):
+    # Por debajo del mínimo no se puede reducir sin superar `threshold`
+    if threshold < sampler.min_threshold:
+        raise ValueError(f"{type(sampler).__name__} necesita threshold >= {sampler.min_threshold}")
+
+
+DOWNSAMPLERS = {
+    "lttb": LTTBDownsampler,
+    "minmax": MinMaxDownsampler,
+}
+
+
+def _mean(points: list) -> tuple[float, float]:
+    return (
+        math.fsum(p[0] for p in points) / len(points),
+        math.fsum(p[1] for p in points) / len(points),
+    )
@@ -0,0 +1,306 @@
+import logging
+import os
+from datetime import date, datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él /api/export responde 501
+    pa = None
+
+from app.utils.sanitize import is_missing
+
+logger = logging.getLogger(__name__)
+
+# Documentos por lote de cursor y por record batch / row group
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "10000"))
+EXPORT_BATCH_SIZE_MAX = 100000
+# subject_id de la cohorte por consulta $in a la colección exportada
+EXPORT_COHORT_CHUNK = int(os.getenv("EXPORT_COHORT_CHUNK", "1000"))
+
+# Esquema de columnas de cada colección exportable (solo estas se exportan).
+# Tipos: int64, float64, string, bool, timestamp (texto "YYYY-MM-DD[ HH:MM:SS]" de MIMIC)
+EXPORT_SCHEMAS = {
+    "hosp_patients": {
+        "subject_id": "int64", "gender": "string", "anchor_age": "int64", "anchor_year": "int64",
+        "anchor_year_group": "string", "dod": "timestamp",
+    },
+    "hosp_admissions": {
+        "subject_id": "int64", "hadm_id": "int64", "admittime": "timestamp", "dischtime": "timestamp",
+        "deathtime": "timestamp", "admission_type": "string", "admit_provider_id": "string",
+        "admission_location": "string", "discharge_location": "string", "insurance": "string",
+        "language": "string", "marital_status": "string", "race": "string", "edregtime": "timestamp",
+        "edouttime": "timestamp", "hospital_expire_flag": "int64",
+    },
+    "hosp_diagnoses_icd": {
+        "subject_id": "int64", "hadm_id": "int64", "seq_num": "int64", "icd_code": "string", "icd_version": "int64",
+    },
+    "hosp_procedures_icd": {
+        "subject_id": "int64", "hadm_id": "int64", "seq_num": "int64", "chartdate": "timestamp",
+        "icd_code": "string", "icd_version": "int64",
+    },
+    "hosp_labevents": {
+        "labevent_id": "int64", "subject_id": "int64", "hadm_id": "int64", "specimen_id": "int64", "itemid": "int64",
+        "order_provider_id": "string", "charttime": "timestamp", "storetime": "timestamp", "value": "string",
+        "valuenum": "float64", "valueuom": "string", "ref_range_lower": "float64", "ref_range_upper": "float64",
+        "flag": "string", "priority": "string", "comments": "string",
+    },
+    "hosp_transfers": {
+        "subject_id": "int64", "hadm_id": "int64", "transfer_id": "int64", "eventtype": "string",
+        "careunit": "string", "intime": "timestamp", "outtime": "timestamp",
+    },
+    "hosp_prescriptions": {
+        "subject_id": "int64", "hadm_id": "int64", "pharmacy_id": "int64", "poe_id": "string", "poe_seq": "int64",
+        "order_provider_id": "string", "starttime": "timestamp", "stoptime": "timestamp", "drug_type": "string",
+        "drug": "string", "formulary_drug_cd": "string", "gsn": "string", "ndc": "string", "prod_strength": "string",
+        "form_rx": "string", "dose_val_rx": "string", "dose_unit_rx": "string", "form_val_disp": "string",
+        "form_unit_disp": "string", "doses_per_24_hrs": "float64", "route": "string",
+    },
+    "icu_icustays": {
+        "subject_id": "int64", "hadm_id": "int64", "stay_id": "int64", "first_careunit": "string",
+        "last_careunit": "string", "intime": "timestamp", "outtime": "timestamp", "los": "float64",
+    },
+    "patient_search": {
+        "subject_id": "int64", "gender": "string", "anchor_age": "int64", "anchor_year_group": "string",
+        "admissions": "int64", "icu": "bool", "icu_stays": "int64",
+    },
+}
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+EXPORT_COMPRESSIONS = ("zstd", "lz4", "none")
+# Operadores que ejecutan JavaScript en el servidor: no se aceptan en el filtro
+_FORBIDDEN_OPERATORS = {"$where", "$function", "$accumulator"}
+
+
+def check_filter(value) -> None:
+    """ValueError si el filtro usa operadores con JavaScript en el servidor."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in _FORBIDDEN_OPERATORS:
+                raise ValueError(f"Operador no permitido en el filtro: {key}")
+            check_filter(item)
+    elif isinstance(value, list):
+        for item in value:
+            check_filter(item)
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _to_float(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def _to_string(value):
+    # Códigos importados como número (mismo criterio que app.utils.dictionaries)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _to_bool(value):
+    return bool(value) if isinstance(value, (bool, int, float)) else None
+
+
+def _to_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return None
+
+
+_CONVERTERS = {
+    "int64": _to_int,
+    "float64": _to_float,
+    "string": _to_string,
+    "bool": _to_bool,
+    "timestamp": _to_timestamp,
+}
+
+
+def _arrow_type(name: str):
+    return {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("s"),
+    }[name]
+
+
+def export_columns(collection: str, projection: list[str] | None) -> dict[str, str]:
+    """Columnas {campo: tipo} a exportar; ValueError si la colección o algún campo no está en el mapa."""
+    schema = EXPORT_SCHEMAS.get(collection) if isinstance(collection, str) else None
+    if schema is None:
+        raise ValueError(f"Colección no exportable: {collection} (disponibles: {', '.join(EXPORT_SCHEMAS)})")
+    if not projection:
+        return dict(schema)
+    unknown = [field for field in projection if field not in schema]
+    if unknown:
+        raise ValueError(f"Campos desconocidos en {collection}: {', '.join(unknown)}")
+    return {field: schema[field] for field in dict.fromkeys(projection)}
+
+
+def arrow_schema(columns: dict[str, str]):
+    return pa.schema([(field, _arrow_type(kind)) for field, kind in columns.items()])
+
+
+def record_batch(docs: list[dict], columns: dict[str, str], schema):
+    """Un record batch con los documentos convertidos al tipo de cada columna (vacíos -> null)."""
+    arrays = []
+    for field, kind in columns.items():
+        convert = _CONVERTERS[kind]
+        values = []
+        for doc in docs:
+            value = doc.get(field)
+            values.append(None if is_missing(value) else convert(value))
+        arrays.append(pa.array(values, type=schema.field(field).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Destino de escritura que acumula los bytes hasta que el generador los entrega."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def _writer(sink, schema, fmt: str, compression: str):
+    codec = None if compression == "none" else compression
+    if fmt == "parquet":
+        # Un row group por lote: el pie de página se escribe al cerrar
+        return pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression=codec or "none")
+    options = pa.ipc.IpcWriteOptions(compression=codec)
+    return pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema, options=options)
+
+
+def stream_export(batches, columns: dict[str, str], fmt: str, compression: str):
+    """
+    Generador de bytes en Arrow IPC (stream) o Parquet a partir de un iterable
+    de listas de documentos. Solo hay un lote en memoria a la vez.
+    """
+    schema = arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = _writer(sink, schema, fmt, compression)
+    rows = 0
+    try:
+        for docs in batches:
+            if not docs:
+                continue
+            writer.write_batch(record_batch(docs, columns, schema))
+            rows += len(docs)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    logger.info(f"Exportación {fmt}/{compression}: {rows} filas, {len(columns)} columnas")
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+def cursor_batches(cursor, batch_size: int):
+    """Lotes de `batch_size` documentos de un cursor (que ya pide lotes de ese tamaño al servidor)."""
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def limit_batches(batches, limit: int | None):
+    """Corta la secuencia de lotes al llegar a `limit` filas."""
+    if limit is None:
+        yield from batches
+        return
+    remaining = limit
+    for batch in batches:
+        if remaining <= 0:
+            return
+        batch = batch[:remaining]
+        remaining -= len(batch)
+        yield batch
+
+
+def combine_filters(*filters: dict) -> dict:
+    """Conjunción de filtros Mongo sin pisar claves repetidas (p.ej. subject_id en ambos)."""
+    filters = [f for f in filters if f]
+    if not filters:
+        return {}
+    return filters[0] if len(filters) == 1 else {"$and": filters}
+
+
+def _cohort_documents(db, collection: str, query: dict, projection: dict, subject_ids, batch_size: int):
+    chunk = []
+    for subject_id in subject_ids:
+        chunk.append(subject_id)
+        if len(chunk) >= EXPORT_COHORT_CHUNK:
+            yield from db[collection].find(
+                combine_filters(query, {"subject_id": {"$in": chunk}}), projection, batch_size=batch_size
+            )
+            chunk = []
+    if chunk:
+        yield from db[collection].find(
+            combine_filters(query, {"subject_id": {"$in": chunk}}), projection, batch_size=batch_size
+        )
+
+
+def cohort_batches(db, collection: str, query: dict, projection: dict, subject_ids, batch_size: int):
+    """
+    Lotes de `collection` restringidos a los subject_id de una cohorte, consultando
+    por bloques de EXPORT_COHORT_CHUNK pacientes (sin $in gigantes).
+    """
+    return cursor_batches(_cohort_documents(db, collection, query, projection, subject_ids, batch_size), batch_size)
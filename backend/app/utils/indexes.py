@@ -0,0 +1,217 @@
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from pymongo import IndexModel
+
+from app.utils.mongo import get_db
+
+logger = logging.getLogger(__name__)
+
+# Colecciones construidas en paralelo por ensure_indexes (una colección por hilo:
+# los índices de una misma colección se crean juntos en un único recorrido)
+INDEX_BUILD_WORKERS = int(os.getenv("INDEX_BUILD_WORKERS", "4"))
+
+# Manifiesto de índices requeridos por colección.
+# hot=True: índice que usa una ruta de la API; si falta, el arranque lo avisa.
+INDEX_MANIFEST = {
+    "hosp_patients": [
+        {"keys": [("subject_id", 1)], "hot": True},
+    ],
+    "hosp_admissions": [
+        {"keys": [("subject_id", 1), ("admittime", -1)], "hot": True},
+        {"keys": [("hadm_id", 1)]},
+    ],
+    "hosp_diagnoses_icd": [
+        {"keys": [("subject_id", 1), ("hadm_id", 1), ("seq_num", 1)], "hot": True},
+    ],
+    "hosp_procedures_icd": [
+        {"keys": [("subject_id", 1), ("hadm_id", 1), ("chartdate", -1), ("seq_num", 1)], "hot": True},
+    ],
+    "hosp_labevents": [
+        # Vista de paciente y keyset de /{subject_id}/labevents
+        {"keys": [("subject_id", 1), ("charttime", -1), ("labevent_id", -1)], "hot": True},
+        # Series por test de /{subject_id}/labevents/series
+        {"keys": [("subject_id", 1), ("itemid", 1), ("charttime", 1)], "hot": True},
+    ],
+    "patient_profiles": [
+        # find_one de /api/patients/{subject_id} (build_patient_profiles también lo crea)
+        {"keys": [("subject_id", 1)], "hot": True},
+    ],
+    "patient_search": [
+        # Filtros de /api/patients/search (build_patient_search los crea antes de publicar la colección)
+        {"keys": [("gender", 1), ("anchor_age", 1)], "hot": True},
+        {"keys": [("anchor_age", 1)], "hot": True},
+        {"keys": [("admission_types", 1)], "hot": True},
+        {"keys": [("icd_codes", 1)], "hot": True},
+        {"keys": [("careunits", 1)], "hot": True},
+    ],
+    "hosp_transfers": [
+        # Recorrido ordenado de build_transfer_edges_chord
+        {"keys": [("hadm_id", 1), ("intime", 1)]},
+    ],
+    "icu_icustays": [
+        {"keys": [("subject_id", 1)]},
+    ],
+    "icd_equivalencias": [
+        # $lookup del diagnosis-icicle
+        {"keys": [("icd_code", 1)], "hot": True},
+    ],
+    "hosp_d_icd_diagnoses": [
+        {"keys": [("icd_code", 1), ("icd_version", 1)]},
+    ],
+    "hosp_d_icd_procedures": [
+        {"keys": [("icd_code", 1), ("icd_version", 1)]},
+    ],
+    "hosp_d_labitems": [
+        {"keys": [("itemid", 1)]},
+    ],
+    "icu_d_items": [
+        {"keys": [("itemid", 1)]},
+    ],
+}
+
+
+def _key(keys) -> tuple:
+    return tuple((field, direction) for field, direction in keys)
+
+
+def hot_collections() -> list[str]:
+    """Colecciones con algún índice de ruta caliente (las que calienta warmup)."""
+    return [name for name, specs in INDEX_MANIFEST.items() if any(spec.get("hot") for spec in specs)]
+
+
+def _index_sizes(db, collection: str) -> dict[str, int]:
+    """Tamaño en bytes de cada índice de la colección ($collStats.storageStats)."""
+    try:
+        stats = list(db[collection].aggregate([{"$collStats": {"storageStats": {}}}]))
+        return stats[0]["storageStats"].get("indexSizes", {}) if stats else {}
+    except Exception:
+        return {}
+
+
+def check_indexes(db, hot_only: bool = False) -> list[dict]:
+    """
+    Compara el manifiesto con los índices existentes.
+    Devuelve una fila por índice: colección, claves, nombre, hot, present y size_bytes.
+    Las colecciones que no existen en la BD se omiten.
+    """
+    existing_collections = set(db.list_collection_names())
+    rows = []
+    for collection, specs in INDEX_MANIFEST.items():
+        if collection not in existing_collections:
+            continue
+        existing = {_key(info["key"]): name for name, info in db[collection].index_information().items()}
+        sizes = _index_sizes(db, collection)
+        for spec in specs:
+            if hot_only and not spec.get("hot"):
+                continue
+            name = existing.get(_key(spec["keys"]))
+            rows.append({
+                "collection": collection,
+                "keys": spec["keys"],
+                "name": name,
+                "hot": bool(spec.get("hot")),
+                "present": name is not None,
+                "size_bytes": sizes.get(name) if name else None,
+            })
+    return rows
+
+
+def missing_hot_indexes(db) -> list[dict]:
+    return [row for row in check_indexes(db, hot_only=True) if not row["present"]]
+
+
+def _build_collection(db, collection: str, specs: list[dict]) -> dict:
+    start = perf_counter()
+    names = db[collection].create_indexes([IndexModel(spec["keys"]) for spec in specs])
+    return {"collection": collection, "names": names, "duration_s": perf_counter() - start}
+
+
+def ensure_indexes(db, workers: int = INDEX_BUILD_WORKERS) -> list[dict]:
+    """
+    Crea los índices del manifiesto que falten, una colección por hilo.
+    Devuelve el tiempo de construcción de cada colección.
+    """
+    pending: dict[str, list[dict]] = {}
+    for row in check_indexes(db):
+        if not row["present"]:
+            pending.setdefault(row["collection"], []).append({"keys": row["keys"]})
+    if not pending:
+        return []
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="index-build") as executor:
+        futures = {executor.submit(_build_collection, db, c, specs): c for c, specs in pending.items()}
+        for future, collection in futures.items():
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"collection": collection, "names": [], "duration_s": None, "error": str(e)})
+    return results
+
+
+def warn_missing_indexes(db) -> str:
+    """Comprobación de arranque: avisa (sin fallar) de los índices de rutas calientes que faltan."""
+    missing = missing_hot_indexes(db)
+    for row in missing:
+        logger.warning(
+            f"Falta el índice {row['collection']} {dict(row['keys'])}: "
+            f"ejecuta scripts/{{demo,full}}/ensure_indexes.py"
+        )
+    return f"{len(missing)} índices de rutas calientes ausentes" if missing else "manifiesto OK"
+
+
+def _format_bytes(size: int | None) -> str:
+    if size is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _print_report(rows: list[dict]):
+    for row in rows:
+        status = "OK   " if row["present"] else "FALTA"
+        hot = " (hot)" if row["hot"] else ""
+        print(f"  {status} {row['collection']}.{row['name'] or dict(row['keys'])}{hot}: {_format_bytes(row['size_bytes'])}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    CLI de los scripts ensure_indexes.py:
+      ensure  crea en paralelo los índices que falten e informa de tamaños y tiempos
+      verify  solo informa; sale con código 1 si falta algún índice
+    """
+    parser = argparse.ArgumentParser(description="Índices del manifiesto de MIMIC-IV")
+    parser.add_argument("command", nargs="?", choices=["ensure", "verify"], default="ensure")
+    parser.add_argument("--workers", type=int, default=INDEX_BUILD_WORKERS, help="colecciones en paralelo")
+    args = parser.parse_args(argv)
+
+    db = get_db()
+    print(f"=== Índices de {db.name} ({args.command}) ===")
+    if args.command == "ensure":
+        start = perf_counter()
+        for result in ensure_indexes(db, workers=args.workers):
+            if result.get("error"):
+                print(f"  ❌ {result['collection']}: {result['error']}")
+            else:
+                print(f"  ✅ {result['collection']}: {', '.join(result['names'])} en {result['duration_s']:.1f}s")
+        print(f"Construcción completada en {perf_counter() - start:.1f}s")
+
+    rows = check_indexes(db)
+    _print_report(rows)
+    missing = [row for row in rows if not row["present"]]
+    if missing:
+        print(f"Faltan {len(missing)} índices")
+        return 1
+    print("=== Completado ===")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,8 @@
 import logging
 from fastmcp import FastMCP
 from app.utils.mongo import get_db
+from app.utils.metrics import instrument_tool
+from app.utils.dictionaries import get_dictionaries
 
 # Configurar logging básico
 logging.basicConfig(
@@ -16,6 +18,7 @@ mcp = FastMCP(
 )
 
 @mcp.tool(output_schema=None)
+@instrument_tool
 def get_schema(collection: str) -> dict:
     """Get the schema/structure of a MongoDB collection"""
     logging.info(f"get_schema called for collection: {collection}")
@@ -39,6 +42,7 @@ def get_schema(collection: str) -> dict:
         return {"error": f"Error getting schema for {collection}: {str(e)}"}
 
 @mcp.tool(output_schema=None)
+@instrument_tool
 def find_documents(collection: str, query: dict = {}, limit: int = 10) -> dict:
     """Find documents in a MongoDB collection"""
     logging.info(f"find_documents called for collection: {collection}, query: {query}, limit: {limit}")
@@ -54,6 +58,7 @@ def find_documents(collection: str, query: dict = {}, limit: int = 10) -> dict:
         return {"error": f"Error finding documents in {collection}: {str(e)}"}
 
 @mcp.tool(output_schema=None)
+@instrument_tool
 def aggregate_data(collection: str, pipeline: list) -> dict:
     """Run aggregation pipeline on MongoDB collection"""
     logging.info(f"aggregate_data called for collection: {collection}, pipeline: {pipeline}")
@@ -69,6 +74,7 @@ def aggregate_data(collection: str, pipeline: list) -> dict:
         return {"error": f"Error in aggregation on {collection}: {str(e)}"}
 
 @mcp.tool(output_schema=None)
+@instrument_tool
 def count_documents(collection: str, query: dict = {}) -> dict:
     """Count documents in a MongoDB collection"""
     logging.info(f"count_documents called for collection: {collection}, query: {query}")
@@ -84,6 +90,7 @@ def count_documents(collection: str, query: dict = {}) -> dict:
         return {"error": f"Error counting documents in {collection}: {str(e)}"}
 
 @mcp.tool(output_schema=None)
+@instrument_tool
 def list_collections() -> dict:
     """List all collections in the MIMIC-IV database"""
     logging.info("list_collections called")
@@ -97,6 +104,7 @@ def list_collections() -> dict:
         return {"error": f"Error listing collections: {str(e)}"}
 
 @mcp.tool(output_schema=None)
+@instrument_tool
 def get_indexes(collection: str) -> dict:
     """Get index information for a MongoDB collection"""
     logging.info(f"get_indexes called for collection: {collection}")
@@ -111,6 +119,35 @@ def get_indexes(collection: str) -> dict:
         logging.error(f"Error getting indexes for {collection}: {str(e)}")
         return {"error": f"Error getting indexes for {collection}: {str(e)}"}
 
+@mcp.tool(output_schema=None)
+@instrument_tool
+def lookup_codes(
+    icd_diagnoses: list[str] = [],
+    icd_procedures: list[str] = [],
+    icd_version: int = 10,
+    lab_itemids: list[int] = [],
+    icu_itemids: list[int] = [],
+    hcpcs_codes: list[str] = [],
+) -> dict:
+    """Resolve ICD diagnosis/procedure codes (of the given ICD version), lab itemids, ICU itemids and HCPCS codes to their descriptions. Much faster than querying the d_* dictionary collections"""
+    logging.info(
+        f"lookup_codes called: {len(icd_diagnoses)} diagnoses, {len(icd_procedures)} procedures, "
+        f"{len(lab_itemids)} lab items, {len(icu_itemids)} ICU items, {len(hcpcs_codes)} HCPCS"
+    )
+    try:
+        dicts = get_dictionaries()
+        return {
+            "icd_version": icd_version,
+            "icd_diagnoses": {code: dicts.icd_diagnosis(code, icd_version) for code in icd_diagnoses},
+            "icd_procedures": {code: dicts.icd_procedure(code, icd_version) for code in icd_procedures},
+            "lab_items": {str(itemid): dicts.labitem(itemid) for itemid in lab_itemids},
+            "icu_items": {str(itemid): dicts.icu_item(itemid) for itemid in icu_itemids},
+            "hcpcs": {code: dicts.hcpcs_code(code) for code in hcpcs_codes},
+        }
+    except Exception as e:
+        logging.error(f"Error looking up codes: {str(e)}")
+        return {"error": f"Error looking up codes: {str(e)}"}
+
 
 # if __name__ == "__main__":
 #     logging.info("Starting MIMIC-IV MCP Server...")
@@ -0,0 +1,131 @@
+import functools
+import time
+
+import openai
+from prometheus_client import Counter, Gauge, Histogram
+
+# Métricas en formato Prometheus expuestas en /metrics
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por plantilla de ruta",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Peticiones HTTP en curso",
+    ["method"],
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds",
+    "Latencia de los comandos MongoDB por colección y operación",
+    ["collection", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+MCP_TOOL_CALLS = Counter(
+    "mcp_tool_calls_total",
+    "Llamadas a tools MCP por tool y resultado",
+    ["tool", "outcome"],
+)
+MCP_TOOL_DURATION = Histogram(
+    "mcp_tool_duration_seconds",
+    "Duración de las tools MCP",
+    ["tool"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+OPENAI_REQUEST_DURATION = Histogram(
+    "openai_request_duration_seconds",
+    "Latencia de las llamadas a OpenAI por endpoint y resultado",
+    ["endpoint", "outcome"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180, 300),
+)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total",
+    "Consultas a la caché de respuestas por ruta y resultado (hit/miss)",
+    ["route", "result"],
+)
+WARMUP_DURATION = Gauge(
+    "startup_warmup_duration_seconds",
+    "Duración del calentamiento de arranque",
+)
+RESPONSE_CACHE_BYTES = Gauge(
+    "response_cache_bytes",
+    "Bytes ocupados por la caché de respuestas",
+)
+
+
+def observe_mongo_command(collection: str, operation: str, duration_seconds: float):
+    MONGO_COMMAND_DURATION.labels(collection, operation).observe(duration_seconds)
+
+
+def instrument_tool(func):
+    """Decorador para tools MCP: cuenta llamadas (ok/error) y mide su duración."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            result = func(*args, **kwargs)
+            # Las tools devuelven {"error": ...} en lugar de lanzar excepciones
+            if not (isinstance(result, dict) and "error" in result):
+                outcome = "ok"
+            return result
+        finally:
+            MCP_TOOL_DURATION.labels(func.__name__).observe(time.perf_counter() - start)
+            MCP_TOOL_CALLS.labels(func.__name__, outcome).inc()
+    return wrapper
+
+
+class observe_openai:
+    """Context manager que mide una llamada a OpenAI: `with observe_openai("summary"):`."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            outcome = "ok"
+        elif issubclass(exc_type, (TimeoutError, openai.APITimeoutError)):
+            outcome = "timeout"
+        else:
+            outcome = "error"
+        OPENAI_REQUEST_DURATION.labels(self.endpoint, outcome).observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide cada petición HTTP etiquetándola con la
+    plantilla de la ruta (p.ej. /api/patients/{subject_id}) en lugar de la URL real.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.labels(method).inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.labels(method).dec()
+            route = scope.get("route")
+            # Las rutas no encontradas se agrupan para no disparar la cardinalidad
+            template = scope.get("root_path", "") + route.path if route is not None else "unmatched"
+            HTTP_REQUEST_DURATION.labels(method, template, str(status["code"])).observe(time.perf_counter() - start)
@@ -1,9 +1,115 @@
 import os
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, AsyncMongoClient
 from dotenv import load_dotenv
+from app.utils.monitoring import command_listener
 
 load_dotenv()
 
+# USE_ASYNC_DB=false vuelve a registrar las rutas síncronas originales
+# (pymongo bloqueante en el threadpool) para poder compararlas en benchmarks.
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "true").lower() == "true"
+
+# Registro de clientes del proceso: un MongoClient (con su pool) por dataset.
+# Se crean en el lifespan de FastAPI (o bajo demanda en scripts) y se
+# cierran al apagar la aplicación.
+_clients: dict[str, MongoClient] = {}
+_async_clients: dict[str, AsyncMongoClient] = {}
+_clients_lock = threading.Lock()
+
+
+def _use_demo(demo: bool = None) -> bool:
+    if demo is None:
+        demo = os.getenv("USE_DEMO", "false").lower() == "true"
+    return demo
+
+
+def _dataset_config(demo: bool) -> tuple[str, str]:
+    """Devuelve (mongo_url, db_name) del dataset indicado."""
+    if demo:
+        return os.getenv("MONGO_DEMO_URL"), "mimic_iv_demo"
+    return os.getenv("MONGO_FULL_URL"), "mimic_iv_full"
+
+
+def _client_options() -> dict:
+    """
+    Opciones del pool leídas del .env:
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS,
+    MONGO_SOCKET_TIMEOUT_MS y MONGO_COMPRESSORS (p.ej. "zstd,snappy,zlib").
+    """
+    options = {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000")),
+        "appname": "mimic-iv-api",
+        # Atribuye cada comando a la petición en curso (Server-Timing)
+        "event_listeners": [command_listener],
+    }
+    if os.getenv("MONGO_MAX_IDLE_TIME_MS"):
+        options["maxIdleTimeMS"] = int(os.getenv("MONGO_MAX_IDLE_TIME_MS"))
+    if os.getenv("MONGO_SOCKET_TIMEOUT_MS"):
+        options["socketTimeoutMS"] = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS"))
+    compressors = os.getenv("MONGO_COMPRESSORS", "").strip()
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+def get_client(demo: bool = None) -> MongoClient:
+    """
+    Devuelve el MongoClient compartido del dataset (lo crea la primera vez).
+    MongoClient es thread-safe, así que todas las rutas y tools reutilizan su pool.
+    """
+    demo = _use_demo(demo)
+    key = "demo" if demo else "full"
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                mongo_url, _ = _dataset_config(demo)
+                client = MongoClient(mongo_url, **_client_options())
+                _clients[key] = client
+    return client
+
+
+def get_async_client(demo: bool = None) -> AsyncMongoClient:
+    """Equivalente a get_client con la API asíncrona de PyMongo."""
+    demo = _use_demo(demo)
+    key = "demo" if demo else "full"
+    client = _async_clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _async_clients.get(key)
+            if client is None:
+                mongo_url, _ = _dataset_config(demo)
+                client = AsyncMongoClient(mongo_url, **_client_options())
+                _async_clients[key] = client
+    return client
+
+
+def init_clients():
+    """Crea los clientes del dataset configurado (se llama en el arranque)."""
+    get_client()
+    if USE_ASYNC_DB:
+        get_async_client()
+
+
+async def close_clients():
+    """Cierra todos los clientes del registro (se llama en el apagado)."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        async_clients = list(_async_clients.values())
+        _clients.clear()
+        _async_clients.clear()
+    for client in clients:
+        client.close()
+    for client in async_clients:
+        await client.close()
+
+
 def get_db(demo: bool = None):
     """
     Devuelve una conexión a la base de datos MIMIC-IV.
@@ -11,17 +117,26 @@ def get_db(demo: bool = None):
     demo=False conecta al dataset completo.
     Si no se especifica, usa la variable USE_DEMO del .env
     """
-    if demo is None:
-        demo = os.getenv("USE_DEMO", "false").lower() == "true"
-    
-    if demo:
-        mongo_url = os.getenv("MONGO_DEMO_URL")
-        db_name = "mimic_iv_demo"
-    else:
-        mongo_url = os.getenv("MONGO_FULL_URL")
-        db_name = "mimic_iv_full"
-    
-    client = MongoClient(mongo_url)
-    db = client[db_name]
-    
-    return db
\ No newline at end of file
+    demo = _use_demo(demo)
+    _, db_name = _dataset_config(demo)
+    db = get_client(demo)[db_name]
+
+    return db
+
+
+def get_async_db(demo: bool = None):
+    """Versión asíncrona de get_db (AsyncDatabase de PyMongo)."""
+    demo = _use_demo(demo)
+    _, db_name = _dataset_config(demo)
+    return get_async_client(demo)[db_name]
+
+
+def sync_fallback(sync_impl):
+    """
+    Decorador para rutas con doble implementación.
+    Registra la función async salvo que USE_ASYNC_DB=false, en cuyo caso
+    registra la versión síncrona original `sync_impl`.
+    """
+    def decorator(async_impl):
+        return async_impl if USE_ASYNC_DB else sync_impl
+    return decorator
@@ -0,0 +1,220 @@
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import bson
+from pymongo import monitoring
+from starlette.datastructures import MutableHeaders
+
+from app.utils.metrics import observe_mongo_command
+from app.utils import slow_ops
+
+logger = logging.getLogger(__name__)
+
+# Umbral (ms) a partir del cual se escribe una línea de log por petición
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+# Medir también los bytes devueltos por Mongo. Re-codifica cada respuesta a BSON
+# (CPU y memoria en respuestas grandes), así que solo se activa para diagnosticar
+TRACE_REPLY_BYTES = os.getenv("MONGO_TRACE_BYTES", "false").lower() == "true"
+# Caracteres no válidos en un nombre de métrica de Server-Timing (token de RFC 9110)
+_NON_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+def _metric_name(name: str) -> str:
+    return _NON_TOKEN.sub("_", name)
+
+
+def _mongo_desc(count: int, docs: int, nbytes: int) -> str:
+    desc = f"{count} cmds, {docs} docs"
+    return f"{desc}, {nbytes} B" if TRACE_REPLY_BYTES else desc
+
+
+class RequestTrace:
+    """Acumula los comandos Mongo y las marcas de tiempo de una petición HTTP."""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.status = None
+        self.start = time.perf_counter()
+        # (colección, operación) -> [comandos, ms, documentos, bytes]
+        self.commands: dict[tuple[str, str], list] = {}
+        # Marcas adicionales para Server-Timing: (nombre, ms, descripción)
+        self.marks: list[tuple[str, float | None, str | None]] = []
+
+    def add_command(self, collection: str, operation: str, duration_ms: float, docs: int, nbytes: int):
+        stats = self.commands.setdefault((collection, operation), [0, 0.0, 0, 0])
+        stats[0] += 1
+        stats[1] += duration_ms
+        stats[2] += docs
+        stats[3] += nbytes
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def mongo_totals(self) -> tuple[int, float, int, int]:
+        count = sum(s[0] for s in self.commands.values())
+        duration = sum(s[1] for s in self.commands.values())
+        docs = sum(s[2] for s in self.commands.values())
+        nbytes = sum(s[3] for s in self.commands.values())
+        return count, duration, docs, nbytes
+
+    def server_timing(self) -> str:
+        """Construye la cabecera Server-Timing con el total y el desglose por colección."""
+        count, duration, docs, nbytes = self.mongo_totals()
+        parts = [
+            f"total;dur={self.elapsed_ms():.1f}",
+            f'mongo;dur={duration:.1f};desc="{_mongo_desc(count, docs, nbytes)}"',
+        ]
+        for (collection, operation), (n, ms, d, b) in self.commands.items():
+            name = _metric_name(f"mongo.{collection}.{operation}")
+            parts.append(f'{name};dur={ms:.1f};desc="{_mongo_desc(n, d, b)}"')
+        for name, ms, desc in self.marks:
+            part = _metric_name(name)
+            if ms is not None:
+                part += f";dur={ms:.1f}"
+            if desc:
+                part += f';desc="{desc}"'
+            parts.append(part)
+        return ", ".join(parts)
+
+    def as_log(self) -> dict:
+        count, duration, docs, nbytes = self.mongo_totals()
+        return {
+            "event": "slow_request",
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "total_ms": round(self.elapsed_ms(), 1),
+            "mongo_ms": round(duration, 1),
+            "mongo_commands": count,
+            "mongo_docs": docs,
+            "mongo_bytes": nbytes,
+            "commands": [
+                {"collection": c, "operation": o, "count": n, "ms": round(ms, 1), "docs": d, "bytes": b}
+                for (c, o), (n, ms, d, b) in self.commands.items()
+            ],
+            "marks": [{"name": n, "ms": None if ms is None else round(ms, 1), "desc": desc} for n, ms, desc in self.marks],
+        }
+
+
+_current_trace: ContextVar[RequestTrace | None] = ContextVar("request_trace", default=None)
+
+
+def current_trace() -> RequestTrace | None:
+    """Traza de la petición en curso (None fuera de una petición HTTP)."""
+    return _current_trace.get()
+
+
+def add_timing(name: str, duration_ms: float = None, description: str = None):
+    """Añade una marca a la cabecera Server-Timing de la petición en curso."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.marks.append((name, duration_ms, description))
+
+
+@contextmanager
+def timed(name: str, description: str = None):
+    """Mide un bloque de código y lo publica en Server-Timing."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, (time.perf_counter() - start) * 1000, description)
+
+
+def _command_collection(command_name: str, command) -> str:
+    if command_name == "getMore":
+        return str(command.get("collection", "?"))
+    target = command.get(command_name)
+    return target if isinstance(target, str) else "<db>"
+
+
+def _reply_docs(reply) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        return len(batch) if batch is not None else 0
+    n = reply.get("n")
+    return n if isinstance(n, int) else 0
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Listener de comandos de PyMongo que asigna cada comando a la petición
+    HTTP en curso (vía contextvars), tanto en el cliente síncrono como en el async,
+    alimenta el histograma de latencias de Mongo de /metrics y pasa los
+    find/aggregate lentos al registro de operaciones lentas (slow_ops).
+    """
+
+    def __init__(self):
+        self._pending: dict[tuple, tuple] = {}
+
+    def started(self, event):
+        key = (event.connection_id, event.request_id)
+        # Solo se conserva el comando completo de find/aggregate (para el explain de ops lentas)
+        command = event.command if event.command_name in slow_ops.EXPLAINABLE_COMMANDS else None
+        self._pending[key] = (_current_trace.get(), _command_collection(event.command_name, event.command), command)
+
+    def succeeded(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        trace, collection, command = pending
+        observe_mongo_command(collection, event.command_name, event.duration_micros / 1e6)
+        if command is not None:
+            slow_ops.maybe_record(event.database_name, collection, event.command_name, command, event.duration_micros / 1000)
+        if trace is None:
+            return
+        reply = event.reply
+        nbytes = len(bson.encode(reply)) if TRACE_REPLY_BYTES else 0
+        trace.add_command(collection, event.command_name, event.duration_micros / 1000, _reply_docs(reply), nbytes)
+
+    def failed(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        trace, collection, _ = pending
+        observe_mongo_command(collection, f"{event.command_name}.failed", event.duration_micros / 1e6)
+        if trace is not None:
+            trace.add_command(collection, f"{event.command_name}.failed", event.duration_micros / 1000, 0, 0)
+
+
+command_listener = MongoCommandListener()
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI: abre una traza por petición, añade la cabecera
+    Server-Timing a la respuesta y escribe un log estructurado si la
+    petición supera SLOW_REQUEST_MS.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            if trace.elapsed_ms() >= SLOW_REQUEST_MS:
+                logger.warning(json.dumps(trace.as_log(), ensure_ascii=False))
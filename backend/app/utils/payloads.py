@@ -0,0 +1,197 @@
+import gzip
+import inspect
+import json
+import logging
+from datetime import datetime, timezone
+from time import perf_counter
+from urllib.parse import urlencode
+
+import orjson
+from bson import Binary
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se sirve gzip/identity
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Colección con las respuestas ya serializadas y comprimidas de los endpoints
+# que solo dependen de colecciones preagregadas
+PAYLOADS_COLLECTION = "_payloads"
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# route -> (colecciones de origen, función síncrona que construye la respuesta)
+_registry: dict[str, tuple[list[str], callable]] = {}
+
+
+def _encode(value) -> bytes:
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+class Payload:
+    """Respuesta JSON serializada una sola vez, con sus variantes gzip y brotli."""
+
+    __slots__ = ("body", "gzip", "br")
+
+    def __init__(self, body: bytes, gzip_body: bytes | None, br_body: bytes | None):
+        self.body = body
+        self.gzip = gzip_body
+        self.br = br_body
+
+    @classmethod
+    def from_value(cls, value) -> "Payload":
+        return cls.from_body(_encode(value))
+
+    @classmethod
+    def from_body(cls, body: bytes, gzip_body: bytes | None = None, br_body: bytes | None = None) -> "Payload":
+        """
+        Completa las variantes de AVAILABLE_ENCODINGS que falten: el 304 elige el
+        ETag sin leer el payload, así que todo payload de este proceso debe tener
+        las mismas codificaciones. Compresión máxima: se paga una vez por versión
+        de build, no por petición.
+        """
+        if gzip_body is None:
+            gzip_body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        if br_body is None and brotli is not None:
+            br_body = brotli.compress(body, quality=BROTLI_QUALITY)
+        return cls(body, gzip_body, br_body)
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "Payload":
+        # Un documento guardado donde no estaba brotli no trae "br"
+        return cls.from_body(
+            bytes(doc["json"]), doc.get("gzip") and bytes(doc["gzip"]), doc.get("br") and bytes(doc["br"])
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.body) + len(self.gzip or b"") + len(self.br or b"")
+
+    def variant(self, accept_encoding: str | None) -> tuple[bytes, str | None]:
+        """
+        Elige br > gzip > identity según Accept-Encoding (respetando q=0) entre
+        AVAILABLE_ENCODINGS, la misma lista con la que se calcula el ETag del 304.
+        """
+        encoding = choose_encoding(accept_encoding, AVAILABLE_ENCODINGS)
+        body = {"br": self.br, "gzip": self.gzip}.get(encoding, self.body)
+        return body, encoding
+
+    def response(self, accept_encoding: str | None, headers: dict, etag_base: str | None = None) -> Response:
+        body, encoding = self.variant(accept_encoding)
+        headers = {**headers, "Vary": "Accept-Encoding"}
+        if etag_base:
+            headers["ETag"] = etag_for(etag_base, encoding)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Codificaciones que tendrán los payloads construidos en este proceso
+AVAILABLE_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: str | None, available: tuple[str, ...]) -> str | None:
+    """br > gzip > identity (None) entre las disponibles según Accept-Encoding (respetando q=0)."""
+    accepted = {}
+    for token in (accept_encoding or "").split(","):
+        name, _, params = token.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def etag_for(etag_base: str, encoding: str | None) -> str:
+    """
+    ETag débil distinto por codificación (RFC 9110: un validador no puede
+    compartirse entre representaciones con distinto Content-Encoding).
+    """
+    return f'W/"{etag_base}-{encoding or "identity"}"'
+
+
+def payload_id(route: str, params: tuple) -> str:
+    return f"{route}?{urlencode(params)}" if params else route
+
+
+def version_stamp(version: tuple) -> str:
+    return json.dumps(version, default=str)
+
+
+def find_payload(db, route: str, params: tuple, version: tuple) -> Payload | None:
+    doc = db[PAYLOADS_COLLECTION].find_one({"_id": payload_id(route, params), "version": version_stamp(version)})
+    return Payload.from_document(doc) if doc else None
+
+
+async def find_payload_async(db, route: str, params: tuple, version: tuple) -> Payload | None:
+    doc = await db[PAYLOADS_COLLECTION].find_one({"_id": payload_id(route, params), "version": version_stamp(version)})
+    return Payload.from_document(doc) if doc else None
+
+
+def save_payload(db, route: str, params: tuple, version: tuple, payload: Payload):
+    db[PAYLOADS_COLLECTION].replace_one(
+        {"_id": payload_id(route, params)},
+        {
+            "route": route,
+            "params": dict(params),
+            "version": version_stamp(version),
+            "json": Binary(payload.body),
+            "gzip": Binary(payload.gzip) if payload.gzip else None,
+            "br": Binary(payload.br) if payload.br else None,
+            "built_at": datetime.now(timezone.utc),
+        },
+        upsert=True,
+    )
+
+
+def register(route: str, collections: list[str], builder):
+    """Registra un endpoint estático (lo hace cached_response al decorar la versión síncrona)."""
+    _registry[route] = (collections, builder)
+
+
+def default_params(builder) -> tuple:
+    """Parámetros por defecto de la ruta (p.ej. min_count=50 en el icicle)."""
+    return tuple(sorted(
+        (name, p.default) for name, p in inspect.signature(builder).parameters.items()
+        if p.default is not inspect.Parameter.empty
+    ))
+
+
+def build_static_payloads(db, versions: dict, persist: bool = True, reuse: bool = True) -> dict[tuple, tuple]:
+    """
+    Construye (o reutiliza de _payloads si su versión coincide) el payload de
+    cada endpoint registrado con sus parámetros por defecto.
+    Devuelve {(route, params): (version, Payload)} para precargar la caché.
+    """
+    built = {}
+    for route, (collections, builder) in _registry.items():
+        params = default_params(builder)
+        version = tuple(versions.get(c) for c in collections)
+        start = perf_counter()
+        try:
+            payload = find_payload(db, route, params, version) if reuse and None not in version else None
+            source = "reutilizado"
+            if payload is None:
+                payload = Payload.from_value(builder(**dict(params)))
+                source = "construido"
+                if persist and None not in version:
+                    save_payload(db, route, params, version, payload)
+        except Exception as e:
+            logger.warning(f"No se pudo construir el payload de {route}: {str(e)}")
+            continue
+        built[(route, params)] = (version, payload)
+        logger.info(
+            f"Payload {payload_id(route, params)} {source} en {(perf_counter() - start) * 1000:.0f} ms "
+            f"({len(payload.body)} B json, {len(payload.gzip or b'')} B gzip, {len(payload.br or b'')} B br)"
+        )
+    return built
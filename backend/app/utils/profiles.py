@@ -0,0 +1,300 @@
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from time import perf_counter
+
+from pymongo import ReplaceOne
+
+from app.utils.dictionaries import DICTIONARY_COLLECTIONS, get_dictionaries
+from app.utils.mongo import get_db
+from app.utils.monitoring import add_timing
+from app.utils.response_cache import BUILD_VERSIONS_COLLECTION, build_versions, build_versions_async
+from app.utils.sanitize import is_missing, sanitize_document
+
+logger = logging.getLogger(__name__)
+
+# Vista de paciente materializada: un documento por subject_id con el paciente,
+# sus ingresos (con un resumen de laboratorio por ingreso), diagnósticos y
+# procedimientos ya resueltos. /api/patients/{id} la sirve con un único find_one
+# y vuelve al camino en vivo si el paciente no tiene perfil o está desactualizado.
+PROFILES_COLLECTION = "patient_profiles"
+# Colecciones de las que sale cada perfil; si alguna cambia de versión de build
+# el perfil deja de servirse hasta reconstruirlo
+PROFILE_SOURCES = [
+    "hosp_patients",
+    "hosp_admissions",
+    "hosp_diagnoses_icd",
+    "hosp_procedures_icd",
+    "hosp_labevents",
+    *DICTIONARY_COLLECTIONS,
+]
+# false: /api/patients/{id} siempre usa el camino en vivo
+USE_PATIENT_PROFILES = os.getenv("USE_PATIENT_PROFILES", "true").lower() == "true"
+# Bloques de subject_id construidos en paralelo y pacientes por bloque
+PROFILE_BUILD_WORKERS = int(os.getenv("PROFILE_BUILD_WORKERS", "4"))
+PROFILE_CHUNK_SUBJECTS = int(os.getenv("PROFILE_CHUNK_SUBJECTS", "500"))
+
+_DIAGNOSES_SORT = [("subject_id", 1), ("hadm_id", 1), ("seq_num", 1)]
+_PROCEDURES_SORT = [("subject_id", 1), ("hadm_id", 1), ("chartdate", -1), ("seq_num", 1)]
+# valuenum solo si es numérico y no NaN (NaN < -inf en el orden de MongoDB)
+_VALUENUM = {
+    "$cond": [{"$and": [{"$isNumber": "$valuenum"}, {"$gt": ["$valuenum", float("-inf")]}]}, "$valuenum", None]
+}
+
+
+def source_versions(versions: dict) -> dict:
+    """{colección: versión} de las colecciones de origen (lo que se guarda en cada perfil)."""
+    return {collection: (versions.get(collection) or (None, None))[0] for collection in PROFILE_SOURCES}
+
+
+_PROFILE_SECTIONS = ("patient", "admissions", "diagnoses", "procedures")
+
+
+def _profile_projection(sections) -> dict:
+    return {"_id": 0, "source_versions": 1, **{section: 1 for section in sections}}
+
+
+def _profile_response(profile: dict | None, versions: dict, start: float) -> dict | None:
+    if profile is None:
+        status = "miss"
+    elif profile.get("source_versions") != source_versions(versions):
+        status = "stale"
+    else:
+        status = "hit"
+    add_timing("profile", (perf_counter() - start) * 1000, status)
+    if status != "hit":
+        return None
+    return {section: profile[section] for section in _PROFILE_SECTIONS if section in profile}
+
+
+def load_profile(db, subject_id: int, sections=_PROFILE_SECTIONS) -> dict | None:
+    """
+    Secciones `sections` de la vista de paciente desde patient_profiles (solo
+    esas se leen), o None si hay que ir al camino en vivo.
+    """
+    if not USE_PATIENT_PROFILES:
+        return None
+    start = perf_counter()
+    profile = db[PROFILES_COLLECTION].find_one({"subject_id": subject_id}, _profile_projection(sections))
+    return _profile_response(profile, build_versions(db), start)
+
+
+async def load_profile_async(db, subject_id: int, sections=_PROFILE_SECTIONS) -> dict | None:
+    if not USE_PATIENT_PROFILES:
+        return None
+    start = perf_counter()
+    profile = await db[PROFILES_COLLECTION].find_one({"subject_id": subject_id}, _profile_projection(sections))
+    return _profile_response(profile, await build_versions_async(db), start)
+
+
+def lab_summary_pipeline(query: dict) -> list[dict]:
+    """$group por (subject_id, hadm_id, itemid): recuento, anómalos, rango de valores y fechas."""
+    return [
+        {"$match": {**query, "hadm_id": {"$ne": None}}},
+        {"$group": {
+            "_id": {"subject_id": "$subject_id", "hadm_id": "$hadm_id", "itemid": "$itemid"},
+            "count": {"$sum": 1},
+            "abnormal": {"$sum": {"$cond": [{"$eq": ["$flag", "abnormal"]}, 1, 0]}},
+            "valuenum_min": {"$min": _VALUENUM},
+            "valuenum_max": {"$max": _VALUENUM},
+            "valuenum_mean": {"$avg": _VALUENUM},
+            "valueuom": {"$max": "$valueuom"},
+            "first_charttime": {"$min": "$charttime"},
+            "last_charttime": {"$max": "$charttime"},
+        }},
+    ]
+
+
+def group_lab_summaries(rows) -> dict[tuple, list[dict]]:
+    """Resultados de lab_summary_pipeline agrupados por (subject_id, hadm_id)."""
+    summaries: dict[tuple, list[dict]] = {}
+    for row in rows:
+        key = row.pop("_id")
+        if is_missing(key.get("hadm_id")):
+            continue
+        summary = {"itemid": key["itemid"], **row}
+        summaries.setdefault((key["subject_id"], key["hadm_id"]), []).append(summary)
+    return summaries
+
+
+def resolve_lab_summary(dicts, summaries: list[dict]) -> list[dict]:
+    """Añade label/fluid/category de d_labitems, limpia y ordena por categoría y test."""
+    for summary in summaries:
+        item = dicts.labitems.get(summary["itemid"])
+        if item is not None:
+            for field, value in zip(("label", "fluid", "category"), item):
+                summary[field] = value
+        if isinstance(summary.get("valuenum_mean"), float):
+            summary["valuenum_mean"] = round(summary["valuenum_mean"], 4)
+        sanitize_document(summary)
+    summaries.sort(key=lambda s: (s.get("category") or "", s.get("label") or "", s["itemid"]))
+    return summaries
+
+
+def _build_chunk(db, dicts, bounds: tuple, versions: dict) -> int:
+    """Construye y guarda los perfiles del bloque de subject_id [lo, hi]. Devuelve cuántos."""
+    query = {"subject_id": {"$gte": bounds[0], "$lte": bounds[1]}}
+    profiles = {}
+    for patient in db["hosp_patients"].find(query, {"_id": 0}):
+        profiles[patient["subject_id"]] = {
+            "subject_id": patient["subject_id"],
+            "patient": sanitize_document(patient, "hosp_patients"),
+            "admissions": [],
+            "diagnoses": [],
+            "procedures": [],
+        }
+
+    def sections(collection: str, section: str, sort: list):
+        for doc in db[collection].find(query, {"_id": 0}).sort(sort):
+            profile = profiles.get(doc.get("subject_id"))
+            if profile is not None:
+                profile[section].append(sanitize_document(doc, collection))
+
+    sections("hosp_admissions", "admissions", [("subject_id", 1), ("admittime", -1)])
+    sections("hosp_diagnoses_icd", "diagnoses", _DIAGNOSES_SORT)
+    sections("hosp_procedures_icd", "procedures", _PROCEDURES_SORT)
+    labs = group_lab_summaries(db["hosp_labevents"].aggregate(lab_summary_pipeline(query), allowDiskUse=True))
+
+    built_at = datetime.now(timezone.utc)
+    operations = []
+    for subject_id, profile in profiles.items():
+        for admission in profile["admissions"]:
+            admission["lab_summary"] = resolve_lab_summary(dicts, labs.get((subject_id, admission.get("hadm_id")), []))
+        for diagnosis in profile["diagnoses"]:
+            description = dicts.icd_diagnosis(diagnosis.get("icd_code"), diagnosis.get("icd_version"))
+            if description is not None:
+                diagnosis["description"] = description
+        for procedure in profile["procedures"]:
+            description = dicts.icd_procedure(procedure.get("icd_code"), procedure.get("icd_version"))
+            if description is not None:
+                procedure["description"] = description
+        profile["source_versions"] = versions
+        profile["built_at"] = built_at
+        operations.append(ReplaceOne({"subject_id": subject_id}, profile, upsert=True))
+
+    if operations:
+        db[PROFILES_COLLECTION].bulk_write(operations, ordered=False)
+    # Perfiles de pacientes que ya no existen en el rango
+    db[PROFILES_COLLECTION].delete_many({"subject_id": {**query["subject_id"], "$nin": list(profiles)}})
+    return len(operations)
+
+
+def _subject_ids(db, start: int | None, end: int | None, stale_only: bool, versions: dict) -> list[int]:
+    """subject_id (ordenados) a construir dentro de [start, end]."""
+    query = {}
+    if start is not None or end is not None:
+        bounds = {}
+        if start is not None:
+            bounds["$gte"] = start
+        if end is not None:
+            bounds["$lte"] = end
+        query["subject_id"] = bounds
+    subject_ids = [doc["subject_id"] for doc in db["hosp_patients"].find(query, {"_id": 0, "subject_id": 1}).sort("subject_id", 1)]
+    if stale_only:
+        current = {
+            doc["subject_id"]
+            for doc in db[PROFILES_COLLECTION].find({**query, "source_versions": versions}, {"_id": 0, "subject_id": 1})
+        }
+        subject_ids = [subject_id for subject_id in subject_ids if subject_id not in current]
+    return subject_ids
+
+
+def _chunk_bounds(subject_ids: list[int], chunk_size: int, start: int | None, end: int | None, stale_only: bool) -> list[tuple]:
+    """
+    Rangos [lo, hi] de `chunk_size` pacientes. En una reconstrucción completa
+    los rangos cubren todo [start, end] para que cada bloque borre los perfiles
+    de pacientes que ya no existen; con stale_only se ciñen a los pacientes
+    pendientes para no reconstruir los que están al día.
+    """
+    chunks = [subject_ids[i:i + chunk_size] for i in range(0, len(subject_ids), chunk_size)]
+    if stale_only:
+        return [(chunk[0], chunk[-1]) for chunk in chunks]
+    bounds = []
+    for i, chunk in enumerate(chunks):
+        lo = start if i == 0 and start is not None else chunk[0]
+        hi = chunks[i + 1][0] - 1 if i + 1 < len(chunks) else (end if end is not None else chunk[-1])
+        bounds.append((lo, hi))
+    return bounds
+
+
+def _stamp(db):
+    db[BUILD_VERSIONS_COLLECTION].update_one(
+        {"_id": PROFILES_COLLECTION},
+        {"$inc": {"version": 1}, "$set": {"built_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
+def build_profiles(
+    db,
+    start: int | None = None,
+    end: int | None = None,
+    stale_only: bool = False,
+    chunk_size: int = PROFILE_CHUNK_SUBJECTS,
+    workers: int = PROFILE_BUILD_WORKERS,
+) -> dict:
+    """
+    (Re)construye los perfiles de los pacientes con subject_id en [start, end]
+    (todos si no se indica), en bloques de `chunk_size` pacientes construidos
+    en paralelo. stale_only: solo los bloques con algún paciente sin perfil o
+    con perfil desactualizado (cada bloque se reconstruye entero).
+    """
+    versions = source_versions(build_versions(db))
+    dicts = get_dictionaries()
+    db[PROFILES_COLLECTION].create_index([("subject_id", 1)])
+
+    subject_ids = _subject_ids(db, start, end, stale_only, versions)
+    chunks = _chunk_bounds(subject_ids, max(1, chunk_size), start, end, stale_only)
+    built = 0
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="profile-build") as executor:
+        futures = {executor.submit(_build_chunk, db, dicts, bounds, versions): bounds for bounds in chunks}
+        for future, (lo, hi) in futures.items():
+            try:
+                built += future.result()
+            except Exception as e:
+                logger.warning(f"Bloque {lo}-{hi} fallido: {e!r}")
+                errors.append({"start": lo, "end": hi, "error": str(e)})
+    if built:
+        _stamp(db)
+    return {"subjects": len(subject_ids), "chunks": len(chunks), "built": built, "errors": errors}
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI de los scripts build_patient_profiles.py."""
+    parser = argparse.ArgumentParser(description="Construye patient_profiles (vista de paciente materializada)")
+    parser.add_argument("--from-subject", type=int, help="subject_id inicial (incluido)")
+    parser.add_argument("--to-subject", type=int, help="subject_id final (incluido)")
+    parser.add_argument("--stale", action="store_true", help="solo pacientes sin perfil o con perfil desactualizado")
+    parser.add_argument("--chunk-size", type=int, default=PROFILE_CHUNK_SUBJECTS, help="pacientes por bloque")
+    parser.add_argument("--workers", type=int, default=PROFILE_BUILD_WORKERS, help="bloques en paralelo")
+    args = parser.parse_args(argv)
+
+    db = get_db()
+    print(f"=== Construyendo {PROFILES_COLLECTION} en {db.name} ===")
+    start = perf_counter()
+    result = build_profiles(
+        db,
+        start=args.from_subject,
+        end=args.to_subject,
+        stale_only=args.stale,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+    )
+    print(
+        f"{result['built']} perfiles de {result['subjects']} pacientes "
+        f"({result['chunks']} bloques) en {perf_counter() - start:.1f}s"
+    )
+    for error in result["errors"]:
+        print(f"  ❌ {error['start']}-{error['end']}: {error['error']}")
+    if result["errors"]:
+        return 1
+    print("=== Completado ===")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
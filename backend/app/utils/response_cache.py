@@ -0,0 +1,329 @@
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+from app.utils.metrics import RESPONSE_CACHE_BYTES, RESPONSE_CACHE_REQUESTS
+from app.utils.mongo import get_db, get_async_db
+from app.utils.monitoring import add_timing, timed
+from app.utils import payloads
+
+logger = logging.getLogger(__name__)
+
+# Colección donde los scripts build_*/calculate_* dejan la versión de lo que construyen:
+# {_id: <colección>, version: <int>, built_at: <fecha>}
+BUILD_VERSIONS_COLLECTION = "_build_versions"
+# Tamaño máximo de la caché de respuestas (bytes de JSON + gzip + brotli)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Cada cuánto se vuelve a leer _build_versions (s)
+BUILD_VERSION_POLL_S = float(os.getenv("BUILD_VERSION_POLL_S", "5"))
+# Caducidad de las entradas cuya colección aún no tiene versión (scripts antiguos)
+RESPONSE_CACHE_UNVERSIONED_TTL_S = float(os.getenv("RESPONSE_CACHE_UNVERSIONED_TTL_S", "300"))
+
+_versions: dict[str, tuple[float, dict]] = {}
+# Colecciones que el importador marcó como normalizadas ({normalized: true}: sin campos vacíos)
+_normalized: dict[str, frozenset] = {}
+
+
+def _parse_versions(db_name: str, docs: list) -> dict:
+    _normalized[db_name] = frozenset(doc["_id"] for doc in docs if doc.get("normalized"))
+    return {doc["_id"]: (doc.get("version"), doc.get("built_at")) for doc in docs}
+
+
+def _fresh_versions(db_name: str) -> dict | None:
+    cached = _versions.get(db_name)
+    if cached and time.monotonic() - cached[0] < BUILD_VERSION_POLL_S:
+        return cached[1]
+    return None
+
+
+def stamp_build_version(db, collection: str, normalized: bool = False):
+    """
+    Marca una nueva versión de `collection` en _build_versions (invalida las cachés del backend).
+    normalized=True indica que sus documentos no tienen campos vacíos: el backend no los limpia.
+    """
+    db[BUILD_VERSIONS_COLLECTION].update_one(
+        {"_id": collection},
+        {"$inc": {"version": 1}, "$set": {"built_at": datetime.now(timezone.utc), "normalized": normalized}},
+        upsert=True,
+    )
+
+
+def build_versions(db) -> dict:
+    """Versiones de build por colección ({colección: (version, built_at)}), releídas cada BUILD_VERSION_POLL_S."""
+    versions = _fresh_versions(db.name)
+    if versions is None:
+        versions = _parse_versions(db.name, list(db[BUILD_VERSIONS_COLLECTION].find({})))
+        _versions[db.name] = (time.monotonic(), versions)
+    return versions
+
+
+async def build_versions_async(db) -> dict:
+    versions = _fresh_versions(db.name)
+    if versions is None:
+        versions = _parse_versions(db.name, await db[BUILD_VERSIONS_COLLECTION].find({}).to_list())
+        _versions[db.name] = (time.monotonic(), versions)
+    return versions
+
+
+def normalized_collections(db) -> frozenset:
+    """Colecciones importadas ya normalizadas (se leen junto a las versiones de build)."""
+    build_versions(db)
+    return _normalized.get(db.name, frozenset())
+
+
+async def normalized_collections_async(db) -> frozenset:
+    await build_versions_async(db)
+    return _normalized.get(db.name, frozenset())
+
+
+class ResponseCache:
+    """
+    Caché LRU en memoria de respuestas ya serializadas, limitada por bytes.
+    Cada entrada guarda la versión de build de sus colecciones de origen:
+    si la versión actual no coincide, la entrada se descarta.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, version: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, value, size, stored_at = entry
+                expired = None in version and time.monotonic() - stored_at >= RESPONSE_CACHE_UNVERSIONED_TTL_S
+                if entry_version == version and not expired:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, version: tuple, value, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, value, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            RESPONSE_CACHE_BYTES.set(self._bytes)
+
+    def _remove(self, key: tuple):
+        self._bytes -= self._entries.pop(key)[2]
+        RESPONSE_CACHE_BYTES.set(self._bytes)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            RESPONSE_CACHE_BYTES.set(0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "keys": [{"route": k[1], "params": dict(k[2]), "database": k[0]} for k in self._entries],
+            }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+
+def _version_of(versions: dict, collections: list[str]) -> tuple:
+    return tuple(versions.get(c) for c in collections)
+
+
+def _params_key(kwargs: dict) -> tuple:
+    return tuple(sorted(kwargs.items()))
+
+
+def _validators(route: str, params: tuple, version: tuple) -> tuple[str | None, datetime | None]:
+    """
+    Base del ETag y Last-Modified derivados de la versión de build de las
+    colecciones de origen. Sin versión (scripts sin marcar) no hay validadores.
+    El ETag que se envía añade la codificación (payloads.etag_for).
+    """
+    if None in version:
+        return None, None
+    raw = json.dumps([route, params, version], sort_keys=True, default=str)
+    etag = hashlib.sha1(raw.encode()).hexdigest()[:20]
+    built = [v[1] for v in version if isinstance(v[1], datetime)]
+    last_modified = None
+    if built:
+        # PyMongo devuelve fechas naive en UTC
+        last_modified = max(b if b.tzinfo else b.replace(tzinfo=timezone.utc) for b in built).replace(microsecond=0)
+    return etag, last_modified
+
+
+def _not_modified(request: Request, etag: str | None, last_modified: datetime | None) -> bool:
+    if etag is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    # If-None-Match tiene prioridad sobre If-Modified-Since y compara en modo débil (RFC 9110)
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _validator_headers(last_modified: datetime | None, cache_control: str | None) -> dict:
+    """Cabeceras comunes a 200 y 304 (el ETag depende de la codificación y lo pone Payload.response)."""
+    headers = {}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def _record(route: str, result: str):
+    RESPONSE_CACHE_REQUESTS.labels(route, result).inc()
+    add_timing("cache", description=result)
+
+
+def _with_http_params(func, wrapper):
+    """Añade Request/Response a la firma que ve FastAPI sin cambiar la de la ruta."""
+    signature = inspect.signature(func)
+    extra = [
+        inspect.Parameter("_cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+        inspect.Parameter("_cache_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+    ]
+    wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), *extra])
+    return wrapper
+
+
+def cached_response(route: str, collections: list[str], cache_control: str | None = None):
+    """
+    Cachea en memoria la respuesta de un endpoint por (BD, ruta, parámetros)
+    hasta que cambie la versión de build de alguna de `collections`, y
+    responde a peticiones condicionales (If-None-Match / If-Modified-Since)
+    con 304 sin leer las colecciones de origen.
+    La respuesta se guarda ya serializada y comprimida (payloads.Payload) y se
+    sirve en la codificación que pida Accept-Encoding; antes de reconstruirla se
+    busca en _payloads por si un script o el arranque ya la precalcularon.
+    Sirve tanto para la versión async como para la síncrona de la ruta.
+    """
+    def prepare(kwargs: dict, versions: dict | None):
+        """Devuelve (respuesta 304 o None, parámetros, versión, cabeceras, base del ETag, Accept-Encoding)."""
+        request = kwargs.pop("_cache_request", None)
+        kwargs.pop("_cache_response", None)
+        params = _params_key(kwargs)
+        accept_encoding = request.headers.get("accept-encoding") if request is not None else None
+        if versions is None:
+            return None, params, None, {}, None, accept_encoding
+        version = _version_of(versions, collections)
+        etag_base, last_modified = _validators(route, params, version)
+        headers = _validator_headers(last_modified, cache_control)
+        if request is not None and etag_base is not None:
+            # Codificación que tendría el 200 para esta petición
+            etag = payloads.etag_for(etag_base, payloads.choose_encoding(accept_encoding, payloads.AVAILABLE_ENCODINGS))
+            if _not_modified(request, etag, last_modified):
+                _record(route, "not_modified")
+                not_modified = Response(status_code=304, headers={**headers, "ETag": etag, "Vary": "Accept-Encoding"})
+                return not_modified, params, version, headers, etag_base, accept_encoding
+        return None, params, version, headers, etag_base, accept_encoding
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                db = get_async_db()
+                try:
+                    versions = await build_versions_async(db)
+                except Exception as e:
+                    logger.warning(f"No se pudo leer {BUILD_VERSIONS_COLLECTION}: {str(e)}")
+                    versions = None
+                not_modified, params, version, headers, etag_base, accept_encoding = prepare(kwargs, versions)
+                if not_modified is not None:
+                    return not_modified
+                if version is None:
+                    return await func(*args, **kwargs)
+                key = (db.name, route, params)
+                payload = response_cache.get(key, version)
+                _record(route, "miss" if payload is None else "hit")
+                if payload is None:
+                    # Solo se guarda lo que no venía de la caché (un hit no renueva stored_at)
+                    if None not in version:
+                        payload = await payloads.find_payload_async(db, route, params, version)
+                    if payload is None:
+                        value = await func(*args, **kwargs)
+                        with timed("serialize"):
+                            payload = payloads.Payload.from_value(value)
+                    response_cache.put(key, version, payload, payload.nbytes)
+                return payload.response(accept_encoding, headers, etag_base)
+            return _with_http_params(func, async_wrapper)
+
+        payloads.register(route, collections, func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            db = get_db()
+            try:
+                versions = build_versions(db)
+            except Exception as e:
+                logger.warning(f"No se pudo leer {BUILD_VERSIONS_COLLECTION}: {str(e)}")
+                versions = None
+            not_modified, params, version, headers, etag_base, accept_encoding = prepare(kwargs, versions)
+            if not_modified is not None:
+                return not_modified
+            if version is None:
+                return func(*args, **kwargs)
+            key = (db.name, route, params)
+            payload = response_cache.get(key, version)
+            _record(route, "miss" if payload is None else "hit")
+            if payload is None:
+                if None not in version:
+                    payload = payloads.find_payload(db, route, params, version)
+                if payload is None:
+                    value = func(*args, **kwargs)
+                    with timed("serialize"):
+                        payload = payloads.Payload.from_value(value)
+                response_cache.put(key, version, payload, payload.nbytes)
+            return payload.response(accept_encoding, headers, etag_base)
+        return _with_http_params(func, wrapper)
+
+    return decorator
+
+
+def warm_static_payloads(persist: bool = True) -> int:
+    """
+    Paso de arranque: precalcula (o recupera de _payloads) los payloads de los
+    endpoints estáticos con sus parámetros por defecto y los carga en la caché.
+    """
+    db = get_db()
+    built = payloads.build_static_payloads(db, build_versions(db), persist=persist)
+    for (route, params), (version, payload) in built.items():
+        response_cache.put((db.name, route, params), version, payload, payload.nbytes)
+    return len(built)
@@ -0,0 +1,60 @@
+import math
+
+# Limpieza de documentos antes de responder: quita _id y los campos vacíos
+# (NaN/Inf, "NaN"/"nan" y None) que deja el import de los CSV con pandas.
+# Los documentos de MIMIC son planos, así que basta una pasada por documento
+# antes de anidarlos (labevents dentro de cada ingreso).
+
+# Columnas NOT NULL del esquema de MIMIC-IV: nunca vienen vacías y no se revisan.
+# El resto de campos (incluidos los que añadimos, como description o label) sí.
+FIELD_SCHEMAS = {
+    "hosp_patients": frozenset({"subject_id", "gender", "anchor_age", "anchor_year", "anchor_year_group"}),
+    "hosp_admissions": frozenset({"subject_id", "hadm_id", "admittime", "admission_type"}),
+    "hosp_diagnoses_icd": frozenset({"subject_id", "hadm_id", "seq_num", "icd_code", "icd_version"}),
+    "hosp_procedures_icd": frozenset({"subject_id", "hadm_id", "seq_num", "chartdate", "icd_code", "icd_version"}),
+    "hosp_labevents": frozenset({"labevent_id", "subject_id", "specimen_id", "itemid", "charttime"}),
+}
+
+_NAN_STRINGS = frozenset({"NaN", "nan"})
+_INF = (math.inf, -math.inf)
+
+
+def is_missing(value) -> bool:
+    cls = value.__class__
+    if cls is float:
+        return value != value or value in _INF
+    if cls is str:
+        return value in _NAN_STRINGS
+    return value is None
+
+
+def sanitize_document(doc: dict, collection: str | None = None) -> dict:
+    """Limpia `doc` en sitio (una pasada) y lo devuelve."""
+    doc.pop("_id", None)
+    required = FIELD_SCHEMAS.get(collection, frozenset())
+    missing = [key for key, value in doc.items() if key not in required and is_missing(value)]
+    for key in missing:
+        del doc[key]
+    return doc
+
+
+def normalize_records(records: list[dict]) -> list[dict]:
+    """
+    Registros sin campos vacíos, con las mismas reglas que sanitize_document
+    (is_missing en todos los campos). Lo usan los importadores antes de marcar
+    la colección como normalizada en _build_versions: el backend ya no la limpia.
+    """
+    return [{key: value for key, value in record.items() if not is_missing(value)} for record in records]
+
+
+def sanitize_documents(docs: list[dict], collection: str, normalized: frozenset = frozenset()) -> list[dict]:
+    """
+    Limpia una lista de documentos de `collection`. Si el importador la dejó
+    normalizada (sin campos vacíos, marcada en _build_versions) no se recorre:
+    basta con no proyectar _id en la consulta.
+    """
+    if collection in normalized:
+        return docs
+    for doc in docs:
+        sanitize_document(doc, collection)
+    return docs
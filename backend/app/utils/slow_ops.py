@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Colección local donde se guardan los planes de las operaciones lentas
+SLOW_OPS_COLLECTION = "_perf_slow_ops"
+# Umbral (ms) a partir del cual un find/aggregate se considera lento
+SLOW_OP_MS = float(os.getenv("SLOW_OP_MS", "1000"))
+# No repetir el explain de la misma forma de consulta antes de este tiempo (s)
+SLOW_OP_EXPLAIN_COOLDOWN_S = float(os.getenv("SLOW_OP_EXPLAIN_COOLDOWN_S", "900"))
+# Límite de tiempo del explain en segundo plano
+SLOW_OP_EXPLAIN_MAX_TIME_MS = int(os.getenv("SLOW_OP_EXPLAIN_MAX_TIME_MS", "120000"))
+
+EXPLAINABLE_COMMANDS = ("find", "aggregate")
+
+# Un único hilo: los explain con executionStats re-ejecutan la consulta,
+# no queremos lanzarlos en paralelo contra la BD
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-ops")
+_last_explained: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def _shape(value):
+    """Forma de la consulta: mismas claves y operadores, valores sustituidos por su tipo."""
+    if isinstance(value, dict):
+        return {k: _shape(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shape(v) for v in value[:3]]
+    return type(value).__name__
+
+
+def _strip_command(command_name: str, command) -> dict:
+    """Quita del comando los campos de sesión/driver ($db, lsid, $clusterTime...)."""
+    cleaned = {command_name: command[command_name]}
+    for key, value in command.items():
+        if key == command_name or key.startswith("$") or key in ("lsid", "txnNumber", "autocommit", "startTransaction"):
+            continue
+        cleaned[key] = value
+    return cleaned
+
+
+def fingerprint(database: str, command_name: str, command: dict) -> str:
+    body = command.get("pipeline") if command_name == "aggregate" else {
+        "filter": command.get("filter"), "sort": command.get("sort"), "projection": command.get("projection")
+    }
+    raw = json.dumps([database, command[command_name], command_name, _shape(body)], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _walk_plan(node, stages: list, indexes: list):
+    """Recorre un árbol de plan (clásico o SBE) acumulando etapas e índices usados."""
+    if isinstance(node, list):
+        for child in node:
+            _walk_plan(child, stages, indexes)
+        return
+    if not isinstance(node, dict):
+        return
+    stage = node.get("stage")
+    if stage:
+        stages.append(stage)
+        if stage == "IXSCAN":
+            indexes.append(node.get("indexName") or node.get("keyPattern"))
+    for key in ("inputStage", "inputStages", "queryPlan", "winningPlan", "thenStage", "elseStage", "outerStage", "innerStage"):
+        if key in node:
+            _walk_plan(node[key], stages, indexes)
+
+
+def summarize_explain(explain: dict) -> dict:
+    """Resume un explain(executionStats): etapas, índices, claves/docs examinados y COLLSCAN."""
+    planners = []
+    executions = []
+    pipeline_stages = []
+
+    if "queryPlanner" in explain:
+        planners.append(explain["queryPlanner"])
+        executions.append(explain.get("executionStats", {}))
+    for stage in explain.get("stages", []):
+        name = next(iter(stage))
+        pipeline_stages.append(name)
+        if name == "$cursor":
+            planners.append(stage[name].get("queryPlanner", {}))
+            executions.append(stage[name].get("executionStats", {}))
+
+    stages: list[str] = []
+    indexes: list = []
+    for planner in planners:
+        _walk_plan(planner.get("winningPlan"), stages, indexes)
+
+    keys_examined = sum(e.get("totalKeysExamined", 0) for e in executions)
+    docs_examined = sum(e.get("totalDocsExamined", 0) for e in executions)
+    lookup_collection_scans = 0
+    # Los $lookup informan de sus propios documentos examinados y scans completos
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            continue
+        docs_examined += stage.get("totalDocsExamined", 0)
+        keys_examined += stage.get("totalKeysExamined", 0)
+        lookup_collection_scans += stage.get("collectionScans", 0)
+
+    return {
+        "stages": stages,
+        "pipeline_stages": pipeline_stages,
+        "indexes": indexes,
+        "collscan": "COLLSCAN" in stages or lookup_collection_scans > 0,
+        "lookup_collection_scans": lookup_collection_scans,
+        "keys_examined": keys_examined,
+        "docs_examined": docs_examined,
+        "n_returned": sum(e.get("nReturned", 0) for e in executions),
+        "execution_ms": sum(e.get("executionTimeMillis", 0) for e in executions),
+    }
+
+
+def _record(database: str, collection: str, command_name: str, command: dict, duration_ms: float, key: str, explain: bool):
+    from app.utils.mongo import get_client, _dataset_config
+
+    demo = database == _dataset_config(True)[1]
+    db = get_client(demo)[database]
+    now = datetime.now(timezone.utc)
+
+    update = {
+        "$setOnInsert": {"first_seen": now},
+        "$set": {
+            "collection": collection,
+            "operation": command_name,
+            "last_seen": now,
+            "last_duration_ms": round(duration_ms, 1),
+        },
+        "$inc": {"occurrences": 1, "total_duration_ms": round(duration_ms, 1)},
+        "$max": {"max_duration_ms": round(duration_ms, 1)},
+    }
+
+    if explain:
+        to_explain = dict(command)
+        to_explain.setdefault("maxTimeMS", SLOW_OP_EXPLAIN_MAX_TIME_MS)
+        try:
+            result = db.command({"explain": to_explain, "verbosity": "executionStats"})
+            update["$set"]["plan"] = summarize_explain(result)
+            update["$set"]["explained_at"] = now
+            # Como texto: los operadores ($match, $lookup...) no son nombres de campo válidos
+            update["$set"]["command"] = json.dumps(command, default=str)[:20000]
+        except Exception as e:
+            update["$set"]["explain_error"] = str(e)
+
+    db[SLOW_OPS_COLLECTION].update_one({"_id": key}, update, upsert=True)
+
+
+def _record_safely(*args):
+    try:
+        _record(*args)
+    except Exception as e:
+        logger.error(f"Error registrando operación lenta: {str(e)}")
+
+
+def maybe_record(database: str, collection: str, command_name: str, command, duration_ms: float):
+    """
+    Llamado desde el CommandListener al terminar un comando. Si es un
+    find/aggregate por encima de SLOW_OP_MS lo registra en segundo plano y,
+    como mucho una vez por forma de consulta y cooldown, captura su explain.
+    """
+    if duration_ms < SLOW_OP_MS or command_name not in EXPLAINABLE_COMMANDS:
+        return
+    if collection.startswith("_perf_"):
+        return
+    if command_name == "aggregate" and any(
+        "$out" in stage or "$merge" in stage for stage in command.get("pipeline", [])
+    ):
+        return
+
+    cleaned = _strip_command(command_name, command)
+    key = fingerprint(database, command_name, cleaned)
+    now = time.monotonic()
+    with _lock:
+        if len(_last_explained) > 10000:
+            _last_explained.clear()
+        explain = now - _last_explained.get(key, float("-inf")) >= SLOW_OP_EXPLAIN_COOLDOWN_S
+        if explain:
+            _last_explained[key] = now
+
+    _executor.submit(_record_safely, database, collection, command_name, cleaned, duration_ms, key, explain)
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from app.utils.mongo import get_db
+from app.utils.response_cache import build_versions, build_versions_async
+
+logger = logging.getLogger(__name__)
+
+# Recarga periódica si hosp_patients aún no tiene versión en _build_versions (s);
+# mientras tanto los "no existe" se confirman en Mongo
+SUBJECTS_UNVERSIONED_TTL_S = float(os.getenv("SUBJECTS_UNVERSIONED_TTL_S", "300"))
+
+
+class SubjectIndex:
+    """
+    subject_id de hosp_patients en memoria, como array ordenado de enteros de
+    64 bits (~8 B por paciente) consultado por búsqueda binaria. Se recarga
+    cuando cambia la versión de build de hosp_patients.
+    """
+
+    def __init__(self, db_name: str, version, ids: array):
+        self.db_name = db_name
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.ids = ids
+
+    @classmethod
+    def load(cls, db, version) -> "SubjectIndex":
+        start = time.perf_counter()
+        ids = array("q", sorted({
+            doc["subject_id"]
+            for doc in db["hosp_patients"].find({}, {"_id": 0, "subject_id": 1}, batch_size=50000)
+            if isinstance(doc.get("subject_id"), int)
+        }))
+        logger.info(f"Índice de subject_id cargado en {time.perf_counter() - start:.1f}s: {len(ids)} pacientes")
+        return cls(db.name, version, ids)
+
+    @property
+    def authoritative(self) -> bool:
+        """Con versión de build, un "no está" es definitivo; sin ella hay que confirmarlo."""
+        return self.version is not None
+
+    def stale(self, version) -> bool:
+        if version != self.version:
+            return True
+        return version is None and time.monotonic() - self.loaded_at >= SUBJECTS_UNVERSIONED_TTL_S
+
+    def __contains__(self, subject_id: int) -> bool:
+        i = bisect_left(self.ids, subject_id)
+        return i < len(self.ids) and self.ids[i] == subject_id
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def stats(self) -> dict:
+        return {
+            "database": self.db_name,
+            "subjects": len(self.ids),
+            "bytes": self.ids.itemsize * len(self.ids),
+            "versioned": self.authoritative,
+        }
+
+
+_loaded: dict[str, SubjectIndex] = {}
+_load_lock = threading.Lock()
+
+
+def _current(db_name: str, version) -> SubjectIndex | None:
+    index = _loaded.get(db_name)
+    return index if index is not None and not index.stale(version) else None
+
+
+def _reload(version) -> SubjectIndex:
+    db = get_db()
+    with _load_lock:
+        index = _current(db.name, version)
+        if index is None:
+            index = SubjectIndex.load(db, version)
+            _loaded[db.name] = index
+        return index
+
+
+def get_subject_index() -> SubjectIndex:
+    """Índice de subject_id del dataset configurado; se recarga si cambia hosp_patients."""
+    db = get_db()
+    version = build_versions(db).get("hosp_patients")
+    return _current(db.name, version) or _reload(version)
+
+
+async def get_subject_index_async(db) -> SubjectIndex:
+    versions = await build_versions_async(db)
+    version = versions.get("hosp_patients")
+    return _current(db.name, version) or await asyncio.to_thread(_reload, version)
@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+import logging
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from time import perf_counter
+
+from app.utils.mongo import get_db
+from app.utils.monitoring import add_timing
+from app.utils.response_cache import BUILD_VERSIONS_COLLECTION, build_versions, build_versions_async
+
+logger = logging.getLogger(__name__)
+
+# Cubo de recuentos de ingresos por hora x día de la semana x mes x día del mes x
+# ingreso a medianoche (admittime "... 00:00:00"), opcionalmente x admission_type.
+# Se construye una vez en el servidor ($group + $out) y el heatmap lo recorta en memoria.
+TIME_CUBE_COLLECTION = "admission_time_cube"
+_BUILD_COLLECTION = "admission_time_cube_build"
+# Colecciones de las que sale el cubo; si alguna cambia de versión de build el
+# cubo deja de servirse (el heatmap agrega en vivo) hasta reconstruirlo
+TIME_CUBE_SOURCES = ["hosp_admissions"]
+
+
+def source_versions(versions: dict) -> dict:
+    """{colección: versión} de las colecciones de origen (lo que se guarda al construir el cubo)."""
+    return {collection: (versions.get(collection) or (None, None))[0] for collection in TIME_CUBE_SOURCES}
+
+
+def _cube_pipeline(by_admission_type: bool) -> list[dict]:
+    # Mismas expresiones que el pipeline en vivo de /api/charts/admission-heatmap
+    key = {
+        "hour": {"$hour": "$admitdate"},
+        "dayOfWeek": {"$dayOfWeek": "$admitdate"},
+        "month": {"$month": "$admitdate"},
+        "dayOfMonth": {"$dayOfMonth": "$admitdate"},
+        "midnight": "$midnight",
+    }
+    if by_admission_type:
+        key["admission_type"] = "$admission_type"
+    return [
+        {"$project": {
+            "_id": 0,
+            "admission_type": 1,
+            "admitdate": {"$dateFromString": {"dateString": "$admittime"}},
+            "midnight": {"$regexMatch": {"input": "$admittime", "regex": "00:00:00$"}},
+        }},
+        {"$group": {"_id": key, "count": {"$sum": 1}}},
+        {"$replaceWith": {"$mergeObjects": ["$_id", {"count": "$count"}]}},
+        {"$out": _BUILD_COLLECTION},
+    ]
+
+
+def build_time_cube(db, by_admission_type: bool = False) -> int:
+    """Reconstruye admission_time_cube (colección auxiliar + renameCollection). Devuelve el número de celdas."""
+    versions = source_versions(build_versions(db))
+    db["hosp_admissions"].aggregate(_cube_pipeline(by_admission_type), allowDiskUse=True)
+    db[_BUILD_COLLECTION].rename(TIME_CUBE_COLLECTION, dropTarget=True)
+    db[BUILD_VERSIONS_COLLECTION].update_one(
+        {"_id": TIME_CUBE_COLLECTION},
+        {"$inc": {"version": 1}, "$set": {"built_at": datetime.now(timezone.utc), "source_versions": versions}},
+        upsert=True,
+    )
+    return db[TIME_CUBE_COLLECTION].estimated_document_count()
+
+
+class AdmissionTimeCube:
+    """
+    Cortes del cubo ya calculados al cargarlo: para cada (admission_type o None,
+    filter_midnight, view_type) la lista que devuelve el heatmap. Responder es
+    una consulta a un diccionario.
+    """
+
+    def __init__(self, db_name: str, version, source_versions: dict | None, slices: dict, cells: int, by_admission_type: bool):
+        self.db_name = db_name
+        self.version = version
+        self.source_versions = source_versions
+        self.slices = slices
+        self.cells = cells
+        self.by_admission_type = by_admission_type
+
+    @classmethod
+    def load(cls, db, version) -> "AdmissionTimeCube":
+        start = perf_counter()
+        # Versiones de origen con las que se construyó (None si es de antes de guardarlas)
+        build = db[BUILD_VERSIONS_COLLECTION].find_one({"_id": TIME_CUBE_COLLECTION}, {"source_versions": 1}) or {}
+        counters: dict[tuple, Counter] = {}
+        cells = 0
+        by_admission_type = False
+        for cell in db[TIME_CUBE_COLLECTION].find({}, {"_id": 0}, batch_size=50000):
+            cells += 1
+            count = cell["count"]
+            types = [None]
+            if "admission_type" in cell:
+                by_admission_type = True
+                if cell["admission_type"] is not None:
+                    types.append(cell["admission_type"])
+            # El filtro de medianoche solo quita celdas; sin filtro cuentan todas
+            filters = (False,) if cell["midnight"] else (False, True)
+            # Vista mensual sin el 29 de febrero (el año bisiesto distorsiona la escala)
+            leap_day = cell["month"] == 2 and cell["dayOfMonth"] == 29
+            for admission_type in types:
+                for filter_midnight in filters:
+                    hourly = counters.setdefault((admission_type, filter_midnight, "hourly"), Counter())
+                    hourly[(cell["hour"], cell["dayOfWeek"])] += count
+                    if not leap_day:
+                        monthly = counters.setdefault((admission_type, filter_midnight, "monthly"), Counter())
+                        monthly[(cell["month"], cell["dayOfMonth"])] += count
+        slices = {}
+        for (admission_type, filter_midnight, view_type), counter in counters.items():
+            fields = ("hour", "dayOfWeek") if view_type == "hourly" else ("month", "dayOfMonth")
+            slices[(admission_type, filter_midnight, view_type)] = [
+                {fields[0]: a, fields[1]: b, "count": count} for (a, b), count in sorted(counter.items())
+            ]
+        logger.info(f"Cubo de ingresos cargado en {perf_counter() - start:.2f}s: {cells} celdas, {len(slices)} cortes")
+        return cls(db.name, version, build.get("source_versions"), slices, cells, by_admission_type)
+
+    def slice(self, filter_midnight: bool, view_type: str, admission_type: str | None = None) -> list[dict] | None:
+        """Datos del heatmap, o None si el cubo no tiene la dimensión admission_type."""
+        if admission_type is not None and not self.by_admission_type:
+            return None
+        view_type = "monthly" if view_type == "monthly" else "hourly"
+        return self.slices.get((admission_type, filter_midnight, view_type), [])
+
+    def stats(self) -> dict:
+        return {
+            "database": self.db_name,
+            "source_versions": self.source_versions,
+            "cells": self.cells,
+            "slices": len(self.slices),
+            "by_admission_type": self.by_admission_type,
+        }
+
+
+_loaded: dict[str, AdmissionTimeCube] = {}
+_load_lock = threading.Lock()
+
+
+def _current(db_name: str, version) -> AdmissionTimeCube | None:
+    cube = _loaded.get(db_name)
+    return cube if cube is not None and cube.version == version else None
+
+
+def _reload(version) -> AdmissionTimeCube:
+    db = get_db()
+    with _load_lock:
+        cube = _current(db.name, version)
+        if cube is None:
+            cube = AdmissionTimeCube.load(db, version)
+            _loaded[db.name] = cube
+        return cube
+
+
+def _fresh(cube: AdmissionTimeCube, versions: dict) -> AdmissionTimeCube | None:
+    # El cubo desactualizado se queda cargado (su versión no cambia) pero no se sirve
+    if cube.source_versions != source_versions(versions):
+        add_timing("time_cube", None, "stale")
+        return None
+    return cube
+
+
+def get_time_cube() -> AdmissionTimeCube | None:
+    """
+    Cubo del dataset configurado, o None si no se ha construido o sus colecciones
+    de origen han cambiado desde entonces (el heatmap agrega en vivo).
+    """
+    db = get_db()
+    versions = build_versions(db)
+    version = versions.get(TIME_CUBE_COLLECTION)
+    if version is None:
+        return None
+    return _fresh(_current(db.name, version) or _reload(version), versions)
+
+
+async def get_time_cube_async(db) -> AdmissionTimeCube | None:
+    versions = await build_versions_async(db)
+    version = versions.get(TIME_CUBE_COLLECTION)
+    if version is None:
+        return None
+    return _fresh(_current(db.name, version) or await asyncio.to_thread(_reload, version), versions)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLI de los scripts build_admission_time_cube.py."""
+    parser = argparse.ArgumentParser(description="Construye admission_time_cube (recuentos para el heatmap de ingresos)")
+    parser.add_argument("--by-admission-type", action="store_true", help="Añade admission_type como dimensión del cubo")
+    args = parser.parse_args(argv)
+    db = get_db()
+    print(f"=== Construyendo {TIME_CUBE_COLLECTION} en {db.name} ===")
+    start = perf_counter()
+    cells = build_time_cube(db, args.by_admission_type)
+    print(f"{cells} celdas en {TIME_CUBE_COLLECTION} en {perf_counter() - start:.1f}s")
+    print("=== Completado ===")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
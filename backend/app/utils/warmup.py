@@ -0,0 +1,235 @@
+import logging
+import os
+import threading
+import time
+
+from app.utils.metrics import WARMUP_DURATION
+from app.utils.mongo import get_db
+from app.utils.dictionaries import get_dictionaries
+from app.utils.indexes import warn_missing_indexes
+from app.utils.response_cache import warm_static_payloads
+from app.utils.subjects import get_subject_index
+from app.utils.time_cube import get_time_cube
+
+logger = logging.getLogger(__name__)
+
+# Pasos del calentamiento al arrancar, en orden (WARMUP_STEPS="" lo desactiva)
+WARMUP_STEPS = [s.strip() for s in os.getenv("WARMUP_STEPS", "check_indexes,collections,indexes,dictionaries,subjects,time_cube,payloads").split(",") if s.strip()]
+# Tiempo máximo total (s): al agotarse se saltan los pasos pendientes y la app pasa a lista.
+# Se comprueba entre pasos y dentro de los bucles de collections/indexes; dictionaries,
+# subjects, time_cube y payloads son una sola carga que termina una vez empezada (cortarla
+# dejaría la estructura a medias y la primera petición la repetiría entera)
+WARMUP_BUDGET_S = float(os.getenv("WARMUP_BUDGET_S", "60"))
+# Entradas de cada índice que se recorren para traer sus páginas a memoria
+WARMUP_INDEX_SCAN_LIMIT = int(os.getenv("WARMUP_INDEX_SCAN_LIMIT", "10000"))
+# Espera máxima (s) al apagar a que termine el paso en curso antes de cerrar los clientes
+WARMUP_STOP_TIMEOUT_S = float(os.getenv("WARMUP_STOP_TIMEOUT_S", "10"))
+
+# Colecciones pequeñas (preagregadas y diccionarios) que se leen enteras
+WARMUP_COLLECTIONS = [
+    "dashboard_stats_categorized",
+    "diag_counts_by_code",
+    "prescription_counts_by_route",
+    "transfer_edges_chord",
+    "icd_equivalencias",
+]
+# Colecciones cuyos índices usa la vista de paciente
+WARMUP_INDEX_COLLECTIONS = [
+    "hosp_patients",
+    "hosp_admissions",
+    "hosp_diagnoses_icd",
+    "hosp_procedures_icd",
+    "hosp_labevents",
+    "hosp_transfers",
+    "icu_icustays",
+]
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class WarmupStopped(Exception):
+    pass
+
+
+class WarmupBudget:
+    """
+    Límite de una ejecución del calentamiento: plazo de WARMUP_BUDGET_S y evento de parada.
+    El hilo no se puede cancelar desde asyncio: al apagar se activa el evento y el hilo
+    sale en la siguiente comprobación.
+    """
+
+    def __init__(self, deadline: float, stop_event: threading.Event):
+        self.deadline = deadline
+        self.stop_event = stop_event
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+    @property
+    def exhausted(self) -> bool:
+        return time.monotonic() > self.deadline
+
+    def check(self):
+        if self.stopped:
+            raise WarmupStopped()
+        if self.exhausted:
+            raise BudgetExceeded()
+
+
+def _check_indexes(db, budget: WarmupBudget) -> str:
+    """Avisa en el log de los índices de rutas calientes del manifiesto (app.utils.indexes) que falten."""
+    return warn_missing_indexes(db)
+
+
+def _load_collections(db, budget: WarmupBudget) -> str:
+    """Lee enteras las colecciones pequeñas para tenerlas en la caché de WiredTiger."""
+    existing = set(db.list_collection_names())
+    docs = 0
+    loaded = 0
+    for name in WARMUP_COLLECTIONS:
+        if name not in existing:
+            continue
+        for _ in db[name].find({}, batch_size=5000):
+            docs += 1
+        loaded += 1
+        budget.check()
+    return f"{loaded} colecciones, {docs} documentos"
+
+
+def _touch_indexes(db, budget: WarmupBudget) -> str:
+    """Recorre el principio de cada índice con una consulta cubierta (páginas internas del B-tree a memoria)."""
+    existing = set(db.list_collection_names())
+    touched = 0
+    for name in WARMUP_INDEX_COLLECTIONS:
+        if name not in existing:
+            continue
+        for index in db[name].list_indexes():
+            keys = list(index["key"].keys())
+            projection = {key: 1 for key in keys}
+            if "_id" not in keys:
+                projection["_id"] = 0
+            for _ in db[name].find({}, projection).hint(index["name"]).limit(WARMUP_INDEX_SCAN_LIMIT):
+                pass
+            touched += 1
+            budget.check()
+    return f"{touched} índices"
+
+
+def _load_dictionaries(db, budget: WarmupBudget) -> str:
+    """Carga los diccionarios ICD / d_labitems / icu_d_items / d_hcpcs en memoria."""
+    stats = get_dictionaries().stats()
+    return ", ".join(f"{v} {k}" for k, v in stats.items() if k != "database")
+
+
+def _load_subjects(db, budget: WarmupBudget) -> str:
+    """Carga el índice de subject_id de hosp_patients (existencia de pacientes sin ir a Mongo)."""
+    stats = get_subject_index().stats()
+    return f"{stats['subjects']} pacientes, {stats['bytes']} B"
+
+
+def _load_time_cube(db, budget: WarmupBudget) -> str:
+    """Carga los cortes del cubo de ingresos del heatmap (admission_time_cube), si está construido."""
+    cube = get_time_cube()
+    if cube is None:
+        return "sin cubo o desactualizado (se agrega en vivo)"
+    stats = cube.stats()
+    return f"{stats['cells']} celdas, {stats['slices']} cortes"
+
+
+def _prime_payloads(db, budget: WarmupBudget) -> str:
+    """Precalcula los payloads de los endpoints estáticos (y el $lookup a icd_equivalencias del icicle)."""
+    return f"{warm_static_payloads()} payloads"
+
+
+STEPS = {
+    "check_indexes": _check_indexes,
+    "collections": _load_collections,
+    "indexes": _touch_indexes,
+    "dictionaries": _load_dictionaries,
+    "subjects": _load_subjects,
+    "time_cube": _load_time_cube,
+    "payloads": _prime_payloads,
+}
+
+
+class WarmupState:
+    """Progreso del calentamiento, expuesto en /health."""
+
+    def __init__(self):
+        self.status = "pending" if WARMUP_STEPS else "done"
+        self.duration_s = None
+        self.steps: list[dict] = []
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "done"
+
+    def as_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "duration_s": self.duration_s,
+            "budget_s": WARMUP_BUDGET_S,
+            "steps": self.steps,
+        }
+
+
+state = WarmupState()
+
+
+def run_warmup(stop_event: threading.Event | None = None):
+    """
+    Ejecuta los pasos de WARMUP_STEPS en orden dentro de WARMUP_BUDGET_S (bloqueante, en un hilo).
+    Cada ejecución parte de un WarmupState nuevo; `stop_event` lo crea quien lanza el hilo
+    (el lifespan), así un segundo arranque en el mismo proceso no hereda la parada del anterior.
+    """
+    global state
+    state = WarmupState()
+    if not WARMUP_STEPS:
+        return
+    state.status = "running"
+    start = time.monotonic()
+    budget = WarmupBudget(start + WARMUP_BUDGET_S, stop_event or threading.Event())
+    db = get_db()
+
+    for name in WARMUP_STEPS:
+        step = {"name": name, "status": "skipped", "duration_ms": None, "detail": None}
+        state.steps.append(step)
+        step_fn = STEPS.get(name)
+        if step_fn is None:
+            step["detail"] = f"paso desconocido (disponibles: {', '.join(STEPS)})"
+            continue
+        if budget.stopped:
+            step["detail"] = "detenido"
+            continue
+        if budget.exhausted:
+            step["detail"] = "presupuesto agotado"
+            continue
+        step_start = time.monotonic()
+        try:
+            step["detail"] = step_fn(db, budget)
+            step["status"] = "ok"
+        except BudgetExceeded:
+            step["status"] = "partial"
+            step["detail"] = "presupuesto agotado"
+        except WarmupStopped:
+            step["status"] = "partial"
+            step["detail"] = "detenido"
+        except Exception as e:
+            step["status"] = "error"
+            step["detail"] = str(e)
+        step["duration_ms"] = round((time.monotonic() - step_start) * 1000, 1)
+
+    state.duration_s = round(time.monotonic() - start, 3)
+    if budget.stopped:
+        state.status = "stopped"
+        logger.info(f"Calentamiento detenido al apagar tras {state.duration_s:.1f}s")
+        return
+    state.status = "done"
+    WARMUP_DURATION.set(state.duration_s)
+    logger.info(
+        f"Calentamiento completado en {state.duration_s:.1f}s: "
+        + ", ".join(f"{s['name']}={s['status']} ({s['duration_ms']} ms)" for s in state.steps)
+    )
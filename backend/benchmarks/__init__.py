@@ -0,0 +1,10 @@
+"""
+Micro-benchmarks de los endpoints de la API contra un mongod local
+sembrado con el dataset demo de MIMIC-IV.
+
+Uso (desde backend/):
+  pip install -r benchmarks/requirements.txt
+  python -m benchmarks run --out bench/base.json
+  python -m benchmarks run --out bench/head.json
+  python -m benchmarks compare bench/base.json bench/head.json
+"""
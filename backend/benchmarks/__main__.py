@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+
+def _run(args):
+    from benchmarks.mongod import ThrowawayMongod
+    from benchmarks import seed, runner
+
+    def bench(mongo_url: str, fresh: bool):
+        from pymongo import MongoClient
+
+        # La app (y las construcciones materializadas del seed) leen la conexión del entorno
+        os.environ["USE_DEMO"] = "true"
+        os.environ["MONGO_DEMO_URL"] = mongo_url
+
+        client = MongoClient(mongo_url)
+        db = client["mimic_iv_demo"]
+        if fresh:
+            seed.import_demo(db, Path(args.dataset) if args.dataset else seed.DEMO_PATH)
+            seed.run_preaggregations(db, materialized=not args.live_only)
+        heavy = seed.heaviest_subjects(db, args.heavy_subjects)
+        client.close()
+
+        from app.main import app
+
+        return runner.run(app, runner.endpoint_cases(heavy), args.iterations, args.warmup, args.alloc_iterations)
+
+    if args.mongo_url:
+        results = bench(args.mongo_url, fresh=args.seed)
+    else:
+        with ThrowawayMongod(args.mongod, keep=args.keep_db) as mongod:
+            results = bench(mongod.url, fresh=True)
+
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"Resultados guardados en {out}")
+    return 0
+
+
+def _sanitize(args):
+    from benchmarks.mongod import ThrowawayMongod
+    from benchmarks import seed, sanitize
+
+    def bench(mongo_url: str, fresh: bool):
+        from pymongo import MongoClient
+
+        client = MongoClient(mongo_url)
+        db = client["mimic_iv_demo"]
+        if fresh:
+            # Datos en bruto: el benchmark compara el sanitizer con y sin normalizar
+            seed.import_demo(db, Path(args.dataset) if args.dataset else seed.DEMO_PATH, normalize=False)
+        subject_id = args.subject_id or seed.heaviest_subjects(db, 1)[0]
+        try:
+            return sanitize.run(db, subject_id, args.iterations)
+        finally:
+            client.close()
+
+    if args.mongo_url:
+        results = bench(args.mongo_url, fresh=args.seed)
+    else:
+        with ThrowawayMongod(args.mongod, keep=args.keep_db) as mongod:
+            results = bench(mongod.url, fresh=True)
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+def _compare(args):
+    from benchmarks.compare import compare
+
+    regressions = compare(args.base, args.head, args.threshold, args.metric, args.min_delta_ms)
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks de endpoints MIMIC-IV")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Siembra un mongod local con el demo y mide todos los endpoints")
+    run.add_argument("--out", default="bench/results.json", help="Fichero JSON de resultados")
+    run.add_argument("--iterations", type=int, default=50)
+    run.add_argument("--warmup", type=int, default=5)
+    run.add_argument("--alloc-iterations", type=int, default=5, help="Pasadas con tracemalloc por caso")
+    run.add_argument("--heavy-subjects", type=int, default=3, help="Pacientes más pesados a medir en /api/patients/{id}")
+    run.add_argument("--mongod", default="mongod", help="Binario de mongod para la instancia desechable")
+    run.add_argument("--keep-db", action="store_true", help="No borrar el dbpath temporal al terminar")
+    run.add_argument("--mongo-url", help="Usar un servidor existente en lugar de lanzar mongod")
+    run.add_argument("--seed", action="store_true", help="Con --mongo-url: importar el demo y preagregar antes de medir")
+    run.add_argument("--dataset", help="Carpeta a importar en lugar del demo (p.ej. la salida de scripts/synthetic)")
+    run.add_argument(
+        "--live-only",
+        action="store_true",
+        help="Al sembrar, no construir _payloads, patient_profiles, patient_search ni admission_time_cube (mide los caminos en vivo)",
+    )
+    run.set_defaults(func=_run)
+
+    san = sub.add_parser("sanitize", help="Compara clean_data con el sanitizer sobre el paciente más pesado")
+    san.add_argument("--iterations", type=int, default=20)
+    san.add_argument("--subject-id", type=int, help="Paciente a medir (por defecto, el de más labevents)")
+    san.add_argument("--mongod", default="mongod", help="Binario de mongod para la instancia desechable")
+    san.add_argument("--keep-db", action="store_true", help="No borrar el dbpath temporal al terminar")
+    san.add_argument("--mongo-url", help="Usar un servidor existente en lugar de lanzar mongod")
+    san.add_argument("--seed", action="store_true", help="Con --mongo-url: importar el demo antes de medir")
+    san.add_argument("--dataset", help="Carpeta a importar en lugar del demo")
+    san.set_defaults(func=_sanitize)
+
+    cmp_ = sub.add_parser("compare", help="Compara dos ficheros de resultados y falla si hay regresiones")
+    cmp_.add_argument("base")
+    cmp_.add_argument("head")
+    cmp_.add_argument("--metric", default="p95_ms", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+    cmp_.add_argument("--threshold", type=float, default=0.20, help="Empeoramiento relativo tolerado (0.20 = 20%%)")
+    cmp_.add_argument("--min-delta-ms", type=float, default=1.0, help="Diferencia absoluta mínima para contar como regresión")
+    cmp_.set_defaults(func=_compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Comparación de dos ficheros de resultados: falla si hay regresiones."""
+
+import json
+
+
+def compare(base_path: str, head_path: str, threshold: float, metric: str, min_delta_ms: float) -> int:
+    """
+    Compara `metric` (p50_ms/p95_ms/p99_ms) caso a caso. Devuelve el número
+    de regresiones: casos cuyo valor empeora más de `threshold` (relativo)
+    y más de `min_delta_ms` (absoluto, para ignorar ruido en casos rápidos).
+    """
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+
+    print(f"base: {base['meta'].get('commit')}  head: {head['meta'].get('commit')}  métrica: {metric}")
+    print(f"{'caso':42s} {'base':>10s} {'head':>10s} {'cambio':>8s}")
+
+    regressions = []
+    for name, head_result in head["results"].items():
+        base_result = base["results"].get(name)
+        if base_result is None:
+            print(f"{name:42s} {'-':>10s} {head_result[metric]:10.2f}     nuevo")
+            continue
+        before, after = base_result[metric], head_result[metric]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold and after - before > min_delta_ms:
+            flag = "  << REGRESIÓN"
+            regressions.append(name)
+        if base_result.get("status") != head_result.get("status"):
+            flag += f"  (status {base_result.get('status')} -> {head_result.get('status')})"
+            regressions.append(name)
+        print(f"{name:42s} {before:10.2f} {after:10.2f} {change:+8.1%}{flag}")
+
+    for name in base["results"].keys() - head["results"].keys():
+        print(f"{name:42s} eliminado en head")
+
+    if regressions:
+        print(f"\n{len(set(regressions))} regresión(es) por encima del {threshold:.0%}: {', '.join(sorted(set(regressions)))}")
+    else:
+        print("\nSin regresiones")
+    return len(set(regressions))
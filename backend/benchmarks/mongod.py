@@ -0,0 +1,63 @@
+"""Arranque de un mongod desechable (dbpath temporal, puerto libre)."""
+
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ThrowawayMongod:
+    """Context manager: lanza mongod en un directorio temporal y lo borra al salir."""
+
+    def __init__(self, mongod_bin: str = "mongod", keep: bool = False):
+        self.mongod_bin = shutil.which(mongod_bin) or mongod_bin
+        self.keep = keep
+        self.port = _free_port()
+        self.dbpath = None
+        self.process = None
+
+    @property
+    def url(self) -> str:
+        return f"mongodb://127.0.0.1:{self.port}/"
+
+    def __enter__(self):
+        self.dbpath = tempfile.mkdtemp(prefix="mimic-bench-")
+        self.process = subprocess.Popen(
+            [self.mongod_bin, "--dbpath", self.dbpath, "--port", str(self.port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.STDOUT,
+        )
+        client = MongoClient(self.url, serverSelectionTimeoutMS=500)
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                client.admin.command("ping")
+                break
+            except PyMongoError:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.__exit__(None, None, None)
+                    raise RuntimeError(f"No se pudo arrancar mongod ({self.mongod_bin})")
+                time.sleep(0.2)
+        client.close()
+        print(f"mongod desechable en {self.url} (dbpath {self.dbpath})")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        if self.dbpath and not self.keep:
+            shutil.rmtree(self.dbpath, ignore_errors=True)
+        return False
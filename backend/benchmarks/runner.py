@@ -0,0 +1,127 @@
+"""Ejecución de los casos de benchmark en proceso a través de la app ASGI."""
+
+import asyncio
+import gc
+import os
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+
+
+def endpoint_cases(heavy_subjects: list[int]) -> list[tuple[str, str, str]]:
+    """(nombre, método, url) de cada endpoint medido."""
+    cases = [
+        ("charts.icu_stay_duration", "GET", "/api/charts/icu-stay-duration"),
+        ("charts.age_distribution", "GET", "/api/charts/age-distribution"),
+        ("charts.age_distribution.detailed", "GET", "/api/charts/age-distribution?detailed=true"),
+        ("charts.admission_heatmap.hourly", "GET", "/api/charts/admission-heatmap"),
+        ("charts.admission_heatmap.monthly", "GET", "/api/charts/admission-heatmap?view_type=monthly"),
+        ("charts.diagnosis_icicle", "GET", "/api/charts/diagnosis-icicle"),
+        ("charts.medications_sunburst", "GET", "/api/charts/medications-sunburst"),
+        ("charts.hospital_transfers_chord", "GET", "/api/charts/hospital-transfers-chord"),
+        ("dashboard.stats", "GET", "/api/dashboard/stats"),
+    ]
+    for subject_id in heavy_subjects:
+        cases.append((f"patients.get.{subject_id}", "GET", f"/api/patients/{subject_id}"))
+    if heavy_subjects:
+        cases.append(("patients.exists", "HEAD", f"/api/patients/{heavy_subjects[0]}/exists"))
+        cases.append(("patients.exists.missing", "HEAD", "/api/patients/1/exists"))
+    return cases
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Percentil con interpolación lineal sobre una lista ya ordenada."""
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lower = int(pos)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (pos - lower)
+
+
+async def _measure_case(client, method: str, url: str, iterations: int, warmup: int, alloc_iterations: int) -> dict:
+    status = None
+    size = 0
+    for _ in range(warmup):
+        await client.request(method, url)
+
+    timings = []
+    for _ in range(iterations):
+        start = perf_counter()
+        response = await client.request(method, url)
+        timings.append((perf_counter() - start) * 1000)
+        status = response.status_code
+        size = len(response.content)
+
+    # Asignaciones en una pasada aparte (tracemalloc distorsiona los tiempos)
+    peaks = []
+    allocated = []
+    gc.collect()
+    tracemalloc.start()
+    for _ in range(alloc_iterations):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        await client.request(method, url)
+        after, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        allocated.append(after - before)
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "method": method,
+        "url": url,
+        "status": status,
+        "response_bytes": size,
+        "n": len(timings),
+        "min_ms": round(timings[0], 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "p99_ms": round(percentile(timings, 0.99), 3),
+        "max_ms": round(timings[-1], 3),
+        "alloc_peak_kb": round(max(peaks) / 1024, 1) if peaks else None,
+        "alloc_retained_kb": round(max(allocated) / 1024, 1) if allocated else None,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+async def run_cases(app, cases, iterations: int, warmup: int, alloc_iterations: int) -> dict:
+    """Lanza la app (con su lifespan) y mide cada caso con httpx + ASGITransport."""
+    import httpx
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # Medir con la app ya calentada (/health da 503 mientras dura el warm-up)
+            while (await client.get("/health")).status_code == 503:
+                await asyncio.sleep(0.1)
+            for name, method, url in cases:
+                results[name] = await _measure_case(client, method, url, iterations, warmup, alloc_iterations)
+                r = results[name]
+                print(f"{name:42s} {r['status']}  p50={r['p50_ms']:8.2f}ms  p95={r['p95_ms']:8.2f}ms  p99={r['p99_ms']:8.2f}ms  peak={r['alloc_peak_kb']}KB")
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "iterations": iterations,
+            "warmup": warmup,
+            "use_async_db": os.getenv("USE_ASYNC_DB", "true"),
+        },
+        "results": results,
+    }
+
+
+def run(app, cases, iterations: int, warmup: int, alloc_iterations: int) -> dict:
+    return asyncio.run(run_cases(app, cases, iterations, warmup, alloc_iterations))
@@ -0,0 +1,131 @@
+"""
+Microbenchmark de la limpieza de la vista de paciente: el clean_data recursivo
+anterior frente a app.utils.sanitize, sobre los documentos del paciente con
+más labevents. Mide solo la limpieza (y el anidado), no las consultas.
+"""
+
+import copy
+import math
+from time import perf_counter
+
+from app.utils.sanitize import sanitize_document, sanitize_documents
+from benchmarks.runner import percentile
+
+COLLECTIONS = ("hosp_admissions", "hosp_diagnoses_icd", "hosp_procedures_icd", "hosp_labevents")
+NORMALIZED = frozenset({"hosp_patients", *COLLECTIONS})
+
+
+def legacy_clean_data(obj):
+    """clean_data de routes/patients.py antes del sanitizer (copiado tal cual como referencia)."""
+    if isinstance(obj, dict):
+        cleaned = {}
+        for key, value in obj.items():
+            if key == "_id":  # Excluir _id de MongoDB
+                continue
+            cleaned_value = legacy_clean_data(value)
+            if cleaned_value is not None:  # Solo incluir valores válidos
+                cleaned[key] = cleaned_value
+        return cleaned
+    elif isinstance(obj, list):
+        return [legacy_clean_data(item) for item in obj if legacy_clean_data(item) is not None]
+    elif isinstance(obj, float):
+        if math.isnan(obj) or math.isinf(obj):
+            return None  # Convertir NaN/Inf a None
+        return obj
+    elif obj == "NaN" or obj == "nan":
+        return None  # Convertir strings NaN a None
+    else:
+        return obj
+
+
+def load_patient(db, subject_id: int) -> dict:
+    """Documentos crudos (con _id y NaN) de la vista de paciente."""
+    query = {"subject_id": subject_id}
+    return {
+        "patient": db["hosp_patients"].find_one(query),
+        **{collection: list(db[collection].find(query)) for collection in COLLECTIONS},
+    }
+
+
+def _nest(admissions: list, labevents: list):
+    hadm_to_labs = {}
+    for ev in labevents:
+        if ev.get("hadm_id") is not None:
+            hadm_to_labs.setdefault(ev["hadm_id"], []).append(ev)
+    for admission in admissions:
+        admission["labevents"] = hadm_to_labs.get(admission.get("hadm_id"), [])
+
+
+def legacy(docs: dict) -> dict:
+    """Anidado + limpieza recursiva al final (como el _build_patient_response anterior)."""
+    admissions = [dict(a) for a in docs["hosp_admissions"]]
+    _nest(admissions, docs["hosp_labevents"])
+    return {
+        "patient": legacy_clean_data(docs["patient"]),
+        "admissions": [legacy_clean_data(a) for a in admissions],
+        "diagnoses": [legacy_clean_data(d) for d in docs["hosp_diagnoses_icd"]],
+        "procedures": [legacy_clean_data(p) for p in docs["hosp_procedures_icd"]],
+    }
+
+
+def sanitized(docs: dict, normalized: frozenset = frozenset()) -> dict:
+    """Una pasada por documento plano y anidado después (como el _build_patient_response actual)."""
+    patient = docs["patient"] if "hosp_patients" in normalized else sanitize_document(docs["patient"], "hosp_patients")
+    for collection in COLLECTIONS:
+        sanitize_documents(docs[collection], collection, normalized)
+    _nest(docs["hosp_admissions"], docs["hosp_labevents"])
+    return {
+        "patient": patient,
+        "admissions": docs["hosp_admissions"],
+        "diagnoses": docs["hosp_diagnoses_icd"],
+        "procedures": docs["hosp_procedures_icd"],
+    }
+
+
+def _normalize(docs: dict) -> dict:
+    """Lo que dejaría el importador normalizado: sin _id ni campos vacíos."""
+    normalized = copy.deepcopy(docs)
+    sanitize_document(normalized["patient"], "hosp_patients")
+    for collection in COLLECTIONS:
+        sanitize_documents(normalized[collection], collection)
+    return normalized
+
+
+def _time(fn, docs: dict, iterations: int) -> dict:
+    # Copias preparadas de antemano: el sanitizer limpia en sitio
+    copies = [copy.deepcopy(docs) for _ in range(iterations)]
+    timings = []
+    for doc_copy in copies:
+        start = perf_counter()
+        fn(doc_copy)
+        timings.append((perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(percentile(timings, 0.50), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "mean_ms": round(sum(timings) / len(timings), 3),
+    }
+
+
+def run(db, subject_id: int, iterations: int = 20) -> dict:
+    docs = load_patient(db, subject_id)
+    if docs["patient"] is None:
+        raise ValueError(f"No existe el paciente {subject_id}")
+
+    expected = legacy(copy.deepcopy(docs))
+    if sanitized(copy.deepcopy(docs)) != expected:
+        raise AssertionError("El sanitizer no produce la misma respuesta que clean_data")
+
+    normalized_docs = _normalize(docs)
+    results = {
+        "subject_id": subject_id,
+        "labevents": len(docs["hosp_labevents"]),
+        "legacy_clean_data": _time(legacy, docs, iterations),
+        "sanitize": _time(sanitized, docs, iterations),
+        "sanitize_normalized": _time(lambda d: sanitized(d, NORMALIZED), normalized_docs, iterations),
+    }
+    base = results["legacy_clean_data"]["p50_ms"]
+    for name in ("sanitize", "sanitize_normalized"):
+        p50 = results[name]["p50_ms"]
+        results[name]["speedup"] = round(base / p50, 1) if p50 else None
+    return results
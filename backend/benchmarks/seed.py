@@ -0,0 +1,117 @@
+"""
+Carga del dataset demo en el mongod de benchmark como lo deja init-demo.sh:
+import normalizado y versionado, equivalencias ICD, índices del manifiesto,
+scripts de preagregación de scripts/demo y colecciones materializadas
+(payloads, perfiles, búsqueda y cubo de ingresos).
+"""
+
+import importlib.util
+import os
+from pathlib import Path
+from time import perf_counter
+
+import pandas as pd
+
+from app.utils.indexes import ensure_indexes
+from app.utils.response_cache import stamp_build_version
+from app.utils.sanitize import normalize_records
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEMO_PATH = REPO_ROOT / "data" / "mimic-iv-clinical-database-demo-2.2"
+SCRIPTS_PATH = REPO_ROOT / "scripts" / "demo"
+EQUIVALENCIAS_CSV = REPO_ROOT / "data" / "icd_con_equivalencia_ic10_extended.csv"
+
+
+def _load_script(name: str):
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", SCRIPTS_PATH / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def import_demo(db, dataset_path: Path = DEMO_PATH, normalize: bool = True):
+    """
+    Importa hosp/ e icu/ (csv.gz) como import_mimic_demo.py (mismos nombres, registros
+    normalizados y versión en _build_versions), las equivalencias ICD y los índices del
+    manifiesto (pasos 1-3 de init-demo.sh). normalize=False deja los campos vacíos
+    sin quitar ni marcar (el benchmark del sanitizer necesita los datos en bruto).
+    """
+    start = perf_counter()
+    for subfolder in ("hosp", "icu"):
+        folder = dataset_path / subfolder
+        for file in sorted(os.listdir(folder)):
+            if not file.endswith((".csv", ".csv.gz")):
+                continue
+            collection_name = f"{subfolder}_{file.split('.csv')[0]}"
+            records = pd.read_csv(folder / file, low_memory=False).to_dict(orient="records")
+            if normalize:
+                records = normalize_records(records)
+            if records:
+                db[collection_name].insert_many(records)
+            stamp_build_version(db, collection_name, normalized=normalize)
+    df_subjects = pd.read_csv(dataset_path / "demo_subject_id.csv")
+    db["demo_subject_id"].insert_many(df_subjects.to_dict(orient="records"))
+
+    if EQUIVALENCIAS_CSV.exists():
+        db["icd_equivalencias"].insert_many(pd.read_csv(EQUIVALENCIAS_CSV).to_dict(orient="records"))
+        stamp_build_version(db, "icd_equivalencias")
+    else:
+        print(f"Aviso: no existe {EQUIVALENCIAS_CSV}, diagnosis-icicle devolverá datos vacíos")
+    print(f"Dataset demo importado en {perf_counter() - start:.1f}s")
+
+    start = perf_counter()
+    built = ensure_indexes(db)
+    failed = [row["collection"] for row in built if row.get("error")]
+    print(f"Índices del manifiesto en {len(built)} colecciones en {perf_counter() - start:.1f}s")
+    if failed:
+        print(f"Aviso: fallaron los índices de {', '.join(failed)}")
+
+
+def run_preaggregations(db, materialized: bool = True):
+    """
+    Ejecuta las funciones de los scripts build_*/calculate_* contra `db`.
+    materialized: construir también _payloads, patient_profiles, patient_search y
+    admission_time_cube (como init-demo.sh); sin ellas se miden los caminos en vivo.
+    Las construcciones del backend leen la conexión del entorno (USE_DEMO / MONGO_DEMO_URL).
+    """
+    start = perf_counter()
+    _load_script("build_diag_counts_by_code").build_counts(db)
+    _load_script("build_prescription_counts_by_route").build_counts(db)
+    _load_script("build_transfer_edges_chord").build_edges(db)
+    stats_script = _load_script("calculate_categorized_dashboard_stats")
+    stats_script.save_stats(db, stats_script.calculate_stats(db))
+    print(f"Preagregaciones completadas en {perf_counter() - start:.1f}s")
+    if materialized:
+        build_materialized(db)
+
+
+def build_materialized(db):
+    """Colecciones materializadas que sirve la API, en el orden de init-demo.sh (pasos 8-11)."""
+    import app.routes.dashboard  # noqa: F401 (registra dashboard/stats)
+    import app.routes.charts.router  # noqa: F401 (registra los charts)
+    from app.utils.cohort import build_search
+    from app.utils.payloads import build_static_payloads
+    from app.utils.profiles import build_profiles
+    from app.utils.response_cache import build_versions
+    from app.utils.time_cube import build_time_cube
+
+    steps = [
+        ("_payloads", lambda: build_static_payloads(db, build_versions(db), persist=True, reuse=False)),
+        ("patient_profiles", lambda: build_profiles(db)),
+        ("patient_search", lambda: build_search(db)),
+        ("admission_time_cube", lambda: build_time_cube(db, by_admission_type=True)),
+    ]
+    for name, build in steps:
+        start = perf_counter()
+        build()
+        print(f"{name} construida en {perf_counter() - start:.1f}s")
+
+
+def heaviest_subjects(db, n: int) -> list[int]:
+    """Pacientes con más labevents (el caso más caro de /api/patients/{id})."""
+    pipeline = [
+        {"$group": {"_id": "$subject_id", "labs": {"$sum": 1}}},
+        {"$sort": {"labs": -1}},
+        {"$limit": n},
+    ]
+    return [int(doc["_id"]) for doc in db["hosp_labevents"].aggregate(pipeline)]
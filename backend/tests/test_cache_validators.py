@@ -0,0 +1,172 @@
+import gzip
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.utils import payloads, response_cache
+from app.utils.payloads import choose_encoding, etag_for
+from app.utils.response_cache import _not_modified, _validators
+
+BUILT = datetime(2024, 5, 1, 10, 30, 15, 123456)
+VERSION = ((3, BUILT), (7, datetime(2024, 4, 1)))
+
+
+def _request(**headers) -> Request:
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_validators_follow_the_build_version():
+    etag, last_modified = _validators("route", (("a", 1),), VERSION)
+    assert etag == _validators("route", (("a", 1),), VERSION)[0]
+    assert etag != _validators("route", (("a", 2),), VERSION)[0]
+    assert etag != _validators("route", (("a", 1),), ((4, BUILT), VERSION[1]))[0]
+    # Last-Modified: el build más reciente, en UTC y sin microsegundos
+    assert last_modified == datetime(2024, 5, 1, 10, 30, 15, tzinfo=timezone.utc)
+
+
+def test_no_validators_without_version():
+    assert _validators("route", (), (VERSION[0], None)) == (None, None)
+
+
+@pytest.mark.parametrize("encoding, expected", [("br", 'W/"abc-br"'), ("gzip", 'W/"abc-gzip"'), (None, 'W/"abc-identity"')])
+def test_etag_per_encoding(encoding, expected):
+    assert etag_for("abc", encoding) == expected
+
+
+@pytest.mark.parametrize("accept, available, expected", [
+    ("gzip, deflate, br", ("br", "gzip"), "br"),
+    ("gzip, deflate, br", ("gzip",), "gzip"),
+    ("br;q=0, gzip", ("br", "gzip"), "gzip"),
+    ("gzip;q=0", ("br", "gzip"), None),
+    ("*", ("br", "gzip"), "br"),
+    ("*;q=0, gzip;q=0.5", ("br", "gzip"), "gzip"),
+    ("identity", ("br", "gzip"), None),
+    ("gzip;q=abc", ("gzip",), None),
+    (None, ("br", "gzip"), None),
+])
+def test_choose_encoding(accept, available, expected):
+    assert choose_encoding(accept, available) == expected
+
+
+@pytest.mark.parametrize("if_none_match, expected", [
+    ('W/"abc-gzip"', True),
+    ('"abc-gzip"', True),
+    ('"other", W/"abc-gzip"', True),
+    ("*", True),
+    ('W/"abc-identity"', False),
+    ('W/"abc-br"', False),
+])
+def test_if_none_match_weak_comparison(if_none_match, expected):
+    assert _not_modified(_request(if_none_match=if_none_match), 'W/"abc-gzip"', None) is expected
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    last_modified = datetime(2024, 5, 1, tzinfo=timezone.utc)
+    request = _request(if_none_match='W/"other"', if_modified_since=format_datetime(last_modified, usegmt=True))
+    assert not _not_modified(request, 'W/"abc-gzip"', last_modified)
+
+
+@pytest.mark.parametrize("since, expected", [
+    ("Wed, 01 May 2024 10:30:15 GMT", True),
+    ("Thu, 02 May 2024 00:00:00 GMT", True),
+    ("Tue, 30 Apr 2024 23:59:59 GMT", False),
+    ("no es una fecha", False),
+])
+def test_if_modified_since(since, expected):
+    last_modified = datetime(2024, 5, 1, 10, 30, 15, tzinfo=timezone.utc)
+    assert _not_modified(_request(if_modified_since=since), 'W/"abc"', last_modified) is expected
+
+
+def test_no_etag_never_not_modified():
+    assert not _not_modified(_request(if_none_match="*"), None, None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+    db = type("Db", (), {"name": "test_validators"})()
+    monkeypatch.setattr(response_cache, "get_db", lambda: db)
+    monkeypatch.setattr(response_cache, "build_versions", lambda db: {"src": VERSION[0]})
+    monkeypatch.setattr(payloads, "find_payload", lambda *args: None)
+    response_cache.response_cache.clear()
+
+    app = FastAPI()
+
+    @app.get("/cached")
+    @response_cache.cached_response("tests/cached", ["src"], cache_control="public, max-age=60")
+    def cached(n: int = 1):
+        calls.append(n)
+        return {"values": list(range(n))}
+
+    with TestClient(app) as client:
+        client.calls = calls
+        yield client
+    response_cache.response_cache.clear()
+
+
+def test_conditional_requests(client):
+    first = client.get("/cached?n=500", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"].startswith('W/"') and first.headers["etag"].endswith('-gzip"')
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert first.headers["cache-control"] == "public, max-age=60"
+    assert first.json() == {"values": list(range(500))}
+
+    revalidated = client.get("/cached?n=500", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == first.headers["etag"]
+    assert revalidated.headers["vary"] == "Accept-Encoding"
+
+    # El ETag de gzip no valida la representación sin comprimir
+    identity = client.get("/cached?n=500", headers={"Accept-Encoding": "identity", "If-None-Match": first.headers["etag"]})
+    assert identity.status_code == 200
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"].endswith('-identity"')
+
+    since = client.get("/cached?n=500", headers={"Accept-Encoding": "gzip", "If-Modified-Since": first.headers["last-modified"]})
+    assert since.status_code == 304
+
+    # Una sola ejecución de la ruta: el resto sale de la caché o es un 304
+    assert client.calls == [500]
+
+
+def _stored_br(body: bytes) -> bytes:
+    # Sin brotli en este proceso la variante guardada no se sirve nunca: basta un marcador
+    return payloads.brotli.compress(body) if payloads.brotli is not None else b"br"
+
+
+@pytest.mark.parametrize("with_br", [False, True])
+def test_persisted_payload_revalidates(monkeypatch, with_br):
+    # _payloads construido en otro proceso, con o sin brotli: el 200 y el 304
+    # deben elegir la codificación (y el ETag) de la misma lista
+    body = b'{"values":[1,2,3]}'
+    doc = {"json": body, "gzip": gzip.compress(body), "br": _stored_br(body) if with_br else None}
+    payload = payloads.Payload.from_document(doc)
+    assert all(getattr(payload, encoding) is not None for encoding in payloads.AVAILABLE_ENCODINGS)
+
+    db = type("Db", (), {"name": "test_persisted"})()
+    monkeypatch.setattr(response_cache, "get_db", lambda: db)
+    monkeypatch.setattr(response_cache, "build_versions", lambda db: {"src": VERSION[0]})
+    monkeypatch.setattr(payloads, "find_payload", lambda *args: payloads.Payload.from_document(doc))
+    response_cache.response_cache.clear()
+
+    app = FastAPI()
+
+    @app.get("/persisted")
+    @response_cache.cached_response("tests/persisted", ["src"])
+    def persisted():
+        raise AssertionError("debe servirse desde _payloads")
+
+    with TestClient(app) as client:
+        first = client.get("/persisted", headers={"Accept-Encoding": "gzip, br"})
+        assert first.status_code == 200 and first.json() == {"values": [1, 2, 3]}
+        assert first.headers["etag"].endswith(f'-{payloads.AVAILABLE_ENCODINGS[0]}"')
+        revalidated = client.get("/persisted", headers={"Accept-Encoding": "gzip, br", "If-None-Match": first.headers["etag"]})
+        assert revalidated.status_code == 304
+    response_cache.response_cache.clear()
@@ -0,0 +1,136 @@
+import random
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes.patients import _series_filter
+from app.utils.downsample import DOWNSAMPLERS, LTTBDownsampler, MinMaxDownsampler
+
+
+def _bucket_bounds(n: int, buckets: int) -> list[tuple[int, int]]:
+    """
+    Tramos [inicio, fin) de los índices 1..n-2. El último llega siempre hasta n-2:
+    con el redondeo de (n-2)/buckets en coma flotante la fórmula de
+    Steinarsson puede dejar fuera el penúltimo punto.
+    """
+    every = (n - 2) / buckets
+    return [(int(i * every) + 1, n - 1 if i == buckets - 1 else int((i + 1) * every) + 1) for i in range(buckets)]
+
+
+def reference_lttb(data: list, threshold: int) -> list:
+    """LTTB de referencia sobre la lista completa (Steinarsson, 2013)."""
+    if len(data) <= threshold:
+        return list(data)
+    bounds = _bucket_bounds(len(data), threshold - 2)
+    selected = [data[0]]
+    anchor = data[0]
+    for i, (start, end) in enumerate(bounds):
+        # Media del bucket siguiente (el último punto en el caso del último bucket)
+        next_bucket = data[slice(*bounds[i + 1])] if i + 1 < len(bounds) else data[-1:]
+        cx = sum(p[0] for p in next_bucket) / len(next_bucket)
+        cy = sum(p[1] for p in next_bucket) / len(next_bucket)
+        best, best_area = None, -1.0
+        for point in data[start:end]:
+            area = abs((anchor[0] - cx) * (point[1] - anchor[1]) - (anchor[0] - point[0]) * (cy - anchor[1]))
+            if area > best_area:
+                best, best_area = point, area
+        selected.append(best)
+        anchor = best
+    selected.append(data[-1])
+    return selected
+
+
+def reference_minmax(data: list, threshold: int) -> list:
+    if len(data) <= threshold:
+        return list(data)
+    selected = [data[0]]
+    for start, end in _bucket_bounds(len(data), max(1, (threshold - 2) // 2)):
+        bucket = data[start:end]
+        if not bucket:
+            continue
+        low = min(bucket, key=lambda p: p[1])
+        high = max(bucket, key=lambda p: p[1])
+        selected.extend(sorted({id(p): p for p in (low, high)}.values(), key=lambda p: p[0]))
+    selected.append(data[-1])
+    return selected
+
+
+def _series(n: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [(float(i * 60), rng.gauss(100, 15), {"i": i}) for i in range(n)]
+
+
+def _run(downsampler, data: list) -> list:
+    for point in data:
+        downsampler.add(point)
+    return downsampler.finish()
+
+
+@pytest.mark.parametrize("n, threshold", [(1000, 50), (103, 10), (10, 5), (500, 499), (5000, 3), (7, 10), (3, 3)])
+def test_lttb_matches_reference(n, threshold):
+    data = _series(n)
+    assert _run(LTTBDownsampler(n, threshold), data) == reference_lttb(data, threshold)
+
+
+def test_lttb_irregular_timestamps():
+    rng = random.Random(7)
+    x = 0.0
+    data = []
+    for i in range(800):
+        x += rng.expovariate(1 / 300)
+        data.append((x, rng.random(), i))
+    assert _run(LTTBDownsampler(len(data), 64), data) == reference_lttb(data, 64)
+
+
+def test_lttb_more_points_than_counted():
+    # El cursor puede devolver más puntos que el count previo: van al último bucket
+    data = _series(120)
+    selected = _run(LTTBDownsampler(100, 10), data)
+    assert len(selected) == 10
+    assert selected[0] is data[0] and selected[-1] is data[-1]
+    assert [p[0] for p in selected] == sorted(p[0] for p in selected)
+
+
+@pytest.mark.parametrize("n, threshold", [(1000, 50), (103, 10), (64, 8), (10, 4), (3, 10), (500, 499)])
+def test_minmax_matches_reference(n, threshold):
+    data = _series(n, seed=n)
+    assert _run(MinMaxDownsampler(n, threshold), data) == reference_minmax(data, threshold)
+
+
+def test_minmax_keeps_peaks():
+    data = _series(1000)
+    data[437] = (data[437][0], 1e6, data[437][2])
+    data[612] = (data[612][0], -1e6, data[612][2])
+    selected = _run(MinMaxDownsampler(len(data), 20), data)
+    assert data[437] in selected and data[612] in selected
+
+
+@pytest.mark.parametrize("method", sorted(DOWNSAMPLERS))
+def test_empty_series(method):
+    assert DOWNSAMPLERS[method](0, 100).finish() == []
+
+
+def test_minmax_minimum_threshold_reduces():
+    # threshold 4: primer punto, mínimo y máximo de un único bucket y último punto
+    data = _series(10007)
+    selected = _run(MinMaxDownsampler(len(data), 4), data)
+    assert selected == reference_minmax(data, 4)
+    assert len(selected) == 4
+    inner = data[1:-1]
+    assert min(inner, key=lambda p: p[1]) in selected and max(inner, key=lambda p: p[1]) in selected
+
+
+@pytest.mark.parametrize("method, threshold", [("lttb", 2), ("minmax", 3)])
+def test_threshold_below_minimum(method, threshold):
+    # Antes se devolvía la serie entera sin reducir
+    with pytest.raises(ValueError):
+        DOWNSAMPLERS[method](10007, threshold)
+
+
+@pytest.mark.parametrize("method", sorted(DOWNSAMPLERS))
+def test_series_route_minimum_points(method):
+    min_points = DOWNSAMPLERS[method].min_threshold
+    assert _series_filter(1, 50931, None, method, min_points)["itemid"] == 50931
+    with pytest.raises(HTTPException) as excinfo:
+        _series_filter(1, 50931, None, method, min_points - 1)
+    assert excinfo.value.status_code == 400
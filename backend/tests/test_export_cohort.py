@@ -0,0 +1,49 @@
+import pytest
+from fastapi import HTTPException
+
+from app.routes import export as export_route
+from app.routes.export import CohortFilters, _cohort_ids
+from app.utils.cohort import search_filter
+from app.utils.export import combine_filters
+
+
+class _Db:
+    name = "test_export"
+
+    def __getitem__(self, name):
+        raise AssertionError("una cohorte no válida no debe llegar a Mongo")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(export_route, "build_versions", lambda db: {"patient_search": (1, None)})
+    return _Db()
+
+
+@pytest.mark.parametrize("cohort", [
+    {"gender": 5},
+    {"gender": "X"},
+    {"admission_type": "URGENT"},
+    {"careunit": [1, 2]},
+    {"age_min": "5"},
+    {"age_max": -1},
+    {"icu": "true"},
+    {"icd_prefix": None},
+    {"unknown": 1},
+])
+def test_invalid_cohort_is_400(db, cohort):
+    with pytest.raises(HTTPException) as excinfo:
+        _cohort_ids(db, cohort)
+    assert excinfo.value.status_code == 400
+
+
+def test_valid_cohort_builds_search_filter():
+    cohort = {"gender": "f", "age_min": 18, "admission_type": ["URGENT"], "icu": True, "icd": "I10", "icd_prefix": True}
+    assert search_filter(**CohortFilters.model_validate(cohort).model_dump()) == search_filter(**cohort)
+
+
+def test_combine_filters_keeps_both_conditions():
+    assert combine_filters({}, {"a": 1}) == {"a": 1}
+    assert combine_filters({"subject_id": 1}, {"subject_id": {"$in": [2]}}) == {
+        "$and": [{"subject_id": 1}, {"subject_id": {"$in": [2]}}]
+    }
@@ -0,0 +1,127 @@
+import random
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.routes.patients import _LABEVENTS_PAGE_SORT, _decode_cursor, _encode_cursor, _labevents_filter
+
+_DICTS = SimpleNamespace(labitems={
+    50931: ("Glucose", "Blood", "Chemistry"),
+    50912: ("Creatinine", "Blood", "Chemistry"),
+    51301: ("White Blood Cells", "Blood", "Hematology"),
+})
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    """Evaluación mínima de los operadores que genera _labevents_filter."""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for op, operand in condition.items():
+            ok = {
+                "$lt": lambda: value < operand,
+                "$lte": lambda: value <= operand,
+                "$gte": lambda: value >= operand,
+                "$in": lambda: value in operand,
+            }[op]()
+            if not ok:
+                return False
+    return True
+
+
+def _find(docs: list, query: dict, limit: int) -> list:
+    result = [doc for doc in docs if _matches(doc, query)]
+    for field, direction in reversed(_LABEVENTS_PAGE_SORT):
+        result.sort(key=lambda doc: doc[field], reverse=direction < 0)
+    return result[:limit]
+
+
+def _paginate(docs: list, limit: int, **filters) -> list[list[dict]]:
+    """Recorre las páginas como /{subject_id}/labevents (limit + 1 para saber si hay más)."""
+    args = {"hadm_id": None, "itemid": None, "label": None, "category": None, "start": None, "end": None, **filters}
+    pages = []
+    cursor = None
+    while True:
+        query = _labevents_filter(_DICTS, 1, cursor=cursor, **args)
+        page = _find(docs, query, limit + 1)
+        pages.append(page[:limit])
+        if len(page) <= limit:
+            return pages
+        cursor = _encode_cursor(page[limit - 1])
+
+
+@pytest.fixture
+def labevents() -> list[dict]:
+    rng = random.Random(3)
+    docs = []
+    for labevent_id in rng.sample(range(1, 10_000), 250):
+        # Pocas horas distintas: muchos empates de charttime que desempata labevent_id
+        charttime = f"2150-01-{rng.randint(1, 5):02d} {rng.choice(['08', '12', '20'])}:00:00"
+        docs.append({
+            "subject_id": 1,
+            "hadm_id": rng.choice([100, 200]),
+            "itemid": rng.choice(list(_DICTS.labitems)),
+            "labevent_id": labevent_id,
+            "charttime": charttime,
+        })
+    docs.append({"subject_id": 2, "hadm_id": 300, "itemid": 50931, "labevent_id": 1, "charttime": "2150-01-01 08:00:00"})
+    return docs
+
+
+def _expected(docs: list, predicate=lambda doc: True) -> list[dict]:
+    return sorted(
+        (doc for doc in docs if doc["subject_id"] == 1 and predicate(doc)),
+        key=lambda doc: (doc["charttime"], doc["labevent_id"]),
+        reverse=True,
+    )
+
+
+@pytest.mark.parametrize("value", ["2150-01-01 08:00:00", datetime(2150, 1, 1, 8, 0), None])
+def test_cursor_round_trip(value):
+    token = _encode_cursor({"charttime": value, "labevent_id": 42, "valuenum": 1.5})
+    assert _decode_cursor(token) == (value, 42)
+    # URL-safe: viaja como parámetro de consulta sin escapar
+    assert all(c.isalnum() or c in "-_=" for c in token)
+
+
+@pytest.mark.parametrize("token", ["no-es-base64!", "W10=", _encode_cursor({}).replace("W", "@")])
+def test_invalid_cursor(token):
+    with pytest.raises(HTTPException) as excinfo:
+        _decode_cursor(token)
+    assert excinfo.value.status_code == 400
+
+
+@pytest.mark.parametrize("limit", [1, 7, 50, 249, 250, 1000])
+def test_pages_cover_every_document_once(labevents, limit):
+    pages = _paginate(labevents, limit)
+    flat = [doc for page in pages for doc in page]
+    assert flat == _expected(labevents)
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_pages_with_filters(labevents):
+    flat = [
+        doc
+        for page in _paginate(labevents, 10, hadm_id=100, category="chemistry", start="2150-01-02", end="2150-01-04T23:59:59")
+        for doc in page
+    ]
+    expected = _expected(
+        labevents,
+        lambda doc: doc["hadm_id"] == 100
+        and doc["itemid"] in (50931, 50912)
+        and "2150-01-02 00:00:00" <= doc["charttime"] <= "2150-01-04 23:59:59",
+    )
+    assert expected and flat == expected
+
+
+def test_label_without_matches():
+    assert _labevents_filter(_DICTS, 1, None, [51301], "Glucose", None, None, None, None) is None
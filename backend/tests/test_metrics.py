@@ -0,0 +1,26 @@
+import httpx
+import openai
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils.metrics import observe_openai
+
+
+def _count(endpoint: str, outcome: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "openai_request_duration_seconds_count", {"endpoint": endpoint, "outcome": outcome}
+    )
+    return value or 0.0
+
+
+@pytest.mark.parametrize("exc, outcome", [
+    (openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")), "timeout"),
+    (TimeoutError(), "timeout"),
+    (ValueError("boom"), "error"),
+])
+def test_observe_openai_outcome(exc, outcome):
+    before = _count("test", outcome)
+    with pytest.raises(type(exc)):
+        with observe_openai("test"):
+            raise exc
+    assert _count("test", outcome) == before + 1
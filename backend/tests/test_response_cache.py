@@ -0,0 +1,87 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils import response_cache
+from app.utils.response_cache import RESPONSE_CACHE_UNVERSIONED_TTL_S, ResponseCache
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(response_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_lru_eviction_by_bytes():
+    cache = ResponseCache(max_bytes=10)
+    cache.put(("db", "a", ()), (1,), "a", 4)
+    cache.put(("db", "b", ()), (1,), "b", 4)
+    assert cache.get(("db", "a", ()), (1,)) == "a"
+    cache.put(("db", "c", ()), (1,), "c", 4)
+    # "b" es la menos usada
+    assert cache.get(("db", "b", ()), (1,)) is None
+    assert cache.get(("db", "a", ()), (1,)) == "a"
+    assert cache.evictions == 1
+
+
+def test_version_change_discards_entry():
+    cache = ResponseCache(max_bytes=100)
+    cache.put(("db", "a", ()), (1,), "a", 1)
+    assert cache.get(("db", "a", ()), (2,)) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_unversioned_entry_expires(clock):
+    cache = ResponseCache(max_bytes=100)
+    cache.put(("db", "a", ()), (None,), "a", 1)
+    clock.now += RESPONSE_CACHE_UNVERSIONED_TTL_S - 1
+    assert cache.get(("db", "a", ()), (None,)) == "a"
+    clock.now += 2
+    assert cache.get(("db", "a", ()), (None,)) is None
+
+
+@pytest.fixture
+def unversioned_client(monkeypatch, clock):
+    calls = []
+    db = type("Db", (), {"name": "test_response_cache"})()
+    monkeypatch.setattr(response_cache, "get_db", lambda: db)
+    # Colección sin versión de build (scripts sin marcar): solo caduca por TTL
+    monkeypatch.setattr(response_cache, "build_versions", lambda db: {})
+    response_cache.response_cache.clear()
+
+    app = FastAPI()
+
+    @app.get("/unversioned")
+    @response_cache.cached_response("tests/unversioned", ["src"])
+    def unversioned():
+        calls.append(clock.now)
+        return {"calls": len(calls)}
+
+    with TestClient(app) as client:
+        client.calls = calls
+        yield client
+    response_cache.response_cache.clear()
+
+
+def test_hit_does_not_extend_stored_at(unversioned_client, clock):
+    key = ("test_response_cache", "tests/unversioned", ())
+    assert unversioned_client.get("/unversioned").json() == {"calls": 1}
+    stored_at = response_cache.response_cache._entries[key][3]
+
+    clock.now += RESPONSE_CACHE_UNVERSIONED_TTL_S - 1
+    assert unversioned_client.get("/unversioned").json() == {"calls": 1}
+    assert response_cache.response_cache._entries[key][3] == stored_at
+
+    # Caduca respecto a la primera escritura aunque haya tenido hits
+    clock.now += 2
+    assert unversioned_client.get("/unversioned").json() == {"calls": 2}
+    assert response_cache.response_cache._entries[key][3] == clock.now
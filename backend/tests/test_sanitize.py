@@ -0,0 +1,39 @@
+import math
+
+import pytest
+
+from app.utils.sanitize import FIELD_SCHEMAS, is_missing, normalize_records, sanitize_document, sanitize_documents
+
+EMPTY_VALUES = [None, float("nan"), math.inf, -math.inf, "nan", "NaN"]
+KEPT_VALUES = [0, 0.0, "", "N", False, "2150-01-01 08:00:00", 1.5]
+
+
+@pytest.mark.parametrize("value", EMPTY_VALUES)
+def test_missing_values(value):
+    assert is_missing(value)
+
+
+@pytest.mark.parametrize("value", KEPT_VALUES)
+def test_present_values(value):
+    assert not is_missing(value)
+
+
+def test_normalize_records_matches_sanitizer():
+    # Lo que se inserta normalizado es lo que el sanitizer devolvería
+    record = {"labevent_id": 1, "subject_id": 2, "charttime": "2150-01-01 08:00:00"}
+    record.update({f"empty_{i}": value for i, value in enumerate(EMPTY_VALUES)})
+    record.update({f"kept_{i}": value for i, value in enumerate(KEPT_VALUES)})
+    (normalized,) = normalize_records([dict(record)])
+    assert normalized == sanitize_document(dict(record), "hosp_labevents")
+    assert not any(is_missing(value) for value in normalized.values())
+
+
+def test_normalized_collections_skip_the_sanitizer():
+    docs = [{"subject_id": 1, "flag": "nan"}]
+    assert sanitize_documents(docs, "hosp_labevents", frozenset({"hosp_labevents"})) == [{"subject_id": 1, "flag": "nan"}]
+    assert sanitize_documents(docs, "hosp_labevents") == [{"subject_id": 1}]
+
+
+def test_required_fields_are_not_inspected():
+    doc = {field: "nan" for field in FIELD_SCHEMAS["hosp_patients"]}
+    assert sanitize_document(dict(doc), "hosp_patients") == doc
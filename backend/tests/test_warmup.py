@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from app.utils import warmup
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    calls = []
+
+    def fake(db, budget):
+        calls.append(db)
+        budget.check()
+        return "ok"
+
+    monkeypatch.setattr(warmup, "get_db", lambda: "db")
+    monkeypatch.setattr(warmup, "WARMUP_STEPS", ["fake", "fake"])
+    monkeypatch.setitem(warmup.STEPS, "fake", fake)
+    return calls
+
+
+def test_stopped_run_skips_pending_steps(steps):
+    stop = threading.Event()
+    stop.set()
+    warmup.run_warmup(stop)
+    assert warmup.state.status == "stopped"
+    assert not warmup.state.ready
+    assert [s["detail"] for s in warmup.state.steps] == ["detenido", "detenido"]
+    assert steps == []
+
+
+def test_second_run_starts_from_fresh_state(steps):
+    # Un primer arranque detenido al apagar no deja la parada ni sus pasos al siguiente
+    stopped = threading.Event()
+    stopped.set()
+    warmup.run_warmup(stopped)
+    warmup.run_warmup(threading.Event())
+    assert warmup.state.ready
+    assert [s["status"] for s in warmup.state.steps] == ["ok", "ok"]
+    assert len(steps) == 2
+
+
+def test_budget_exhausted_marks_remaining_steps(steps, monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_BUDGET_S", -1)
+    warmup.run_warmup(threading.Event())
+    assert warmup.state.ready
+    assert [s["detail"] for s in warmup.state.steps] == ["presupuesto agotado", "presupuesto agotado"]
@@ -2,6 +2,7 @@
 
 import { useState } from "react";
 import { useRouter } from "next/navigation";
+import CohortSearch from "@/components/search/CohortSearch";
 
 export default function SearchPage() {
   const [patientId, setPatientId] = useState("");
@@ -90,6 +91,11 @@ export default function SearchPage() {
             <p className="mt-2 text-sm text-red-600">{error}</p>
           )}
         </div>
+
+        {/* Búsqueda de cohortes (/api/patients/search) */}
+        <div className="max-w-2xl mx-auto mt-12 pt-8 border-t border-gray-200">
+          <CohortSearch />
+        </div>
       </div>
     </div>
   );
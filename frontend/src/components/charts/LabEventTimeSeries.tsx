@@ -1,16 +1,57 @@
 "use client";
 
-import { useEffect, useRef } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import * as Plot from '@observablehq/plot';
 import { LabEvent } from '@/types';
+import { fetchAllLabEvents, fetchLabSeries } from '@/lib/labevents';
 
 interface LabEventTimeSeriesProps {
-  labevents: LabEvent[];
+  // Si no se pasan, se piden al backend (subjectId, y opcionalmente hadmId);
+  // con itemid se pide la serie ya reducida a SERIES_POINTS puntos
+  labevents?: LabEvent[];
   testName: string;
+  subjectId?: number;
+  hadmId?: number;
+  itemid?: number;
 }
 
-export default function LabEventTimeSeries({ labevents, testName }: LabEventTimeSeriesProps) {
+// Puntos de la serie reducida en el servidor (del orden del ancho del gráfico)
+export const SERIES_POINTS = 500;
+
+export default function LabEventTimeSeries({ labevents: initialEvents, testName, subjectId, hadmId, itemid }: LabEventTimeSeriesProps) {
   const containerRef = useRef<HTMLDivElement>(null);
+  const [fetchedEvents, setFetchedEvents] = useState<LabEvent[] | null>(null);
+
+  // Carga diferida: solo los eventos de este test (filtro label en el servidor)
+  useEffect(() => {
+    if (initialEvents || subjectId === undefined) return;
+    let cancelled = false;
+    const request = itemid !== undefined
+      ? fetchLabSeries(subjectId, itemid, { hadmId, points: SERIES_POINTS }).then(series =>
+          series.points.map(point => ({
+            ...point,
+            flag: point.flag ? 1 : 0,
+            labevent_id: 0,
+            subject_id: series.subject_id,
+            hadm_id: hadmId ?? 0,
+            itemid: series.itemid,
+            label: testName,
+            valueuom: series.unit ?? undefined,
+            ref_range_lower: series.ref_range_lower ?? undefined,
+            ref_range_upper: series.ref_range_upper ?? undefined,
+          } as LabEvent))
+        )
+      : fetchAllLabEvents(subjectId, { hadmId, label: testName });
+    request
+      .then(events => { if (!cancelled) setFetchedEvents(events); })
+      .catch(err => {
+        console.error(err);
+        if (!cancelled) setFetchedEvents([]);
+      });
+    return () => { cancelled = true; };
+  }, [initialEvents, subjectId, hadmId, itemid, testName]);
+
+  const labevents = initialEvents ?? fetchedEvents ?? [];
 
   // Filtrar solo eventos numéricos del test específico
   const numericEvents = labevents.filter(event => 
@@ -80,6 +121,10 @@ export default function LabEventTimeSeries({ labevents, testName }: LabEventTime
     };
   }, [numericEvents, testName]);
 
+  if (!initialEvents && fetchedEvents === null) {
+    return <div className="p-4 text-center text-gray-500">Cargando {testName}...</div>;
+  }
+
   if (!numericEvents.length) {
     return (
       <div className="p-4 text-center text-gray-500">
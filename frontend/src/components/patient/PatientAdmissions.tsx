@@ -1,29 +1,53 @@
 'use client';
 
-import { Admission, Diagnosis, Procedure } from '@/types';
+import { Admission, Diagnosis, LabEvent, Procedure } from '@/types';
 import { useState } from 'react';
-import LabEventTimeSeries from '@/components/charts/LabEventTimeSeries';
+import LabEventTimeSeries, { SERIES_POINTS } from '@/components/charts/LabEventTimeSeries';
+import { fetchAllLabEvents } from '@/lib/labevents';
 
 interface PatientAdmissionsProps {
   admissions: Admission[];
   diagnoses: Diagnosis[];
   procedures: Procedure[];
+  // Si los ingresos no traen labevents, se piden por ingreso al desplegarlo
+  subjectId?: number;
 }
 
-export default function PatientAdmissions({ admissions, diagnoses, procedures }: PatientAdmissionsProps) {
+export default function PatientAdmissions({ admissions, diagnoses, procedures, subjectId }: PatientAdmissionsProps) {
   const [expandedAdmissions, setExpandedAdmissions] = useState<Set<number>>(new Set());
   const [expandedCharts, setExpandedCharts] = useState<Set<string>>(new Set());
   const [expandedDiagnoses, setExpandedDiagnoses] = useState<Set<number>>(() => new Set());
   const [expandedLabs, setExpandedLabs] = useState<Set<number>>(() => new Set());
   const [expandedProcedures, setExpandedProcedures] = useState<Set<number>>(() => new Set());
   const [selectedCategories, setSelectedCategories] = useState<Map<number, string>>(new Map());
+  const [lazyLabs, setLazyLabs] = useState<Map<number, LabEvent[]>>(() => new Map());
+  const [loadingLabs, setLoadingLabs] = useState<Set<number>>(() => new Set());
 
-  const toggleAdmission = (hadmId: number) => {
+  const loadAdmissionLabs = async (hadmId: number) => {
+    if (subjectId === undefined || lazyLabs.has(hadmId) || loadingLabs.has(hadmId)) return;
+    setLoadingLabs(prev => new Set(prev).add(hadmId));
+    try {
+      const events = await fetchAllLabEvents(subjectId, { hadmId });
+      setLazyLabs(prev => new Map(prev).set(hadmId, events));
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingLabs(prev => {
+        const next = new Set(prev);
+        next.delete(hadmId);
+        return next;
+      });
+    }
+  };
+
+  const toggleAdmission = (admission: Admission) => {
+    const hadmId = admission.hadm_id;
     const newExpanded = new Set(expandedAdmissions);
     if (newExpanded.has(hadmId)) {
       newExpanded.delete(hadmId);
     } else {
       newExpanded.add(hadmId);
+      if (admission.labevents === undefined) loadAdmissionLabs(hadmId);
     }
     setExpandedAdmissions(newExpanded);
   };
@@ -69,12 +93,16 @@ export default function PatientAdmissions({ admissions, diagnoses, procedures }:
           const admissionDiagnoses = diagnoses.filter(d => d.hadm_id === admission.hadm_id);
           const admissionProcedures = procedures.filter(p => p.hadm_id === admission.hadm_id);
           const isExpanded = expandedAdmissions.has(admission.hadm_id);
+          const labevents = admission.labevents ?? lazyLabs.get(admission.hadm_id);
+          const labCount = labevents?.length
+            ?? admission.lab_summary?.reduce((total, summary) => total + summary.count, 0)
+            ?? 0;
 
           return (
             <div key={admission.hadm_id} className="border border-gray-200 rounded-lg">
               {/* Header clickeable */}
               <button
-                onClick={() => toggleAdmission(admission.hadm_id)}
+                onClick={() => toggleAdmission(admission)}
                 className="w-full p-4 sm:p-6 text-left hover:bg-gray-50 transition-colors"
               >
                 <div className="flex items-center justify-between">
@@ -100,10 +128,10 @@ export default function PatientAdmissions({ admissions, diagnoses, procedures }:
                           <span>{admissionProcedures.length} procedimientos</span>
                         </>
                       )}
-                      {(admission.labevents?.length ?? 0) > 0 && (
+                      {labCount > 0 && (
                         <>
                           <span>•</span>
-                          <span>{admission.labevents?.length} tests</span>
+                          <span>{labCount} tests</span>
                         </>
                       )}
                     </div>
@@ -236,14 +264,17 @@ export default function PatientAdmissions({ admissions, diagnoses, procedures }:
                   )}
 
                   {/* Laboratorio del ingreso (toggle) */}
-                  {Array.isArray(admission.labevents) && admission.labevents.length > 0 && (
+                  {loadingLabs.has(admission.hadm_id) && (
+                    <p className="mt-6 text-sm text-gray-500">Cargando laboratorio...</p>
+                  )}
+                  {Array.isArray(labevents) && labevents.length > 0 && (
                     <div className="mt-6">
                       <button
                         onClick={() => toggleLabSection(admission.hadm_id)}
                         className="w-full text-left flex items-center justify-between py-2"
                       >
                         <h4 className="text-sm font-medium text-gray-700">
-                          Laboratorio ({admission.labevents.length})
+                          Laboratorio ({labevents.length})
                         </h4>
                         <svg
                           className={`w-4 h-4 text-gray-400 transition-transform ${expandedLabs.has(admission.hadm_id) ? 'rotate-180' : ''}`}
@@ -258,7 +289,7 @@ export default function PatientAdmissions({ admissions, diagnoses, procedures }:
                         <div className="mt-3">
                           {(() => {
                             const categoriesMap = new Map<string, number>();
-                            admission.labevents.forEach((ev) => {
+                            labevents.forEach((ev) => {
                               const key = ev.category || 'Sin categoría';
                               categoriesMap.set(key, (categoriesMap.get(key) || 0) + 1);
                             });
@@ -324,8 +355,8 @@ export default function PatientAdmissions({ admissions, diagnoses, procedures }:
                         // Filtrado por categoría seleccionada
                         const currentCategory = selectedCategories.get(admission.hadm_id) || 'Ver todas';
                         const filteredEvents = currentCategory === 'Ver todas'
-                          ? admission.labevents
-                          : admission.labevents.filter(ev => (ev.category || 'Sin categoría') === currentCategory);
+                          ? labevents
+                          : labevents.filter(ev => (ev.category || 'Sin categoría') === currentCategory);
 
                         // Agrupar eventos por test name (incluyendo no numéricos)
                         const eventsByTestAll = new Map<string, typeof filteredEvents>();
@@ -485,7 +516,17 @@ export default function PatientAdmissions({ admissions, diagnoses, procedures }:
                                     )}
                                     {canPlot && isChartExpanded && (
                                       <div className="p-4 border-t border-gray-100">
-                                        <LabEventTimeSeries labevents={admission.labevents || []} testName={testName} />
+                                        {/* Series largas: se piden ya reducidas (LTTB) al servidor */}
+                                        {subjectId !== undefined && numericEvents.length > SERIES_POINTS ? (
+                                          <LabEventTimeSeries
+                                            testName={testName}
+                                            subjectId={subjectId}
+                                            hadmId={admission.hadm_id}
+                                            itemid={numericEvents[0].itemid}
+                                          />
+                                        ) : (
+                                          <LabEventTimeSeries labevents={labevents} testName={testName} />
+                                        )}
                                       </div>
                                     )}
                                   </div>
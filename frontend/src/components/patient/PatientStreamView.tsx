@@ -0,0 +1,150 @@
+'use client';
+
+import { Admission, Diagnosis, LabSummary, Patient, PatientData, Procedure } from '@/types';
+import { useEffect, useMemo, useState } from 'react';
+import { streamPatient } from '@/lib/patientStream';
+import PatientBasicInfo from '@/components/patient/PatientBasicInfo';
+import PatientAdmissions from '@/components/patient/PatientAdmissions';
+import PatientAISummary from '@/components/patient/PatientAISummary';
+
+interface PatientStreamViewProps {
+  subjectId: string;
+  // Secciones de ?include= (los labevents se cargan por ingreso al desplegarlo)
+  include: string;
+}
+
+type StreamStatus = 'loading' | 'complete' | 'truncated' | 'notfound';
+
+/**
+ * Vista del paciente pintada de forma progresiva a partir de la respuesta NDJSON
+ * de /api/patients/{id}: la información básica aparece con la línea "patient" y
+ * cada sección se añade según llegan sus lotes.
+ */
+export default function PatientStreamView({ subjectId, include }: PatientStreamViewProps) {
+  const [status, setStatus] = useState<StreamStatus>('loading');
+  const [patient, setPatient] = useState<Patient | null>(null);
+  const [admissions, setAdmissions] = useState<Admission[]>([]);
+  const [diagnoses, setDiagnoses] = useState<Diagnosis[]>([]);
+  const [procedures, setProcedures] = useState<Procedure[]>([]);
+  const [summaries, setSummaries] = useState<Record<string, LabSummary[]>>({});
+  const [errors, setErrors] = useState<PatientData['errors']>(undefined);
+
+  useEffect(() => {
+    let cancelled = false;
+    streamPatient(subjectId, include, (line) => {
+      if (cancelled) return;
+      // Una sección puede llegar en varias líneas: se concatenan sus lotes
+      switch (line.section) {
+        case 'patient':
+          setPatient(line.data);
+          break;
+        case 'admissions':
+          setAdmissions(prev => [...prev, ...line.data]);
+          break;
+        case 'diagnoses':
+          setDiagnoses(prev => [...prev, ...line.data]);
+          break;
+        case 'procedures':
+          setProcedures(prev => [...prev, ...line.data]);
+          break;
+        case 'lab_summary':
+          setSummaries(prev => ({ ...prev, ...line.data }));
+          break;
+        case 'errors':
+          setErrors(line.data);
+          break;
+      }
+    })
+      .then(complete => {
+        if (!cancelled) setStatus(complete ? 'complete' : 'truncated');
+      })
+      .catch(() => {
+        if (!cancelled) setStatus('notfound');
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [subjectId, include]);
+
+  // lab_summary llega como {hadm_id: [...]}: se anida en cada ingreso
+  const admissionsWithSummary = useMemo(
+    () => admissions.map(admission => {
+      const summary = summaries[String(admission.hadm_id)];
+      return summary ? { ...admission, lab_summary: summary } : admission;
+    }),
+    [admissions, summaries]
+  );
+
+  // Obtener la admisión más reciente para datos demográficos adicionales
+  const latestAdmission = useMemo(() => {
+    if (admissions.length === 0) return null;
+    return admissions.reduce((latest, current) =>
+      new Date(current.admittime) > new Date(latest.admittime) ? current : latest
+    );
+  }, [admissions]);
+
+  if (status === 'notfound' || (status !== 'loading' && patient === null)) {
+    return (
+      <div className="min-h-[calc(100vh-5rem)] bg-white flex items-center justify-center">
+        <div className="max-w-4xl mx-auto px-4 sm:px-6 lg:px-8 text-center">
+          <h1 className="text-xl sm:text-2xl font-light text-black mb-2">Paciente no encontrado</h1>
+          <p className="text-gray-600">El ID {subjectId} no existe en la base de datos</p>
+        </div>
+      </div>
+    );
+  }
+
+  if (patient === null) {
+    return (
+      <div className="min-h-[calc(100vh-5rem)] bg-white flex items-center justify-center">
+        <p className="text-gray-600">Cargando paciente…</p>
+      </div>
+    );
+  }
+
+  const loading = status === 'loading';
+
+  return (
+    <div className="min-h-[calc(100vh-5rem)] bg-white py-8">
+      <div className="max-w-4xl mx-auto px-4 sm:px-6 lg:px-8">
+        {/* Header */}
+        <div className="mb-8">
+          <h1 className="text-2xl sm:text-3xl font-light text-black mb-2">
+            Paciente {patient.subject_id}
+          </h1>
+          {status === 'truncated' && (
+            <p className="text-sm text-red-600">La respuesta se cortó: algunos datos pueden faltar</p>
+          )}
+          {errors && Object.keys(errors).length > 0 && (
+            <p className="text-sm text-red-600">
+              Secciones no disponibles: {Object.keys(errors).join(', ')}
+            </p>
+          )}
+        </div>
+
+        {/* Información básica */}
+        <PatientBasicInfo
+          patient={patient}
+          latestAdmission={latestAdmission}
+        />
+
+        {/* Resumen IA: se genera al montarse, así que espera a tener todas las secciones */}
+        {!loading && (
+          <PatientAISummary data={{ patient, admissions, diagnoses, procedures }} />
+        )}
+
+        {/* Historial de ingresos */}
+        {loading && admissions.length === 0 ? (
+          <p className="text-gray-600 mb-8">Cargando ingresos…</p>
+        ) : (
+          <PatientAdmissions
+            admissions={admissionsWithSummary}
+            diagnoses={diagnoses}
+            procedures={procedures}
+            subjectId={patient.subject_id}
+          />
+        )}
+      </div>
+    </div>
+  );
+}
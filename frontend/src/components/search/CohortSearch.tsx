@@ -0,0 +1,171 @@
+'use client';
+
+import { useState } from 'react';
+import Link from 'next/link';
+import { CohortPatient } from '@/types';
+import { CohortQuery, fetchCohortPage } from '@/lib/cohort';
+
+const inputClass =
+  'w-full px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-gray-200 focus:border-gray-400 outline-none transition-colors';
+
+// Listas separadas por comas en los campos de texto
+const splitList = (value: string) => value.split(',').map(v => v.trim()).filter(Boolean);
+
+export default function CohortSearch() {
+  const [gender, setGender] = useState('');
+  const [ageMin, setAgeMin] = useState('');
+  const [ageMax, setAgeMax] = useState('');
+  const [admissionType, setAdmissionType] = useState('');
+  const [icu, setIcu] = useState('');
+  const [icd, setIcd] = useState('');
+  const [icdPrefix, setIcdPrefix] = useState(true);
+  const [careunit, setCareunit] = useState('');
+
+  const [query, setQuery] = useState<CohortQuery | null>(null);
+  const [patients, setPatients] = useState<CohortPatient[]>([]);
+  const [total, setTotal] = useState<{ value: number; exact: boolean } | null>(null);
+  const [cursor, setCursor] = useState<number | null>(null);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState('');
+
+  const buildQuery = (): CohortQuery => ({
+    gender: gender === 'M' || gender === 'F' ? gender : undefined,
+    ageMin: ageMin ? Number(ageMin) : undefined,
+    ageMax: ageMax ? Number(ageMax) : undefined,
+    admissionType: admissionType ? splitList(admissionType) : undefined,
+    icu: icu === '' ? undefined : icu === 'true',
+    icd: icd.trim() || undefined,
+    icdPrefix,
+    careunit: careunit ? splitList(careunit) : undefined,
+  });
+
+  const load = async (nextQuery: CohortQuery, nextCursor: number | null) => {
+    setLoading(true);
+    setError('');
+    try {
+      const page = await fetchCohortPage(nextQuery, nextCursor);
+      setPatients(prev => (nextCursor == null ? page.patients : [...prev, ...page.patients]));
+      if (page.total !== null) setTotal({ value: page.total, exact: page.total_exact ?? true });
+      setCursor(page.next_cursor);
+    } catch {
+      setError('No se pudo realizar la búsqueda. Inténtalo de nuevo más tarde.');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const handleSubmit = (e: React.FormEvent) => {
+    e.preventDefault();
+    const nextQuery = buildQuery();
+    setQuery(nextQuery);
+    setTotal(null);
+    load(nextQuery, null);
+  };
+
+  return (
+    <div>
+      <div className="text-center mb-6">
+        <h2 className="text-xl sm:text-2xl font-light text-black mb-2">Buscar cohorte</h2>
+        <p className="text-gray-600">Filtra pacientes por sus características e ingresos</p>
+      </div>
+
+      <form onSubmit={handleSubmit} className="grid grid-cols-1 sm:grid-cols-2 gap-4">
+        <label className="text-sm text-gray-700">
+          Sexo
+          <select value={gender} onChange={e => setGender(e.target.value)} className={inputClass}>
+            <option value="">Cualquiera</option>
+            <option value="F">Mujer</option>
+            <option value="M">Hombre</option>
+          </select>
+        </label>
+        <label className="text-sm text-gray-700">
+          Estancia en UCI
+          <select value={icu} onChange={e => setIcu(e.target.value)} className={inputClass}>
+            <option value="">Indiferente</option>
+            <option value="true">Sí</option>
+            <option value="false">No</option>
+          </select>
+        </label>
+        <label className="text-sm text-gray-700">
+          Edad mínima
+          <input type="number" min={0} value={ageMin} onChange={e => setAgeMin(e.target.value)} className={inputClass} />
+        </label>
+        <label className="text-sm text-gray-700">
+          Edad máxima
+          <input type="number" min={0} value={ageMax} onChange={e => setAgeMax(e.target.value)} className={inputClass} />
+        </label>
+        <label className="text-sm text-gray-700">
+          Tipo de ingreso
+          <input
+            type="text"
+            value={admissionType}
+            onChange={e => setAdmissionType(e.target.value)}
+            placeholder="Ej: URGENT, EW EMER."
+            className={inputClass}
+          />
+        </label>
+        <label className="text-sm text-gray-700">
+          Unidad (careunit)
+          <input
+            type="text"
+            value={careunit}
+            onChange={e => setCareunit(e.target.value)}
+            placeholder="Ej: Medical Intensive Care Unit (MICU)"
+            className={inputClass}
+          />
+        </label>
+        <label className="text-sm text-gray-700">
+          Diagnóstico ICD
+          <input type="text" value={icd} onChange={e => setIcd(e.target.value)} placeholder="Ej: I21" className={inputClass} />
+        </label>
+        <label className="flex items-center gap-2 text-sm text-gray-700 sm:mt-6">
+          <input type="checkbox" checked={icdPrefix} onChange={e => setIcdPrefix(e.target.checked)} />
+          Código ICD como prefijo
+        </label>
+        <button
+          type="submit"
+          disabled={loading}
+          className="sm:col-span-2 py-3 px-4 bg-black text-white font-medium rounded-lg hover:bg-gray-800 disabled:bg-gray-300 disabled:cursor-not-allowed transition-colors"
+        >
+          {loading && cursor == null ? 'Buscando...' : 'Buscar cohorte'}
+        </button>
+      </form>
+
+      {error && <p className="mt-4 text-sm text-red-600">{error}</p>}
+
+      {query && total && (
+        <p className="mt-6 text-sm text-gray-600">
+          {total.exact ? total.value : `Más de ${total.value}`} pacientes
+        </p>
+      )}
+
+      {patients.length > 0 && (
+        <div className="mt-2 border border-gray-200 rounded-lg divide-y divide-gray-200">
+          {patients.map(patient => (
+            <Link
+              key={patient.subject_id}
+              href={`/patient/${patient.subject_id}`}
+              className="flex items-center justify-between p-3 hover:bg-gray-50 transition-colors"
+            >
+              <span className="font-medium text-black">{patient.subject_id}</span>
+              <span className="text-sm text-gray-600">
+                {patient.gender === 'F' ? 'Mujer' : 'Hombre'} • {patient.anchor_age} años • {patient.admissions} ingresos
+                {patient.icu && ' • UCI'}
+              </span>
+            </Link>
+          ))}
+        </div>
+      )}
+
+      {query && cursor != null && (
+        <button
+          onClick={() => load(query, cursor)}
+          disabled={loading}
+          className="mt-4 w-full py-2 px-4 border border-gray-300 rounded-lg text-gray-700 hover:bg-gray-50 disabled:text-gray-300 transition-colors"
+        >
+          {loading ? 'Cargando...' : 'Cargar más'}
+        </button>
+      )}
+    </div>
+  );
+}
@@ -0,0 +1,39 @@
+import { CohortPage } from '@/types';
+
+/**
+ * Filtros de /api/patients/search
+ */
+export interface CohortQuery {
+  gender?: 'M' | 'F';
+  ageMin?: number;
+  ageMax?: number;
+  admissionType?: string[];
+  icu?: boolean;
+  icd?: string;
+  icdPrefix?: boolean;
+  careunit?: string[];
+  limit?: number;
+}
+
+export async function fetchCohortPage(query: CohortQuery, cursor?: number | null): Promise<CohortPage> {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL;
+  const params = new URLSearchParams();
+  if (query.gender) params.set('gender', query.gender);
+  if (query.ageMin !== undefined) params.set('age_min', String(query.ageMin));
+  if (query.ageMax !== undefined) params.set('age_max', String(query.ageMax));
+  query.admissionType?.forEach(type => params.append('admission_type', type));
+  if (query.icu !== undefined) params.set('icu', String(query.icu));
+  if (query.icd) {
+    params.set('icd', query.icd);
+    if (query.icdPrefix) params.set('icd_prefix', 'true');
+  }
+  query.careunit?.forEach(unit => params.append('careunit', unit));
+  if (query.limit) params.set('limit', String(query.limit));
+  if (cursor != null) params.set('cursor', String(cursor));
+
+  const res = await fetch(`${apiUrl}/api/patients/search?${params.toString()}`);
+  if (!res.ok) {
+    throw new Error('Error buscando pacientes');
+  }
+  return res.json();
+}
@@ -0,0 +1,77 @@
+import { LabEvent, LabEventsPage, LabSeries } from '@/types';
+
+/**
+ * Filtros de /api/patients/{id}/labevents
+ */
+export interface LabEventsQuery {
+  hadmId?: number;
+  itemid?: number[];
+  label?: string;
+  category?: string;
+  start?: string;
+  end?: string;
+  limit?: number;
+}
+
+export async function fetchLabEventsPage(
+  subjectId: number,
+  query: LabEventsQuery = {},
+  cursor?: string | null
+): Promise<LabEventsPage> {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL;
+  const params = new URLSearchParams();
+  if (query.hadmId !== undefined) params.set('hadm_id', String(query.hadmId));
+  query.itemid?.forEach(id => params.append('itemid', String(id)));
+  if (query.label) params.set('label', query.label);
+  if (query.category) params.set('category', query.category);
+  if (query.start) params.set('start', query.start);
+  if (query.end) params.set('end', query.end);
+  if (query.limit) params.set('limit', String(query.limit));
+  if (cursor) params.set('cursor', cursor);
+
+  const res = await fetch(`${apiUrl}/api/patients/${subjectId}/labevents?${params.toString()}`);
+  if (!res.ok) {
+    throw new Error('Error cargando laboratorio');
+  }
+  return res.json();
+}
+
+/**
+ * Recorre las páginas (next_cursor) hasta agotar los resultados o maxPages
+ */
+export async function fetchAllLabEvents(
+  subjectId: number,
+  query: LabEventsQuery = {},
+  maxPages = 50
+): Promise<LabEvent[]> {
+  const events: LabEvent[] = [];
+  let cursor: string | null = null;
+  for (let page = 0; page < maxPages; page++) {
+    const result: LabEventsPage = await fetchLabEventsPage(subjectId, { limit: 1000, ...query }, cursor);
+    events.push(...result.labevents);
+    cursor = result.next_cursor;
+    if (!cursor) break;
+  }
+  return events;
+}
+
+/**
+ * Serie numérica de un itemid reducida a `points` puntos en el servidor
+ */
+export async function fetchLabSeries(
+  subjectId: number,
+  itemid: number,
+  options: { hadmId?: number; points?: number; method?: 'lttb' | 'minmax' } = {}
+): Promise<LabSeries> {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL;
+  const params = new URLSearchParams({ itemid: String(itemid) });
+  if (options.hadmId !== undefined) params.set('hadm_id', String(options.hadmId));
+  if (options.points) params.set('points', String(options.points));
+  if (options.method) params.set('method', options.method);
+
+  const res = await fetch(`${apiUrl}/api/patients/${subjectId}/labevents/series?${params.toString()}`);
+  if (!res.ok) {
+    throw new Error('Error cargando la serie');
+  }
+  return res.json();
+}
@@ -0,0 +1,39 @@
+import { PatientStreamLine } from '@/types';
+
+/**
+ * Lee /api/patients/{id} en modo NDJSON y entrega cada línea en cuanto llega,
+ * para pintar la vista del paciente de forma progresiva.
+ * Devuelve false si la respuesta se cortó antes de la línea "end".
+ */
+export async function streamPatient(
+  subjectId: number | string,
+  include: string,
+  onLine: (line: PatientStreamLine) => void
+): Promise<boolean> {
+  const apiUrl = process.env.NEXT_PUBLIC_API_URL;
+  const res = await fetch(`${apiUrl}/api/patients/${subjectId}?include=${include}`, {
+    headers: { Accept: 'application/x-ndjson' },
+    cache: 'no-store',
+  });
+  if (!res.ok || !res.body) {
+    throw new Error('Paciente no encontrado');
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  let complete = false;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? '';
+    for (const raw of lines) {
+      if (!raw) continue;
+      const line = JSON.parse(raw) as PatientStreamLine;
+      if (line.section === 'end') complete = true;
+      onLine(line);
+    }
+  }
+  return complete;
+}
@@ -33,6 +33,26 @@ export interface Admission {
   hospital_expire_flag: 0 | 1;
   // Eventos de laboratorio anidados si el backend los incluye
   labevents?: LabEvent[];
+  // Resumen por test (include=lab_summary)
+  lab_summary?: LabSummary[];
+}
+
+/**
+ * Resumen de un test de laboratorio en un ingreso (patient_profiles)
+ */
+export interface LabSummary {
+  itemid: number;
+  label?: string;
+  fluid?: string;
+  category?: string;
+  count: number;
+  abnormal: number;
+  valuenum_min?: number;
+  valuenum_max?: number;
+  valuenum_mean?: number;
+  valueuom?: string;
+  first_charttime?: string;
+  last_charttime?: string;
 }
 
 /**
@@ -68,9 +88,25 @@ export interface PatientData {
   admissions: Admission[];
   diagnoses: Diagnosis[];
   procedures: Procedure[];
+  // Secciones omitidas por timeout o error en el backend
+  errors?: Partial<Record<'admissions' | 'diagnoses' | 'procedures' | 'labevents' | 'lab_summary', 'timeout' | 'error'>>;
   // labevents no forma parte de la respuesta base; se obtiene con endpoint específico
 }
 
+/**
+ * Línea de /api/patients/{id} con Accept: application/x-ndjson.
+ * Una sección puede llegar en varias líneas (labevents por lotes).
+ */
+export type PatientStreamLine =
+  | { section: 'patient'; data: Patient }
+  | { section: 'admissions'; data: Admission[] }
+  | { section: 'diagnoses'; data: Diagnosis[] }
+  | { section: 'procedures'; data: Procedure[] }
+  | { section: 'labevents'; data: LabEvent[] }
+  | { section: 'lab_summary'; data: Record<string, LabSummary[]> }
+  | { section: 'errors'; data: NonNullable<PatientData['errors']> }
+  | { section: 'end'; data: null };
+
 /**
  * Evento de laboratorio enriquecido
  */
@@ -96,12 +132,70 @@ export interface LabEvent {
   order_provider_id?: string;
 }
 
+/**
+ * Página de /api/patients/{id}/labevents (paginación por keyset)
+ */
+export interface LabEventsPage {
+  labevents: LabEvent[];
+  count: number;
+  next_cursor: string | null;
+}
+
+/**
+ * Serie de un test reducida en el servidor (/api/patients/{id}/labevents/series)
+ */
+export interface LabSeries {
+  subject_id: number;
+  itemid: number;
+  hadm_id: number | null;
+  label?: string;
+  fluid?: string;
+  category?: string;
+  unit: string | null;
+  ref_range_lower: number | null;
+  ref_range_upper: number | null;
+  method: 'lttb' | 'minmax';
+  total_points: number;
+  count: number;
+  points: { charttime: string; valuenum: number; flag?: string }[];
+}
+
+/**
+ * Paciente en los resultados de /api/patients/search
+ */
+export interface CohortPatient {
+  subject_id: number;
+  gender: 'M' | 'F';
+  anchor_age: number;
+  anchor_year_group?: string;
+  admissions: number;
+  admission_types: string[];
+  icu: boolean;
+  icu_stays: number;
+}
+
+/**
+ * Página de /api/patients/search (total solo en la primera página)
+ */
+export interface CohortPage {
+  patients: CohortPatient[];
+  count: number;
+  total: number | null;
+  total_exact: boolean | null;
+  next_cursor: number | null;
+}
+
 /**
  * Respuesta de la API para listar pacientes
  */
 export interface PatientsListData {
   patients: Patient[];
   count: number;
+  // Total aproximado (metadatos de la colección)
+  total: number;
+  total_approximate: boolean;
+  // subject_id a pasar como cursor para la página siguiente
+  next_cursor: number | null;
 }
 
 /**
@@ -0,0 +1,31 @@
+"""
+Script para construir la colección admission_time_cube (app/utils/time_cube.py):
+recuentos de ingresos por hora x día de la semana x mes x día del mes x ingreso
+a medianoche (con --by-admission-type, también x admission_type). El heatmap de
+ingresos recorta este cubo en memoria en lugar de agregar hosp_admissions.
+Se construye en una colección auxiliar y sustituye a la anterior al terminar.
+
+BD: DEMO
+
+Uso:
+  python scripts/demo/build_admission_time_cube.py [--by-admission-type]
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# La construcción vive en el backend (BACKEND_PATH en el contenedor init-db)
+sys.path.insert(0, os.getenv("BACKEND_PATH", str(Path(__file__).resolve().parents[2] / "backend")))
+os.environ.setdefault("USE_DEMO", "true")
+os.environ.setdefault("MONGO_DEMO_URL", "mongodb://localhost:27017/")
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.utils.time_cube import main as time_cube_main
+
+    return time_cube_main(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
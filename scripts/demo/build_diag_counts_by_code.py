@@ -8,6 +8,7 @@ Uso:
   python scripts/demo/build_diag_counts_by_code.py
 """
 
+from datetime import datetime, timezone
 from time import perf_counter
 from pymongo import MongoClient
 
@@ -18,6 +19,15 @@ def get_database():
     return client["mimic_iv_demo"]
 
 
+def stamp_build_version(db, collection: str):
+    """Marca una nueva versión de `collection` en _build_versions (invalida las cachés del backend)."""
+    db["_build_versions"].update_one(
+        {"_id": collection},
+        {"$inc": {"version": 1}, "$set": {"built_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
 def build_counts(db):
     """Construye/actualiza diag_counts_by_code usando $out (idempotente)."""
     print("Reconstruyendo diag_counts_by_code con $out...")
@@ -32,6 +42,7 @@ def build_counts(db):
 
     start = perf_counter()
     db["hosp_diagnoses_icd"].aggregate(pipeline, allowDiskUse=True)
+    stamp_build_version(db, "diag_counts_by_code")
     elapsed = perf_counter() - start
     print(f"diag_counts_by_code actualizado en {elapsed:.1f}s")
 
@@ -0,0 +1,31 @@
+"""
+Script para construir la colección patient_search (app/utils/cohort.py): un
+documento por paciente con sexo, edad, tipos de ingreso, estancias en UCI,
+careunits y códigos ICD de diagnóstico, indexado para /api/patients/search.
+Se construye en una colección auxiliar y sustituye a la anterior al terminar.
+Ejecutar después de importar el dataset.
+
+BD: DEMO
+
+Uso:
+  python scripts/demo/build_patient_search.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# La construcción vive en el backend (BACKEND_PATH en el contenedor init-db)
+sys.path.insert(0, os.getenv("BACKEND_PATH", str(Path(__file__).resolve().parents[2] / "backend")))
+os.environ.setdefault("USE_DEMO", "true")
+os.environ.setdefault("MONGO_DEMO_URL", "mongodb://localhost:27017/")
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.utils.cohort import main as cohort_main
+
+    return cohort_main(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Script para precalcular las respuestas ya serializadas (JSON con orjson,
+gzip y brotli) de los endpoints que solo dependen de colecciones
+preagregadas: hospital-transfers-chord, medications-sunburst,
+diagnosis-icicle (min_count por defecto) y dashboard/stats.
+
+Se guardan en la colección _payloads junto a la versión de build de sus
+colecciones de origen; el backend las sirve directamente desde memoria.
+Ejecutar después de los scripts build_*/calculate_*.
+
+BD: DEMO
+
+Uso:
+  python scripts/demo/build_payloads.py
+"""
+
+import os
+import sys
+from pathlib import Path
+from time import perf_counter
+
+# Reutiliza las funciones de las rutas del backend (BACKEND_PATH en el contenedor init-db)
+sys.path.insert(0, os.getenv("BACKEND_PATH", str(Path(__file__).resolve().parents[2] / "backend")))
+os.environ.setdefault("USE_DEMO", "true")
+os.environ.setdefault("MONGO_DEMO_URL", "mongodb://localhost:27017/")
+
+
+def main():
+    print("=== Construyendo payloads precalculados (BD DEMO) ===")
+    import app.routes.dashboard  # noqa: F401 (registra dashboard/stats)
+    import app.routes.charts.router  # noqa: F401 (registra los charts)
+    from app.utils.mongo import get_db
+    from app.utils.payloads import build_static_payloads, payload_id, PAYLOADS_COLLECTION
+    from app.utils.response_cache import build_versions
+
+    start = perf_counter()
+    db = get_db()
+    built = build_static_payloads(db, build_versions(db), persist=True, reuse=False)
+    for (route, params), (_, payload) in built.items():
+        print(
+            f"{payload_id(route, params)}: {len(payload.body)} B json, "
+            f"{len(payload.gzip or b'')} B gzip, {len(payload.br or b'')} B br"
+        )
+    print(f"{len(built)} payloads guardados en {PAYLOADS_COLLECTION} en {perf_counter() - start:.1f}s")
+    print("=== Completado ===")
+
+
+if __name__ == "__main__":
+    main()
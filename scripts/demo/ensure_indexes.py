@@ -0,0 +1,32 @@
+"""
+Script para crear los índices del manifiesto (app/utils/indexes.py) que
+falten, construyendo varias colecciones en paralelo, e informar del tamaño
+de cada índice y del tiempo de construcción.
+Ejecutar justo después de importar el dataset.
+
+BD: DEMO
+
+Uso:
+  python scripts/demo/ensure_indexes.py            # crea los que falten
+  python scripts/demo/ensure_indexes.py verify     # solo comprueba (sale con 1 si falta alguno)
+  python scripts/demo/ensure_indexes.py --workers 8
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# El manifiesto vive en el backend (BACKEND_PATH en el contenedor init-db)
+sys.path.insert(0, os.getenv("BACKEND_PATH", str(Path(__file__).resolve().parents[2] / "backend")))
+os.environ.setdefault("USE_DEMO", "true")
+os.environ.setdefault("MONGO_DEMO_URL", "mongodb://localhost:27017/")
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.utils.indexes import main as indexes_main
+
+    return indexes_main(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,16 @@
 import os
+import sys
+from pathlib import Path
 import pandas as pd
 from pymongo import MongoClient
 from tqdm import tqdm
 
+# Mismas reglas de campos vacíos que el sanitizer y mismo marcado de versiones
+# que el backend (BACKEND_PATH en el contenedor init-db)
+sys.path.insert(0, os.getenv("BACKEND_PATH", str(Path(__file__).resolve().parents[2] / "backend")))
+from app.utils.response_cache import stamp_build_version  # noqa: E402
+from app.utils.sanitize import normalize_records  # noqa: E402
+
 # Conectar con MongoDB dentro del contenedor de Docker
 client = MongoClient("mongodb://localhost:27017/")
 db = client["mimic_iv_demo"]  # Nombre de la base de datos
@@ -20,7 +28,8 @@ def import_csv_to_mongo(folder_path, subfolder):
         if file.endswith(".csv"):
             collection_name = f"{subfolder}_{file.replace('.csv', '')}"
             df = pd.read_csv(os.path.join(full_path, file))
-            db[collection_name].insert_many(df.to_dict(orient="records"))
+            db[collection_name].insert_many(normalize_records(df.to_dict(orient="records")))
+            stamp_build_version(db, collection_name, normalized=True)
 
 # Importar las carpetas principales
 import_csv_to_mongo(dataset_path, "hosp")
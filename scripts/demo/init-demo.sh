@@ -21,34 +21,59 @@ cd /workspace
 
 # 1. Importar dataset demo
 echo ""
-echo "📥 [1/6] Importando dataset MIMIC-IV demo..."
+echo "📥 [1/11] Importando dataset MIMIC-IV demo..."
 python scripts/demo/import_mimic_demo.py
 
 # 2. Importar equivalencias ICD
 echo ""
-echo "📥 [2/6] Importando equivalencias ICD..."
+echo "📥 [2/11] Importando equivalencias ICD..."
 python scripts/demo/import_equivalencias.py
 
-# 3. Construir conteos de diagnósticos
+# 3. Crear índices del manifiesto (app/utils/indexes.py)
 echo ""
-echo "🔧 [3/6] Construyendo conteos de diagnósticos..."
+echo "🗂️  [3/11] Creando índices..."
+python scripts/demo/ensure_indexes.py
+
+# 4. Construir conteos de diagnósticos
+echo ""
+echo "🔧 [4/11] Construyendo conteos de diagnósticos..."
 python scripts/demo/build_diag_counts_by_code.py
 
-# 4. Construir conteos de prescripciones
+# 5. Construir conteos de prescripciones
 echo ""
-echo "🔧 [4/6] Construyendo conteos de prescripciones..."
+echo "🔧 [5/11] Construyendo conteos de prescripciones..."
 python scripts/demo/build_prescription_counts_by_route.py
 
-# 5. Construir aristas de transferencias
+# 6. Construir aristas de transferencias
 echo ""
-echo "🔧 [5/6] Construyendo aristas de transferencias..."
+echo "🔧 [6/11] Construyendo aristas de transferencias..."
 python scripts/demo/build_transfer_edges_chord.py
 
-# 6. Calcular estadísticas del dashboard
+# 7. Calcular estadísticas del dashboard
 echo ""
-echo "📊 [6/6] Calculando estadísticas del dashboard..."
+echo "📊 [7/11] Calculando estadísticas del dashboard..."
 python scripts/demo/calculate_categorized_dashboard_stats.py
 
+# 8. Precalcular respuestas serializadas de los endpoints estáticos
+echo ""
+echo "📦 [8/11] Precalculando payloads de charts y dashboard..."
+python scripts/demo/build_payloads.py
+
+# 9. Materializar la vista de paciente (patient_profiles)
+echo ""
+echo "🧑‍⚕️ [9/11] Construyendo perfiles de pacientes..."
+python scripts/demo/build_patient_profiles.py
+
+# 10. Atributos por paciente para la búsqueda de cohortes (patient_search)
+echo ""
+echo "🔎 [10/11] Construyendo atributos de búsqueda..."
+python scripts/demo/build_patient_search.py
+
+# 11. Cubo de recuentos del heatmap de ingresos (admission_time_cube)
+echo ""
+echo "🗓️  [11/11] Construyendo cubo de ingresos del heatmap..."
+python scripts/demo/build_admission_time_cube.py --by-admission-type
+
 echo ""
 echo "================================"
 echo "✅ Inicialización completada"
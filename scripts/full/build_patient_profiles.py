@@ -0,0 +1,36 @@
+"""
+Script para materializar la vista de paciente en la colección patient_profiles
+(app/utils/profiles.py): un documento por subject_id con el paciente, sus
+ingresos con un resumen de laboratorio por ingreso, y los diagnósticos y
+procedimientos con su descripción. /api/patients/{id} la sirve con un único
+find_one. Se construye por bloques de subject_id en paralelo y admite
+reconstrucciones parciales por rango.
+Ejecutar después de importar el dataset.
+
+BD: FULL
+
+Uso:
+  python scripts/full/build_patient_profiles.py                          # todos
+  python scripts/full/build_patient_profiles.py --stale                  # solo los desactualizados
+  python scripts/full/build_patient_profiles.py --from-subject 10000000 --to-subject 10999999
+  python scripts/full/build_patient_profiles.py --workers 8 --chunk-size 1000
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# La construcción vive en el backend (BACKEND_PATH en el contenedor init-db)
+sys.path.insert(0, os.getenv("BACKEND_PATH", str(Path(__file__).resolve().parents[2] / "backend")))
+os.environ.setdefault("USE_DEMO", "false")
+os.environ.setdefault("MONGO_FULL_URL", "mongodb://localhost:27018/")
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.utils.profiles import main as profiles_main
+
+    return profiles_main(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
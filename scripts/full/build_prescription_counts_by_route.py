@@ -9,6 +9,7 @@ Uso:
   python scripts/build_prescription_counts_by_route.py
 """
 
+from datetime import datetime, timezone
 from time import perf_counter
 from pymongo import MongoClient
 
@@ -19,6 +20,15 @@ def get_database():
     return client["mimic_iv_full"]
 
 
+def stamp_build_version(db, collection: str):
+    """Marca una nueva versión de `collection` en _build_versions (invalida las cachés del backend)."""
+    db["_build_versions"].update_one(
+        {"_id": collection},
+        {"$inc": {"version": 1}, "$set": {"built_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
 def build_counts(db):
     """Construye/actualiza prescription_counts_by_route de forma idempotente."""
     print("Construyendo prescription_counts_by_route con $out...")
@@ -43,6 +53,7 @@ def build_counts(db):
 
     start = perf_counter()
     db["hosp_prescriptions"].aggregate(pipeline, allowDiskUse=True)
+    stamp_build_version(db, "prescription_counts_by_route")
     elapsed = perf_counter() - start
     print(f"prescription_counts_by_route actualizado en {elapsed:.1f}s")
 
@@ -18,6 +18,7 @@ Uso:
   python scripts/build_transfer_edges_chord.py
 """
 
+from datetime import datetime, timezone
 from time import perf_counter
 from pymongo import MongoClient
 from pymongo.errors import OperationFailure
@@ -29,6 +30,15 @@ def get_database():
     return client["mimic_iv_full"]
 
 
+def stamp_build_version(db, collection: str):
+    """Marca una nueva versión de `collection` en _build_versions (invalida las cachés del backend)."""
+    db["_build_versions"].update_one(
+        {"_id": collection},
+        {"$inc": {"version": 1}, "$set": {"built_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+
 def build_edges(db):
     """Construye/actualiza transfer_edges_chord iterando por cursor (sin pipelines pesados)."""
     print("Construyendo transfer_edges_chord iterando por cursor...")
@@ -86,6 +96,7 @@ def build_edges(db):
 
     if docs:
         db["transfer_edges_chord"].insert_many(docs, ordered=False)
+    stamp_build_version(db, "transfer_edges_chord")
 
     elapsed = perf_counter() - start
     print(f"transfer_edges_chord creado con {len(docs)} aristas en {elapsed:.1f}s")
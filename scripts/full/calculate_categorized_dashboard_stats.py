@@ -10,6 +10,14 @@ def get_database():
     client = MongoClient("mongodb://localhost:27018/")
     return client["mimic_iv_full"]
 
+def stamp_build_version(db, collection: str):
+    """Marca una nueva versión de `collection` en _build_versions (invalida las cachés del backend)."""
+    db["_build_versions"].update_one(
+        {"_id": collection},
+        {"$inc": {"version": 1}, "$set": {"built_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
 def calculate_stats(db):
     """Calcular todas las estadísticas por categorías"""
     print("Calculando estadísticas categorizadas...")
@@ -106,6 +114,7 @@ def save_stats(db, stats):
         {"$set": document},
         upsert=True
     )
+    stamp_build_version(db, "dashboard_stats_categorized")
     print("Estadísticas categorizadas guardadas en dashboard_stats_categorized")
 
 def main():
@@ -0,0 +1,33 @@
+"""
+Script para crear los índices del manifiesto (app/utils/indexes.py) que
+falten, construyendo varias colecciones en paralelo, e informar del tamaño
+de cada índice y del tiempo de construcción.
+Lo ejecuta import_mimic_full.py al terminar; volver a lanzarlo tras
+import_equivalencias.py (solo construye los que falten).
+
+BD: FULL
+
+Uso:
+  python scripts/full/ensure_indexes.py            # crea los que falten
+  python scripts/full/ensure_indexes.py verify     # solo comprueba (sale con 1 si falta alguno)
+  python scripts/full/ensure_indexes.py --workers 8
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# El manifiesto vive en el backend (BACKEND_PATH en el contenedor init-db)
+sys.path.insert(0, os.getenv("BACKEND_PATH", str(Path(__file__).resolve().parents[2] / "backend")))
+os.environ.setdefault("USE_DEMO", "false")
+os.environ.setdefault("MONGO_FULL_URL", "mongodb://localhost:27018/")
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.utils.indexes import main as indexes_main
+
+    return indexes_main(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
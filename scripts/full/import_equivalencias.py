@@ -6,6 +6,7 @@ Uso:
 """
 
 import pandas as pd
+from datetime import datetime, timezone
 from pymongo import MongoClient
 
 # Conexión a la base de datos full
@@ -15,6 +16,14 @@ db = client["mimic_iv_full"]
 # Ruta del archivo CSV (relativa desde la raíz del proyecto)
 csv_path = "icd_con_equivalencia_ic10_extended.csv"
 
+def stamp_build_version(db, collection: str):
+    """Marca una nueva versión de `collection` en _build_versions (invalida las cachés del backend)."""
+    db["_build_versions"].update_one(
+        {"_id": collection},
+        {"$inc": {"version": 1}, "$set": {"built_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
 def importar_equivalencias():
     """Importa las equivalencias ICD a la base de datos full"""
     
@@ -37,6 +46,7 @@ def importar_equivalencias():
         
         # Insertar datos
         db["icd_equivalencias"].insert_many(records)
+        stamp_build_version(db, "icd_equivalencias")
         print(f"✅ Importadas {len(records)} equivalencias a BD completa")
         
         print("\n🎉 Importación completada exitosamente")
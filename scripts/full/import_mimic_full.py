@@ -1,8 +1,16 @@
 import os
+import sys
+from pathlib import Path
 import pandas as pd
 from pymongo import MongoClient
 from tqdm import tqdm
 
+# Mismas reglas de campos vacíos que el sanitizer y mismo marcado de versiones
+# que el backend (BACKEND_PATH en el contenedor init-db)
+sys.path.insert(0, os.getenv("BACKEND_PATH", str(Path(__file__).resolve().parents[2] / "backend")))
+from app.utils.response_cache import stamp_build_version  # noqa: E402
+from app.utils.sanitize import normalize_records  # noqa: E402
+
 # Conectar con MongoDB dentro del contenedor de Docker
 client = MongoClient("mongodb://localhost:27018/")
 db = client["mimic_iv_full"]  # Nombre de la base de datos
@@ -34,7 +42,7 @@ def import_csv_to_mongo(folder_path, subfolder):
                             unit="chunk"):
                 chunk_count += 1
                 # Insertar chunk en MongoDB
-                records = chunk.to_dict(orient="records")
+                records = normalize_records(chunk.to_dict(orient="records"))
                 db[collection_name].insert_many(records)
                 
                 # Información de progreso
@@ -44,6 +52,7 @@ def import_csv_to_mongo(folder_path, subfolder):
             print(f"❌ Error procesando {file}: {e}")
             continue
             
+        stamp_build_version(db, collection_name, normalized=True)
         print(f"✅ Completado: {file} - Total chunks procesados: {chunk_count}")
 
 # Importar las carpetas principales
@@ -51,3 +60,7 @@ import_csv_to_mongo(dataset_path, "hosp")
 import_csv_to_mongo(dataset_path, "icu")
 
 print("Importación completada en MongoDB.")
+
+# Crear los índices del manifiesto (app/utils/indexes.py) sobre lo importado
+from ensure_indexes import main as ensure_indexes
+ensure_indexes([])
@@ -0,0 +1,720 @@
+"""
+Generador de un dataset sintético con la forma de MIMIC-IV a partir del demo,
+para probar imports, preagregaciones y consultas a escala (10x-1000x) en local.
+
+Aprende del demo:
+- Filas por paciente y por ingreso (hadm) de cada tabla (se conservan las del
+  paciente/ingreso plantilla).
+- hosp_labevents: nº de muestras (specimen) por ingreso según la duración del
+  ingreso, paneles de itemids con sus frecuencias, valores por itemid,
+  desfase de la primera muestra respecto a admittime y huecos entre muestras.
+- hosp_transfers: probabilidades de transición entre (eventtype, careunit) y
+  duración por unidad; icu_icustays se deriva de los tramos en UCI generados.
+- hosp_diagnoses_icd / hosp_procedures_icd: frecuencias de (icd_code, icd_version).
+
+Cada paciente sintético parte de un paciente plantilla del demo desplazado un
+número entero de días; el resto de tablas se copian de la plantilla reescribiendo
+subject_id, hadm_id, stay_id y los identificadores propios (pharmacy_id,
+emar_id, poe_id, orderid...) para que sigan siendo únicos y coherentes entre sí.
+Los diccionarios (d_*, provider, caregiver) se copian tal cual.
+
+La salida tiene la misma estructura que el demo (hosp/*.csv.gz, icu/*.csv.gz y
+demo_subject_id.csv), así que se importa con los mismos scripts. Con la misma
+semilla y el mismo factor de escala el resultado es idéntico.
+
+Uso:
+  python scripts/synthetic/generate_synthetic_mimic.py --scale 10 --seed 42
+  python scripts/synthetic/generate_synthetic_mimic.py --scale 1000 --out data/synthetic-x1000
+"""
+
+import argparse
+import gzip
+import os
+import shutil
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEMO_PATH = REPO_ROOT / "data" / "mimic-iv-clinical-database-demo-2.2"
+
+# Rangos de ids nuevos (fuera de los rangos reales de MIMIC-IV)
+SUBJECT_ID_BASE = 20_000_000
+HADM_ID_BASE = 30_000_000
+STAY_ID_BASE = 40_000_000
+
+# Tablas diccionario: se copian sin cambios
+DICTIONARY_TABLES = {
+    "hosp": ["d_hcpcs", "d_icd_diagnoses", "d_icd_procedures", "d_labitems", "provider"],
+    "icu": ["caregiver", "d_items"],
+}
+# Tablas generadas por modelo (el resto se copian de la plantilla)
+MODELLED_TABLES = {
+    "hosp/patients", "hosp/admissions", "hosp/transfers", "hosp/labevents",
+    "hosp/diagnoses_icd", "hosp/procedures_icd", "icu/icustays",
+}
+# Tablas sin hadm_id que cuelgan de otra tabla por una clave de texto
+CHILD_TABLES = {"hosp/emar_detail": ("hosp/emar", "emar_id"), "hosp/poe_detail": ("hosp/poe", "poe_id")}
+# Ids numéricos propios de cada fila: se desplazan por copia (id + k * stride)
+OFFSET_ID_COLUMNS = [
+    "labevent_id", "specimen_id", "transfer_id", "pharmacy_id", "micro_specimen_id",
+    "microevent_id", "orderid", "linkorderid",
+]
+# Ids de texto "<subject_id>-<seq>"
+SUBJECT_SEQ_ID_COLUMNS = ["emar_id", "poe_id", "discontinue_of_poe_id", "discontinued_by_poe_id"]
+# Columnas de fecha que no siguen el patrón *time/*date
+EXTRA_DATETIME_COLUMNS = {"icu/datetimeevents": ["value"], "hosp/patients": ["dod"]}
+
+ICU_CAREUNIT_KEYWORDS = ("ICU", "Intensive Care")
+LAB_VALUE_COLUMNS = [
+    "order_provider_id", "value", "valuenum", "valueuom", "ref_range_lower",
+    "ref_range_upper", "flag", "priority", "comments",
+]
+LOS_BUCKETS = 5
+MAX_TRANSFERS_PER_HADM = 30
+SECONDS_PER_DAY = 86400
+# Compresión rápida: a escala 1000x escribir el gzip domina el tiempo total
+GZIP_LEVEL = 4
+
+
+def _is_datetime_column(table: str, column: str) -> bool:
+    return column.endswith(("time", "date")) or column in EXTRA_DATETIME_COLUMNS.get(table, [])
+
+
+def _is_icu_unit(careunit: str) -> bool:
+    return any(k in careunit for k in ICU_CAREUNIT_KEYWORDS)
+
+
+def _stride(max_value: int) -> int:
+    """Potencia de 10 mayor que el id máximo: los ids desplazados siguen siendo legibles."""
+    return 10 ** len(str(max(int(max_value), 1)))
+
+
+def _format_datetimes(values: np.ndarray, date_only: bool) -> np.ndarray:
+    text = np.datetime_as_string(values, unit="D" if date_only else "s")
+    text = np.char.replace(text, "T", " ")
+    return np.where(np.isnat(values), "", text)
+
+
+def _group_rows(rows: np.ndarray, keys: np.ndarray) -> dict[int, np.ndarray]:
+    """Agrupa los índices de fila `rows` por el valor de `keys` en esas filas."""
+    if not len(rows):
+        return {}
+    return {int(k): rows[pos] for k, pos in pd.Series(keys[rows]).groupby(keys[rows]).indices.items()}
+
+
+def _segment_positions(counts: np.ndarray) -> np.ndarray:
+    """Posición (0..n-1) de cada fila dentro de su segmento, dados los tamaños de segmento."""
+    total = int(counts.sum())
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(total) - starts
+
+
+class Table:
+    """Tabla del demo leída como texto, con fechas e ids ya parseados para copiar filas rápido."""
+
+    def __init__(self, name: str, df: pd.DataFrame):
+        self.name = name
+        self.df = df
+        self.columns = list(df.columns)
+        self.datetimes: dict[str, tuple[np.ndarray, bool]] = {}
+        self.ints: dict[str, np.ndarray] = {}
+        self.seq_ids: dict[str, np.ndarray] = {}
+
+        for column in self.columns:
+            values = df[column]
+            if _is_datetime_column(name, column):
+                parsed = pd.to_datetime(values.replace("", None), errors="coerce").to_numpy("datetime64[s]")
+                date_only = bool((values.str.len().isin([0, 10])).all())
+                self.datetimes[column] = (parsed, date_only)
+            elif column in OFFSET_ID_COLUMNS or column in ("subject_id", "hadm_id", "stay_id"):
+                self.ints[column] = pd.to_numeric(values.replace("", None)).fillna(-1).to_numpy("int64")
+            elif column in SUBJECT_SEQ_ID_COLUMNS:
+                seq = values.str.rsplit("-", n=1).str[-1]
+                self.seq_ids[column] = pd.to_numeric(seq.replace("", None)).fillna(-1).to_numpy("int64")
+
+    def __len__(self):
+        return len(self.df)
+
+    def group_rows(self, column: str) -> dict[int, np.ndarray]:
+        """Índices de fila por valor de `column` (ignorando vacíos)."""
+        keys = self.ints[column]
+        return _group_rows(np.flatnonzero(keys >= 0), keys)
+
+
+class DemoModel:
+    """Distribuciones aprendidas del demo y plantillas por paciente/ingreso/estancia."""
+
+    def __init__(self, source: Path):
+        self.source = source
+        self.tables: dict[str, Table] = {}
+        for module in ("hosp", "icu"):
+            for file in sorted(os.listdir(source / module)):
+                if not file.endswith(".csv.gz"):
+                    continue
+                table = file.split(".csv")[0]
+                if table in DICTIONARY_TABLES.get(module, []):
+                    continue
+                name = f"{module}/{table}"
+                df = pd.read_csv(source / module / file, dtype=str, keep_default_na=False)
+                self.tables[name] = Table(name, df)
+
+        self.copied_tables = [n for n in self.tables if n not in MODELLED_TABLES]
+        self._fit_ids()
+        self._fit_templates()
+        self._fit_labevents()
+        self._fit_transfers()
+        self._fit_icd()
+
+    # ------------------------------------------------------------------ ids
+    def _fit_ids(self):
+        self.strides = {}
+        for column in OFFSET_ID_COLUMNS:
+            maxima = [t.ints[column].max() for t in self.tables.values() if column in t.ints and len(t)]
+            self.strides[column] = _stride(max(maxima)) if maxima else 1
+        seq_maxima = [s.max() for t in self.tables.values() for s in t.seq_ids.values() if len(t)]
+        self.seq_stride = _stride(max(seq_maxima)) if seq_maxima else 1
+
+    # ------------------------------------------------------------ plantillas
+    def _fit_templates(self):
+        patients = self.tables["hosp/patients"]
+        admissions = self.tables["hosp/admissions"]
+        self.subjects = patients.ints["subject_id"]
+        self.admissions_by_subject = admissions.group_rows("subject_id")
+
+        # Filas a copiar: por hadm_id o, si no tienen, por subject_id
+        self.rows_by_hadm: dict[str, dict[int, np.ndarray]] = {}
+        self.rows_by_subject: dict[str, dict[int, np.ndarray]] = {}
+        self.rows_by_stay: dict[str, dict[int, np.ndarray]] = {}
+        for name in self.copied_tables:
+            table = self.tables[name]
+            if name in CHILD_TABLES:
+                self._fit_child_table(name)
+            elif "stay_id" in table.ints:
+                self.rows_by_stay[name] = table.group_rows("stay_id")
+            elif "hadm_id" in table.ints:
+                self.rows_by_hadm[name] = table.group_rows("hadm_id")
+                without = np.flatnonzero(table.ints["hadm_id"] < 0)
+                self.rows_by_subject[name] = _group_rows(without, table.ints["subject_id"])
+            else:
+                self.rows_by_subject[name] = table.group_rows("subject_id")
+
+        # Labs y transfers sin ingreso (urgencias, extracciones ambulatorias) se copian por paciente
+        for name in ("hosp/labevents", "hosp/transfers"):
+            table = self.tables[name]
+            without = np.flatnonzero(table.ints["hadm_id"] < 0)
+            self.rows_by_subject[name] = _group_rows(without, table.ints["subject_id"])
+
+        # Estancias UCI plantilla por unidad, para copiar los eventos icu_* de una estancia parecida
+        icustays = self.tables["icu/icustays"]
+        self.stays_by_unit: dict[str, np.ndarray] = {}
+        units = icustays.df["first_careunit"].to_numpy()
+        for unit in np.unique(units):
+            self.stays_by_unit[unit] = np.flatnonzero(units == unit)
+        self.stay_ids = icustays.ints["stay_id"]
+        self.stay_intimes = icustays.datetimes["intime"][0]
+
+    def _fit_child_table(self, name: str):
+        """emar_detail/poe_detail: se agrupan por el hadm_id de su fila padre."""
+        parent_name, key = CHILD_TABLES[name]
+        parent = self.tables[parent_name].df
+        hadm_by_key = dict(zip(parent[key], parent["hadm_id"]))
+        child = self.tables[name]
+        hadm = pd.to_numeric(child.df[key].map(hadm_by_key).replace("", None)).fillna(-1).to_numpy("int64")
+        child.ints["hadm_id"] = hadm
+        self.rows_by_hadm[name] = _group_rows(np.flatnonzero(hadm >= 0), hadm)
+        self.rows_by_subject[name] = _group_rows(np.flatnonzero(hadm < 0), child.ints["subject_id"])
+
+    # ------------------------------------------------------------ labevents
+    def _fit_labevents(self):
+        labs = self.tables["hosp/labevents"]
+        admissions = self.tables["hosp/admissions"]
+        df = labs.df
+        hadm = labs.ints["hadm_id"]
+        charttime = labs.datetimes["charttime"][0]
+        storetime = labs.datetimes["storetime"][0]
+
+        # Pool de valores por itemid (se muestrean filas reales del mismo itemid)
+        itemids = df["itemid"].to_numpy()
+        self.lab_rows_by_item = pd.Series(itemids).groupby(itemids).indices
+        self.lab_store_delay = np.where(np.isnat(storetime), np.timedelta64(-1, "s"), storetime - charttime)
+
+        # Paneles: itemids pedidos juntos en una misma muestra (specimen_id)
+        with_hadm = np.flatnonzero(hadm >= 0)
+        specimens = df.iloc[with_hadm].groupby("specimen_id", sort=False)
+        panels = specimens["itemid"].agg(lambda s: tuple(sorted(s)))
+        panel_counts = panels.value_counts()
+        self.panel_items = [np.array(p, dtype=object) for p in panel_counts.index]
+        self.panel_probs = (panel_counts / panel_counts.sum()).to_numpy()
+        self.itemid_frequencies = pd.Series(itemids[with_hadm]).value_counts(normalize=True)
+
+        # Tiempos por ingreso: desfase de la primera muestra y huecos entre muestras
+        spec = pd.DataFrame({
+            "hadm_id": hadm[with_hadm],
+            "specimen_id": df["specimen_id"].to_numpy()[with_hadm],
+            "charttime": charttime[with_hadm],
+        }).drop_duplicates("specimen_id").sort_values(["hadm_id", "charttime"])
+        admittime = pd.Series(admissions.datetimes["admittime"][0], index=admissions.ints["hadm_id"])
+        dischtime = pd.Series(admissions.datetimes["dischtime"][0], index=admissions.ints["hadm_id"])
+        first = spec.groupby("hadm_id")["charttime"].first()
+        self.lab_first_offsets = (first - admittime.reindex(first.index)).dt.total_seconds().dropna().to_numpy()
+        gaps = spec.groupby("hadm_id")["charttime"].diff().dt.total_seconds().dropna()
+        self.lab_gaps = gaps.to_numpy()
+
+        # Nº de muestras por ingreso, condicionado a la duración del ingreso
+        los_seconds = (dischtime - admittime).dt.total_seconds()
+        counts = spec.groupby("hadm_id").size().reindex(los_seconds.index, fill_value=0)
+        self.los_edges = np.unique(np.quantile(los_seconds.to_numpy(), np.linspace(0, 1, LOS_BUCKETS + 1)[1:-1]))
+        buckets = np.searchsorted(self.los_edges, los_seconds.to_numpy())
+        self.specimens_by_los_bucket = [counts.to_numpy()[buckets == b] for b in range(len(self.los_edges) + 1)]
+
+    # ------------------------------------------------------------ transfers
+    def _fit_transfers(self):
+        transfers = self.tables["hosp/transfers"]
+        df = transfers.df.assign(
+            _hadm=transfers.ints["hadm_id"],
+            _intime=transfers.datetimes["intime"][0],
+            _outtime=transfers.datetimes["outtime"][0],
+        )
+        df = df[df["_hadm"] >= 0].sort_values(["_hadm", "_intime"])
+
+        # Estados (eventtype, careunit) y matriz de transición con estado final END
+        states = list(zip(df["eventtype"], df["careunit"]))
+        self.states = sorted(set(states))
+        index = {s: i for i, s in enumerate(self.states)}
+        end = len(self.states)
+        counts = np.zeros((len(self.states), len(self.states) + 1))
+        starts = np.zeros(len(self.states))
+        for _, group in df.groupby("_hadm", sort=False):
+            seq = [index[s] for s in zip(group["eventtype"], group["careunit"])]
+            starts[seq[0]] += 1
+            for a, b in zip(seq, seq[1:] + [end]):
+                counts[a, b] += 1
+        self.start_probs = starts / starts.sum()
+        self.transition_probs = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+        self.end_state = end
+
+        # Duraciones por estado (segundos); se reescalan después a la duración del ingreso
+        durations = (df["_outtime"] - df["_intime"]).dt.total_seconds()
+        self.state_durations = {}
+        for state, values in durations.groupby([df["eventtype"], df["careunit"]]):
+            values = values.dropna().to_numpy()
+            self.state_durations[index[state]] = values[values > 0]
+
+    # ------------------------------------------------------------------ ICD
+    def _fit_icd(self):
+        self.icd = {}
+        for name in ("hosp/diagnoses_icd", "hosp/procedures_icd"):
+            table = self.tables[name]
+            df = table.df
+            freq = df.groupby(["icd_version", "icd_code"]).size()
+            pools = {}
+            for version, codes in freq.groupby(level=0):
+                pools[version] = (codes.index.get_level_values(1).to_numpy(), (codes / codes.sum()).to_numpy())
+            # Versión dominante y nº de filas por ingreso plantilla
+            per_hadm = df.assign(_hadm=table.ints["hadm_id"]).groupby("_hadm")
+            version = per_hadm["icd_version"].agg(lambda s: s.mode().iloc[0])
+            self.icd[name] = {
+                "pools": pools,
+                "count": per_hadm.size().to_dict(),
+                "version": version.to_dict(),
+                "rows": self.tables[name].group_rows("hadm_id"),
+            }
+
+
+class ChunkBuilder:
+    """Acumula lo que hay que generar para un bloque de pacientes y lo materializa tabla a tabla."""
+
+    def __init__(self, model: DemoModel, rng: np.random.Generator):
+        self.model = model
+        self.rng = rng
+        # tabla -> listas paralelas (índices de fila, subject, hadm, desplazamiento, k)
+        self.copies: dict[str, list[list]] = {}
+        self.patients = []
+        self.admissions = []
+        self.modelled_hadms = []  # (hadm plantilla, hadm nuevo, subject nuevo, shift, k, admittime, dischtime)
+        self.stays = []
+        self.icu_copies = []
+
+    def add_copy(self, table: str, rows: np.ndarray, subject: int, hadm: int, shift: np.timedelta64, k: int,
+                 stay: int = -1):
+        if rows is None or not len(rows):
+            return
+        self.copies.setdefault(table, [[] for _ in range(6)])
+        lists = self.copies[table]
+        for target, value in zip(lists, (rows, subject, hadm, shift, k, stay)):
+            target.append(value)
+
+    def build_copies(self, name: str) -> pd.DataFrame | None:
+        if name not in self.copies:
+            return None
+        model = self.model
+        table = model.tables[name]
+        rows, subjects, hadms, shifts, ks, stays = self.copies[name]
+        counts = np.array([len(r) for r in rows])
+        idx = np.concatenate(rows)
+        out = table.df.iloc[idx].reset_index(drop=True)
+
+        subject = np.repeat(np.array(subjects, dtype="int64"), counts)
+        hadm = np.repeat(np.array(hadms, dtype="int64"), counts)
+        shift = np.repeat(np.array(shifts, dtype="timedelta64[s]"), counts)
+        k = np.repeat(np.array(ks, dtype="int64"), counts)
+        stay = np.repeat(np.array(stays, dtype="int64"), counts)
+
+        out["subject_id"] = subject.astype(str)
+        if "hadm_id" in out.columns:
+            out["hadm_id"] = np.where(table.ints["hadm_id"][idx] >= 0, hadm.astype(str), "")
+        if "stay_id" in out.columns:
+            out["stay_id"] = stay.astype(str)
+        for column, (values, date_only) in table.datetimes.items():
+            out[column] = _format_datetimes(values[idx] + shift, date_only)
+        for column in OFFSET_ID_COLUMNS:
+            if column in table.ints:
+                original = table.ints[column][idx]
+                out[column] = np.where(original >= 0, (original + k * model.strides[column]).astype(str), "")
+        for column, seq in table.seq_ids.items():
+            original = seq[idx]
+            new_ids = np.char.add(np.char.add(subject.astype(str), "-"), (original + k * model.seq_stride).astype(str))
+            out[column] = np.where(original >= 0, new_ids, "")
+        return out
+
+    def build_labevents(self) -> pd.DataFrame:
+        """Labs por ingreso: nº de muestras según la duración, paneles e itemids con sus frecuencias."""
+        model, rng = self.model, self.rng
+        if not self.modelled_hadms:
+            return pd.DataFrame(columns=model.tables["hosp/labevents"].columns)
+        hadm_info = np.array([(h[1], h[2], h[4]) for h in self.modelled_hadms], dtype="int64")
+        admit = np.array([h[5] for h in self.modelled_hadms], dtype="datetime64[s]")
+        disch = np.array([h[6] for h in self.modelled_hadms], dtype="datetime64[s]")
+        los = (disch - admit).astype("int64")
+
+        buckets = np.searchsorted(model.los_edges, los)
+        n_specimens = np.array([rng.choice(model.specimens_by_los_bucket[b]) for b in buckets], dtype="int64")
+        total_specimens = int(n_specimens.sum())
+        if total_specimens == 0:
+            return pd.DataFrame(columns=model.tables["hosp/labevents"].columns)
+
+        # Tiempos: desfase inicial + huecos acumulados, reescalados si se salen del ingreso
+        spec_hadm = np.repeat(np.arange(len(hadm_info)), n_specimens)
+        position = _segment_positions(n_specimens)
+        segment_start = np.repeat(np.cumsum(n_specimens) - n_specimens, n_specimens)
+        segment_end = segment_start + n_specimens[spec_hadm] - 1
+        offsets = rng.choice(model.lab_first_offsets, size=total_specimens)
+        gaps = np.where(position == 0, 0, rng.choice(model.lab_gaps, size=total_specimens))
+        cum = np.cumsum(gaps)
+        cum = cum - (cum - gaps)[segment_start]
+        first_offset = offsets[segment_start]
+        span = np.maximum(los[spec_hadm] - np.maximum(first_offset, 0), 1)
+        last = cum[segment_end]
+        scale = np.where(last > span, span / np.maximum(last, 1), 1.0)
+        chart_seconds = first_offset + (cum * scale).astype("int64")
+        spec_charttime = admit[spec_hadm] + chart_seconds.astype("timedelta64[s]")
+
+        # Paneles de cada muestra y expansión a una fila por itemid
+        panel_ids = rng.choice(len(model.panel_items), size=total_specimens, p=model.panel_probs)
+        panel_sizes = np.array([len(model.panel_items[p]) for p in panel_ids], dtype="int64")
+        itemids = np.concatenate([model.panel_items[p] for p in panel_ids])
+        row_spec = np.repeat(np.arange(total_specimens), panel_sizes)
+        row_hadm = spec_hadm[row_spec]
+
+        # Valores: una fila real del demo con el mismo itemid
+        source = np.empty(len(itemids), dtype="int64")
+        for itemid in np.unique(itemids):
+            mask = itemids == itemid
+            source[mask] = rng.choice(model.lab_rows_by_item[itemid], size=int(mask.sum()))
+
+        labs = model.tables["hosp/labevents"]
+        out = labs.df.iloc[source][LAB_VALUE_COLUMNS].reset_index(drop=True)
+        local = _segment_positions(np.bincount(row_hadm, minlength=len(hadm_info)))
+        spec_local = position[row_spec]
+        k = hadm_info[row_hadm, 2]
+        charttime = spec_charttime[row_spec]
+        delay = model.lab_store_delay[source]
+        storetime = np.where(delay >= np.timedelta64(0, "s"), charttime + delay, np.datetime64("NaT"))
+
+        out["labevent_id"] = (local + 1 + k * model.strides["labevent_id"]).astype(str)
+        out["subject_id"] = hadm_info[row_hadm, 1].astype(str)
+        out["hadm_id"] = hadm_info[row_hadm, 0].astype(str)
+        out["specimen_id"] = (spec_local + 1 + k * model.strides["specimen_id"]).astype(str)
+        out["itemid"] = itemids
+        out["charttime"] = _format_datetimes(charttime, False)
+        out["storetime"] = _format_datetimes(storetime, False)
+        return out[labs.columns]
+
+    def build_icd(self, name: str) -> pd.DataFrame:
+        """Diagnósticos/procedimientos: mismo nº de filas que el ingreso plantilla, códigos por frecuencia."""
+        model, rng = self.model, self.rng
+        info = model.icd[name]
+        table = model.tables[name]
+        parts = []
+        for template, hadm, subject, shift, k, _, _ in self.modelled_hadms:
+            n = info["count"].get(template, 0)
+            if not n:
+                continue
+            rows = table.df.iloc[info["rows"][template]].reset_index(drop=True)
+            codes, probs = info["pools"][info["version"][template]]
+            rows["icd_code"] = rng.choice(codes, size=n, p=probs)
+            rows["icd_version"] = info["version"][template]
+            rows["subject_id"] = str(subject)
+            rows["hadm_id"] = str(hadm)
+            if "chartdate" in table.datetimes:
+                values, date_only = table.datetimes["chartdate"]
+                rows["chartdate"] = _format_datetimes(values[info["rows"][template]] + shift, date_only)
+            parts.append(rows)
+        return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=table.columns)
+
+
+class SyntheticGenerator:
+    def __init__(self, model: DemoModel, scale: int, seed: int, out: Path, chunk_subjects: int):
+        self.model = model
+        self.n_subjects = len(model.subjects) * scale
+        self.seed = seed
+        self.out = out
+        self.chunk_subjects = chunk_subjects
+        self.next_hadm = HADM_ID_BASE
+        self.next_stay = STAY_ID_BASE
+        self.hadm_index = 0
+        self.stay_index = 0
+        self.written: set[str] = set()
+
+    def _write(self, name: str, df: pd.DataFrame | None):
+        if df is None:
+            return
+        path = self.out / f"{name}.csv.gz"
+        first = name not in self.written
+        # mtime=0: mismo fichero byte a byte con la misma semilla
+        with open(path, "wb" if first else "ab") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL, mtime=0) as f:
+            f.write(df.to_csv(index=False, header=first).encode())
+        self.written.add(name)
+
+    def _transfer_sequence(self, rng: np.random.Generator) -> list[int]:
+        model = self.model
+        state = rng.choice(len(model.states), p=model.start_probs)
+        seq = [state]
+        while len(seq) < MAX_TRANSFERS_PER_HADM:
+            state = rng.choice(model.end_state + 1, p=model.transition_probs[state])
+            if state == model.end_state:
+                break
+            seq.append(state)
+            if model.states[state][0] == "discharge":
+                break
+        if model.states[seq[-1]][0] != "discharge":
+            seq.append(model.states.index(("discharge", "")) if ("discharge", "") in model.states else seq[-1])
+        return seq
+
+    def _add_transfers(self, builder: ChunkBuilder, rng, subject, hadm, k, admit, disch, rows: list):
+        """Genera la cadena de traslados del ingreso y deriva las estancias UCI."""
+        model = self.model
+        seq = self._transfer_sequence(rng)
+        durations = np.array([
+            rng.choice(model.state_durations[s]) if len(model.state_durations.get(s, [])) else 3600
+            for s in seq
+        ], dtype="float64")
+
+        is_ed = np.array([model.states[s][0] == "ED" for s in seq])
+        is_discharge = np.array([model.states[s][0] == "discharge" for s in seq])
+        # Urgencias antes de admittime; el resto se reescala para cubrir el ingreso
+        inpatient = ~is_ed & ~is_discharge
+        los = max(float((disch - admit).astype("int64")), 1.0)
+        if inpatient.any():
+            durations[inpatient] *= los / durations[inpatient].sum()
+
+        intimes, outtimes = [], []
+        cursor = admit - np.timedelta64(int(durations[is_ed].sum()), "s")
+        for state, duration, ed, discharge in zip(seq, durations, is_ed, is_discharge):
+            if discharge:
+                intimes.append(disch)
+                outtimes.append(np.datetime64("NaT"))
+                continue
+            end = cursor + np.timedelta64(int(duration), "s")
+            if not ed and end > disch:
+                end = disch
+            intimes.append(cursor)
+            outtimes.append(end)
+            cursor = end
+
+        stride = model.strides["transfer_id"]
+        for local, (state, intime, outtime) in enumerate(zip(seq, intimes, outtimes)):
+            eventtype, careunit = model.states[state]
+            rows.append((subject, hadm, local + 1 + k * stride, eventtype, careunit, intime, outtime))
+
+        # Estancias UCI: tramos consecutivos en unidades de UCI
+        i = 0
+        while i < len(seq):
+            careunit = model.states[seq[i]][1]
+            if is_discharge[i] or not _is_icu_unit(careunit):
+                i += 1
+                continue
+            j = i
+            while j + 1 < len(seq) and not is_discharge[j + 1] and _is_icu_unit(model.states[seq[j + 1]][1]):
+                j += 1
+            self._add_icustay(builder, rng, subject, hadm, careunit, model.states[seq[j]][1], intimes[i], outtimes[j])
+            i = j + 1
+
+    def _add_icustay(self, builder: ChunkBuilder, rng, subject, hadm, first_unit, last_unit, intime, outtime):
+        model = self.model
+        stay = self.next_stay
+        self.next_stay += 1
+        los_days = float((outtime - intime).astype("int64")) / SECONDS_PER_DAY
+        builder.stays.append((subject, hadm, stay, first_unit, last_unit, intime, outtime, los_days))
+
+        # Eventos icu_* copiados de una estancia plantilla de la misma unidad
+        candidates = model.stays_by_unit.get(first_unit)
+        if candidates is None or not len(candidates):
+            candidates = np.arange(len(model.stay_ids))
+        template = int(rng.choice(candidates))
+        template_stay = int(model.stay_ids[template])
+        shift = (intime - model.stay_intimes[template]).astype("timedelta64[s]")
+        for name, by_stay in model.rows_by_stay.items():
+            builder.add_copy(name, by_stay.get(template_stay), subject, hadm, shift, self.stay_index, stay)
+        self.stay_index += 1
+
+    def _add_subject(self, builder: ChunkBuilder, rng, subject_index: int, transfer_rows: list):
+        model = self.model
+        template_row = int(rng.integers(len(model.subjects)))
+        template = int(model.subjects[template_row])
+        subject = SUBJECT_ID_BASE + subject_index
+        days = int(rng.integers(-5 * 365, 5 * 365 + 1))
+        shift = np.timedelta64(days * SECONDS_PER_DAY, "s")
+
+        builder.patients.append((template_row, subject, days))
+        for name, by_subject in model.rows_by_subject.items():
+            builder.add_copy(name, by_subject.get(template), subject, -1, shift, 2 * subject_index + 1)
+
+        admissions = model.tables["hosp/admissions"]
+        for row in model.admissions_by_subject.get(template, []):
+            hadm = self.next_hadm
+            self.next_hadm += 1
+            k = 2 * self.hadm_index
+            self.hadm_index += 1
+            template_hadm = int(admissions.ints["hadm_id"][row])
+            admit = admissions.datetimes["admittime"][0][row] + shift
+            disch = admissions.datetimes["dischtime"][0][row] + shift
+            builder.admissions.append((int(row), subject, hadm, shift))
+            builder.modelled_hadms.append((template_hadm, hadm, subject, shift, k, admit, disch))
+            for name, by_hadm in model.rows_by_hadm.items():
+                builder.add_copy(name, by_hadm.get(template_hadm), subject, hadm, shift, k)
+            self._add_transfers(builder, rng, subject, hadm, k, admit, disch, transfer_rows)
+
+    def _build_patients(self, builder: ChunkBuilder) -> pd.DataFrame:
+        table = self.model.tables["hosp/patients"]
+        rows = np.array([p[0] for p in builder.patients])
+        days = np.array([p[2] for p in builder.patients])
+        out = table.df.iloc[rows].reset_index(drop=True)
+        out["subject_id"] = np.array([p[1] for p in builder.patients]).astype(str)
+        # El año ancla se mueve con el desplazamiento para que anchor_age siga cuadrando
+        out["anchor_year"] = (pd.to_numeric(out["anchor_year"]) + np.round(days / 365.25).astype(int)).astype(str)
+        dod, date_only = table.datetimes["dod"]
+        out["dod"] = _format_datetimes(dod[rows] + (days * SECONDS_PER_DAY).astype("timedelta64[s]"), date_only)
+        return out
+
+    def _build_admissions(self, builder: ChunkBuilder) -> pd.DataFrame:
+        table = self.model.tables["hosp/admissions"]
+        rows = np.array([a[0] for a in builder.admissions], dtype="int64")
+        shifts = np.array([a[3] for a in builder.admissions], dtype="timedelta64[s]")
+        out = table.df.iloc[rows].reset_index(drop=True)
+        out["subject_id"] = np.array([a[1] for a in builder.admissions]).astype(str)
+        out["hadm_id"] = np.array([a[2] for a in builder.admissions]).astype(str)
+        for column, (values, date_only) in table.datetimes.items():
+            out[column] = _format_datetimes(values[rows] + shifts, date_only)
+        return out
+
+    def _build_transfers(self, rows: list) -> pd.DataFrame:
+        subject, hadm, transfer_id, eventtype, careunit, intime, outtime = zip(*rows)
+        return pd.DataFrame({
+            "subject_id": np.array(subject).astype(str),
+            "hadm_id": np.array(hadm).astype(str),
+            "transfer_id": np.array(transfer_id, dtype="int64").astype(str),
+            "eventtype": eventtype,
+            "careunit": careunit,
+            "intime": _format_datetimes(np.array(intime, dtype="datetime64[s]"), False),
+            "outtime": _format_datetimes(np.array(outtime, dtype="datetime64[s]"), False),
+        })
+
+    def _build_icustays(self, builder: ChunkBuilder) -> pd.DataFrame:
+        columns = self.model.tables["icu/icustays"].columns
+        if not builder.stays:
+            return pd.DataFrame(columns=columns)
+        subject, hadm, stay, first_unit, last_unit, intime, outtime, los = zip(*builder.stays)
+        return pd.DataFrame({
+            "subject_id": np.array(subject).astype(str),
+            "hadm_id": np.array(hadm).astype(str),
+            "stay_id": np.array(stay).astype(str),
+            "first_careunit": first_unit,
+            "last_careunit": last_unit,
+            "intime": _format_datetimes(np.array(intime, dtype="datetime64[s]"), False),
+            "outtime": _format_datetimes(np.array(outtime, dtype="datetime64[s]"), False),
+            "los": np.round(np.array(los), 6).astype(str),
+        })[columns]
+
+    def run(self):
+        model = self.model
+        for module in ("hosp", "icu"):
+            (self.out / module).mkdir(parents=True, exist_ok=True)
+            for table in DICTIONARY_TABLES[module]:
+                src = model.source / module / f"{table}.csv.gz"
+                if src.exists():
+                    shutil.copyfile(src, self.out / module / f"{table}.csv.gz")
+
+        # Una semilla por bloque: el resultado no depende del orden de generación de cada tabla
+        seeds = np.random.SeedSequence(self.seed).spawn((self.n_subjects + self.chunk_subjects - 1) // self.chunk_subjects)
+        for chunk, chunk_seed in enumerate(seeds):
+            start = perf_counter()
+            rng = np.random.default_rng(chunk_seed)
+            builder = ChunkBuilder(model, rng)
+            transfer_rows: list = []
+            first = chunk * self.chunk_subjects
+            last = min(first + self.chunk_subjects, self.n_subjects)
+            for subject_index in range(first, last):
+                self._add_subject(builder, rng, subject_index, transfer_rows)
+
+            self._write("hosp/patients", self._build_patients(builder))
+            self._write("hosp/admissions", self._build_admissions(builder))
+            transfers = self._build_transfers(transfer_rows)
+            copied_transfers = builder.build_copies("hosp/transfers")
+            self._write("hosp/transfers", pd.concat([transfers, copied_transfers], ignore_index=True)[
+                model.tables["hosp/transfers"].columns
+            ] if copied_transfers is not None else transfers)
+            labs = builder.build_labevents()
+            copied_labs = builder.build_copies("hosp/labevents")
+            self._write("hosp/labevents", pd.concat([labs, copied_labs], ignore_index=True) if copied_labs is not None else labs)
+            self._write("hosp/diagnoses_icd", builder.build_icd("hosp/diagnoses_icd"))
+            self._write("hosp/procedures_icd", builder.build_icd("hosp/procedures_icd"))
+            self._write("icu/icustays", self._build_icustays(builder))
+            for name in model.copied_tables:
+                df = builder.build_copies(name)
+                self._write(name, df if df is not None else pd.DataFrame(columns=model.tables[name].columns))
+
+            print(f"Bloque {chunk + 1}/{len(seeds)}: pacientes {first}-{last - 1} en {perf_counter() - start:.1f}s")
+
+        subjects = pd.DataFrame({"subject_id": np.arange(SUBJECT_ID_BASE, SUBJECT_ID_BASE + self.n_subjects)})
+        subjects.to_csv(self.out / "demo_subject_id.csv", index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético con la forma de MIMIC-IV a partir del demo")
+    parser.add_argument("--source", type=Path, default=DEMO_PATH, help="Carpeta del demo (hosp/, icu/)")
+    parser.add_argument("--out", type=Path, help="Carpeta de salida (por defecto data/synthetic-x<scale>-s<seed>)")
+    parser.add_argument("--scale", type=int, default=10, help="Factor de escala sobre el nº de pacientes del demo")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-subjects", type=int, default=500, help="Pacientes por bloque escrito a disco")
+    args = parser.parse_args()
+
+    out = args.out or REPO_ROOT / "data" / f"synthetic-x{args.scale}-s{args.seed}"
+    start = perf_counter()
+    print(f"Aprendiendo distribuciones de {args.source}...")
+    model = DemoModel(args.source)
+    print(f"Modelo listo en {perf_counter() - start:.1f}s "
+          f"({len(model.subjects)} pacientes, {len(model.panel_items)} paneles de laboratorio, "
+          f"{len(model.states)} estados de traslado)")
+
+    generator = SyntheticGenerator(model, args.scale, args.seed, out, args.chunk_subjects)
+    generator.run()
+    print(f"Dataset sintético x{args.scale} ({generator.n_subjects} pacientes) en {out} "
+          f"en {perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()